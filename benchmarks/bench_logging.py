@@ -0,0 +1,113 @@
+"""Measure the caller-side cost of logging on the query hot path.
+
+Compares the eager f-string logging with a synchronous stream handler that the server
+used to do against `log_event()` with the background queue handler, with and without
+sampling. Records are written to os.devnull; `--write-latency-us` adds a blocking delay
+per write to model a stderr pipe whose reader is slower than the server.
+
+Usage:
+    python -m benchmarks.bench_logging [--calls 20000] [--query-bytes 4096] [--write-latency-us 20]
+"""
+
+import argparse
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueListener
+
+from mcp_clickhouse import mcp_env
+from mcp_clickhouse.mcp_env import LoggingConfig
+from mcp_clickhouse.mcp_logging import LOG_FORMAT, QueryText, _DeferredQueueHandler, log_event
+
+
+class _SlowSink:
+    """File-like object that blocks for a fixed time on every write."""
+
+    def __init__(self, latency_secs: float):
+        self._devnull = open(os.devnull, "w")
+        self._latency_secs = latency_secs
+
+    def write(self, data: str) -> int:
+        if self._latency_secs:
+            time.sleep(self._latency_secs)
+        return self._devnull.write(data)
+
+    def flush(self):
+        self._devnull.flush()
+
+    def close(self):
+        self._devnull.close()
+
+
+def _make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def _time_calls(calls: int, fn) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--query-bytes", type=int, default=4096)
+    parser.add_argument("--write-latency-us", type=float, default=20.0)
+    args = parser.parse_args()
+
+    query = (
+        "SELECT "
+        + ", ".join(f"col_{i}" for i in range(args.query_bytes // 8))
+        + " FROM db.events WHERE id = 42"
+    )
+    sink = _SlowSink(args.write_latency_us / 1e6)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    stream_handler = logging.StreamHandler(sink)
+    stream_handler.setFormatter(formatter)
+    eager = _make_logger("bench.eager", stream_handler)
+
+    listener_handler = logging.StreamHandler(sink)
+    listener_handler.setFormatter(formatter)
+    log_queue = queue.Queue(maxsize=args.calls + 1)
+    listener = QueueListener(log_queue, listener_handler)
+    listener.start()
+    queued = _make_logger("bench.queued", _DeferredQueueHandler(log_queue))
+
+    results = {}
+    mcp_env._LOGGING_CONFIG_INSTANCE = LoggingConfig()
+    results["eager f-string, sync stderr"] = _time_calls(
+        args.calls, lambda: eager.info(f"Executing SELECT query: {query}")
+    )
+    results["log_event, queued"] = _time_calls(
+        args.calls, lambda: log_event(queued, logging.INFO, "query.start", query=QueryText(query))
+    )
+    mcp_env._LOGGING_CONFIG_INSTANCE = LoggingConfig(sample_rates={"query.start": 0.1})
+    results["log_event, queued, 10% sampled"] = _time_calls(
+        args.calls, lambda: log_event(queued, logging.INFO, "query.start", query=QueryText(query))
+    )
+    queued.setLevel(logging.WARNING)
+    results["log_event, level disabled"] = _time_calls(
+        args.calls, lambda: log_event(queued, logging.INFO, "query.start", query=QueryText(query))
+    )
+
+    listener.stop()
+    sink.close()
+
+    print(
+        f"{args.calls} calls, {len(query)} byte query, {args.write_latency_us:g} us per write, "
+        "caller-side cost per call:"
+    )
+    for name, micros in results.items():
+        print(f"  {name:<34} {micros:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
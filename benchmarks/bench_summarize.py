@@ -0,0 +1,99 @@
+"""Compare summarizing a result in the server with returning its rows.
+
+A result of `--rows` rows is generated once with chDB in ClickHouse's Native format,
+the format clickhouse_connect reads from the server. Each variant then parses it and
+builds the tool response: every row as `run_select_query` would return it without a
+result budget, or the per-column summary of `summarize_query`, read as NumPy blocks.
+The report gives the time, the peak memory allocated and the size of the response.
+
+Usage:
+    python -m benchmarks.bench_summarize [--rows 1000000] [--repeat 3]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import chdb
+from clickhouse_connect.driver.buffer import ResponseBuffer
+from clickhouse_connect.driver.query import QueryContext
+from clickhouse_connect.driver.transform import NativeTransform
+from fastmcp.tools.tool import default_serializer
+
+from mcp_clickhouse.result_summary import ResultSummary
+
+QUERY = """
+SELECT
+    number AS id,
+    if(number % 10 = 0, NULL, randNormal(100, 15)) AS value,
+    toLowCardinality(['web', 'ios', 'android', 'api'][number % 4 + 1]) AS channel,
+    concat('user-', toString(number % 50000)) AS user,
+    toDateTime('2024-01-01 00:00:00') + number AS ts
+FROM numbers({rows})
+"""
+
+
+class _Source:
+    """Serves a response body held in memory to clickhouse_connect's parser."""
+
+    def __init__(self, data: bytes):
+        self.gen = iter([data])
+
+    def close(self):
+        pass
+
+
+def _parse(data: bytes, use_numpy: bool):
+    context = QueryContext(use_numpy=use_numpy, streaming=True)
+    return NativeTransform().parse_response(ResponseBuffer(_Source(data)), context)
+
+
+def _rows_response(data: bytes) -> str:
+    result = _parse(data, use_numpy=False)
+    rows = []
+    with result.row_block_stream as stream:
+        for block in stream:
+            rows.extend(block)
+    return default_serializer({"columns": list(result.column_names), "rows": rows})
+
+
+def _summary_response(data: bytes) -> str:
+    result = _parse(data, use_numpy=True)
+    with result.np_stream as stream:
+        summary = ResultSummary(
+            result.column_names, [column_type.name for column_type in result.column_types]
+        )
+        for block in stream:
+            summary.add_block(block)
+    return default_serializer(summary.to_dict())
+
+
+def _measure(fn, data: bytes, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = fn(data)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(response.encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = chdb.query(QUERY.format(rows=args.rows), "Native").bytes()
+    print(f"{args.rows} rows, {len(data) / 1e6:.1f} MB in Native format, best of {args.repeat}:")
+    print(f"  {'':<18} {'time':>10} {'peak memory':>14} {'response':>12}")
+    for name, fn in (("rows", _rows_response), ("summarize_query", _summary_response)):
+        secs, peak, size = _measure(fn, data, args.repeat)
+        print(f"  {name:<18} {secs * 1000:8.0f} ms {peak / 1e6:11.1f} MB {size / 1e3:9.1f} kB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Drive the MCP server with concurrent tool calls and report latency percentiles.
+
+By default the `mcp` app is driven in-process through in-memory MCP clients, with the
+ClickHouse tools backed by chDB (`--backend chdb`) or by a stub returning synthetic
+rows after a fixed latency (`--backend stub`), so no ClickHouse server is needed. With
+`--url` the harness drives a running server over streamable HTTP instead.
+
+Every simulated client has its own MCP session and calls tools back to back, picking
+each call from the weighted `--mix`. Query templates may use `{n}`, replaced by a
+random integer, to defeat result sharing between identical queries. Rate limits are
+disabled in-process unless set in the environment.
+
+Usage:
+    python -m benchmarks.load_test [--concurrency 16] [--duration 10] [--backend chdb|stub]
+        [--mix run_select_query=8,list_tables=1,list_databases=1]
+        [--query "SELECT number FROM numbers({n} % 1000 + 1)"] [--executor-workers 10]
+        [--url http://127.0.0.1:8000/mcp] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from clickhouse_connect.driver.binding import format_query_value
+
+DEFAULT_QUERY = "SELECT number, toString(number) AS s FROM numbers({n} % 1000 + 1)"
+DEFAULT_MIX = "run_select_query=8,list_tables=1,list_databases=1"
+
+
+def _parse_mix(value: str) -> list:
+    mix = []
+    for item in value.split(","):
+        tool, _, weight = item.partition("=")
+        mix.append((tool.strip(), float(weight or 1)))
+    return mix
+
+
+class _Result:
+    def __init__(self, names, rows):
+        self.column_names = tuple(names)
+        self.result_rows = rows
+
+
+class _Source:
+    def __init__(self, names):
+        self.column_names = tuple(names)
+
+    def close(self):
+        pass
+
+
+def _block_stream(names, rows, block_size=1000):
+    from clickhouse_connect.driver.common import StreamContext
+
+    blocks = (rows[i : i + block_size] for i in range(0, len(rows), block_size))
+    return StreamContext(_Source(names), blocks)
+
+
+class StubClient:
+    """Stands in for a clickhouse_connect client: every query returns `rows` synthetic
+    rows after sleeping `latency_secs`, modelling the network and server time."""
+
+    server_version = "stub"
+    server_settings: dict = {}
+
+    def __init__(self, rows: int, latency_secs: float):
+        self.rows = [(i, f"value-{i}") for i in range(rows)]
+        self.latency_secs = latency_secs
+
+    def query(self, query=None, settings=None, **kwargs):
+        time.sleep(self.latency_secs)
+        if query.startswith("DESCRIBE"):
+            return _Result(["name", "type"], [("number", "UInt64"), ("s", "String")])
+        if "system." in query:
+            return _Result([], [])
+        if "__mcp_length_0" in query:
+            # Query wrapped for server-side truncation: also return the string's length
+            rows = [(number, s, len(s)) for number, s in self.rows]
+            return _Result(["number", "s", "__mcp_length_0"], rows)
+        return _Result(["number", "s"], self.rows)
+
+    def query_row_block_stream(self, query=None, settings=None, **kwargs):
+        result = self.query(query, settings)
+        return _block_stream(result.column_names, result.result_rows)
+
+    def command(self, command, **kwargs):
+        time.sleep(self.latency_secs)
+        return "default\nsystem"
+
+
+class ChDBClient:
+    """Serves clickhouse_connect client calls from an in-process chDB session.
+
+    chDB runs one query at a time per process, so queries are serialized by a lock,
+    as they would be by chDB itself.
+    """
+
+    server_version = "chdb"
+    server_settings: dict = {}
+    # Settings chDB does not accept in a SETTINGS clause
+    _IGNORED_SETTINGS = ("readonly", "query_id")
+
+    def __init__(self):
+        import chdb.session as chs
+
+        self.session = chs.Session()
+        self.lock = threading.Lock()
+
+    def query(self, query=None, settings=None, **kwargs):
+        settings = {k: v for k, v in (settings or {}).items() if k not in self._IGNORED_SETTINGS}
+        if settings:
+            query += " SETTINGS " + ", ".join(
+                f"{k}={format_query_value(v)}" for k, v in settings.items()
+            )
+        with self.lock:
+            result = self.session.query(query, "JSONCompact")
+        data = json.loads(result.data() or '{"meta": [], "data": []}')
+        return _Result([m["name"] for m in data["meta"]], [tuple(r) for r in data["data"]])
+
+    def query_row_block_stream(self, query=None, settings=None, **kwargs):
+        result = self.query(query, settings)
+        return _block_stream(result.column_names, result.result_rows)
+
+    def command(self, command, **kwargs):
+        with self.lock:
+            return self.session.query(command, "TSV").data().strip()
+
+
+def _load_in_process_server(args):
+    """Import the MCP app with its ClickHouse client replaced by the chosen backend."""
+    os.environ.setdefault("CLICKHOUSE_HOST", "load-test")
+    os.environ.setdefault("CLICKHOUSE_USER", "default")
+    os.environ.setdefault("CLICKHOUSE_PASSWORD", "")
+    os.environ.setdefault("CLICKHOUSE_SCHEMA_CACHE_DIR", "")
+    os.environ.setdefault("CLICKHOUSE_MCP_QUERY_RATE_PER_MIN", "0")
+    os.environ.setdefault("CLICKHOUSE_MCP_METADATA_RATE_PER_MIN", "0")
+    os.environ.setdefault("CLICKHOUSE_LOG_LEVEL", "WARNING")
+    if any(tool == "run_chdb_select_query" for tool, _ in args.mix):
+        os.environ.setdefault("CHDB_ENABLED", "true")
+
+    import concurrent.futures
+
+    from mcp_clickhouse import mcp_server
+    from mcp_clickhouse.single_flight import SingleFlight
+
+    # Failed calls are counted in the report; FastMCP would log a traceback for each
+    logging.getLogger("FastMCP").setLevel(logging.CRITICAL)
+    if args.backend == "stub":
+        client = StubClient(args.stub_rows, args.stub_latency_ms / 1000)
+    else:
+        client = ChDBClient()
+    mcp_server.create_clickhouse_client = lambda: client
+    mcp_server.QUERY_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+        max_workers=args.executor_workers
+    )
+    mcp_server.QUERY_FLIGHTS = SingleFlight(mcp_server.QUERY_EXECUTOR)
+    return mcp_server
+
+
+def _tool_arguments(tool: str, args) -> dict:
+    if tool in ("run_select_query", "run_chdb_select_query"):
+        template = random.choice(args.query)
+        return {"query": template.replace("{n}", str(random.randrange(1_000_000)))}
+    if tool == "list_tables":
+        return {"database": args.database}
+    if tool == "search_schema":
+        return {"query": args.search}
+    if tool == "preview_table":
+        database, _, table = args.table.partition(".")
+        return {"database": database, "table": table}
+    return {}
+
+
+async def _client_loop(target, args, deadline: float, stats: dict) -> None:
+    from fastmcp import Client
+
+    tools = [tool for tool, _ in args.mix]
+    weights = [weight for _, weight in args.mix]
+    async with Client(target, timeout=args.timeout) as client:
+        while time.monotonic() < deadline:
+            tool = random.choices(tools, weights)[0]
+            arguments = _tool_arguments(tool, args)
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                await asyncio.wait_for(client.call_tool(tool, arguments), args.timeout)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+            except Exception as e:
+                message = str(e)
+                if '"rate_limited"' in message:
+                    outcome = "rate_limited"
+                elif "timed out" in message.lower():
+                    outcome = "timeout"
+                else:
+                    outcome = "error"
+                    stats["last_error"][tool] = message[:200]
+            elapsed = time.perf_counter() - start
+            stats["latencies"][tool].append(elapsed)
+            stats[outcome][tool] += 1
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _summarize(stats: dict, elapsed: float) -> dict:
+    tools = {}
+    all_latencies = []
+    for tool, latencies in sorted(stats["latencies"].items()):
+        latencies.sort()
+        all_latencies.extend(latencies)
+        tools[tool] = {
+            "calls": len(latencies),
+            "errors": stats["error"][tool],
+            "timeouts": stats["timeout"][tool],
+            "rate_limited": stats["rate_limited"][tool],
+            "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p95_ms": _percentile(latencies, 0.95) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+        }
+    all_latencies.sort()
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = max_rss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+    return {
+        "elapsed_secs": elapsed,
+        "calls": len(all_latencies),
+        "throughput_per_sec": len(all_latencies) / elapsed if elapsed else 0.0,
+        "errors": sum(stats["error"].values()),
+        "timeouts": sum(stats["timeout"].values()),
+        "rate_limited": sum(stats["rate_limited"].values()),
+        "p50_ms": _percentile(all_latencies, 0.50) * 1000,
+        "p95_ms": _percentile(all_latencies, 0.95) * 1000,
+        "p99_ms": _percentile(all_latencies, 0.99) * 1000,
+        "peak_rss_mb": peak_rss_mb,
+        "tools": tools,
+        "last_errors": dict(stats["last_error"]),
+    }
+
+
+def _print_report(report: dict, args) -> None:
+    target = args.url or f"in-process, {args.backend} backend"
+    print(
+        f"{target}: {args.concurrency} clients for {report['elapsed_secs']:.1f} s, "
+        f"{report['calls']} calls, {report['throughput_per_sec']:.1f} calls/s, "
+        f"{report['errors']} errors, {report['timeouts']} timeouts, "
+        f"{report['rate_limited']} rate limited, "
+        f"peak RSS {report['peak_rss_mb']:.0f} MB"
+    )
+    header = f"  {'tool':<24} {'calls':>7} {'errors':>7} {'timeouts':>8}"
+    print(header + f" {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(report["tools"].items()) + [("all", report)]
+    for tool, row in rows:
+        print(
+            f"  {tool:<24} {row['calls']:>7} {row['errors']:>7} {row['timeouts']:>8}"
+            f" {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+        )
+    for tool, error in report["last_errors"].items():
+        print(f"  last {tool} error: {error}")
+
+
+async def _run(args) -> dict:
+    if args.url:
+        target = args.url
+        server = None
+    else:
+        server = _load_in_process_server(args)
+        target = server.mcp
+
+    stats = {
+        "latencies": defaultdict(list),
+        "ok": defaultdict(int),
+        "error": defaultdict(int),
+        "timeout": defaultdict(int),
+        "rate_limited": defaultdict(int),
+        "last_error": {},
+    }
+    start = time.monotonic()
+    deadline = start + args.duration
+    await asyncio.gather(
+        *(_client_loop(target, args, deadline, stats) for _ in range(args.concurrency))
+    )
+    report = _summarize(stats, time.monotonic() - start)
+    if server is not None:
+        report["query_executions"] = server.QUERY_FLIGHTS.executions
+        report["query_coalesced"] = server.QUERY_FLIGHTS.coalesced
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX))
+    parser.add_argument(
+        "--query", action="append", help="query template, may be repeated (default: numbers)"
+    )
+    parser.add_argument("--database", default="system", help="database for list_tables")
+    parser.add_argument("--search", default="query", help="search_schema query")
+    parser.add_argument("--table", default="system.one", help="database.table for preview_table")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-call timeout, seconds")
+    parser.add_argument("--backend", choices=("chdb", "stub"), default="chdb")
+    parser.add_argument("--stub-rows", type=int, default=100)
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0)
+    parser.add_argument("--executor-workers", type=int, default=10)
+    parser.add_argument("--url", help="drive a running server over streamable HTTP instead")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    args.query = args.query or [DEFAULT_QUERY]
+
+    report = asyncio.run(_run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ from .mcp_server import (
     create_clickhouse_client,
     list_databases,
     list_tables,
+    describe_table_storage,
+    preview_table,
+    search_schema,
     run_select_query,
     create_chdb_client,
     run_chdb_select_query,
@@ -11,6 +14,9 @@ from .mcp_server import (
 __all__ = [
     "list_databases",
     "list_tables",
+    "describe_table_storage",
+    "preview_table",
+    "search_schema",
     "run_select_query",
     "create_clickhouse_client",
     "create_chdb_client",
@@ -0,0 +1,324 @@
+"""Audit trail of tool calls, written in batches off the request path.
+
+`AuditMiddleware` records every tool call: the tool, session, user, query text and
+fingerprint, duration, rows and bytes returned, and status. A record costs the call an
+append to an in-memory buffer; a background thread flushes the buffer in batches every
+few seconds, or as soon as a batch fills up, to each configured sink:
+
+* file: JSON lines in a rotating file per process
+* chdb: a MergeTree table of the local chDB session, created if missing
+* clickhouse: an existing ClickHouse table, with asynchronous inserts
+
+The buffer is bounded: when it is full new records are dropped and counted rather than
+slowing down tool calls. The buffer is flushed once more on shutdown.
+"""
+
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from fastmcp.server.middleware import Middleware
+
+from mcp_clickhouse.mcp_logging import log_event
+from mcp_clickhouse.sql_fingerprint import query_fingerprint
+
+logger = logging.getLogger("mcp-clickhouse")
+
+AUDIT_COLUMNS = (
+    "event_time",
+    "tool",
+    "session",
+    "user",
+    "query",
+    "fingerprint",
+    "duration_ms",
+    "rows",
+    "bytes",
+    "status",
+    "error",
+)
+AUDIT_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    event_time DateTime64(3),
+    tool LowCardinality(String),
+    session String,
+    user String,
+    query String,
+    fingerprint String,
+    duration_ms Float64,
+    rows Nullable(UInt64),
+    bytes Nullable(UInt64),
+    status LowCardinality(String),
+    error String
+) ENGINE = MergeTree ORDER BY event_time
+"""
+
+# Record of the tool call being served; tools add the rows and bytes they return
+AUDIT_RECORD: ContextVar[Optional[dict]] = ContextVar("audit_record", default=None)
+
+
+def audit_result(rows: Optional[int] = None, result_bytes: Optional[int] = None) -> None:
+    """Add the size of its result to the audit record of the current tool call."""
+    record = AUDIT_RECORD.get()
+    if record is not None:
+        record["rows"] = rows
+        record["bytes"] = result_bytes
+
+
+def _event_time(record: dict) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(record["event_time"], tz=datetime.timezone.utc)
+
+
+class FileSink:
+    """Appends records as JSON lines, rotating the file when it reaches `max_bytes`.
+
+    Args:
+        path: File written to; rotated files get a numeric suffix, `.1` the newest
+        max_bytes: Size at which the file is rotated
+        backups: Number of rotated files kept
+    """
+
+    name = "file"
+
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def write(self, records: list[dict]) -> None:
+        lines = "".join(
+            json.dumps({**r, "event_time": _event_time(r).isoformat()}, ensure_ascii=False) + "\n"
+            for r in records
+        ).encode("utf-8")
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(lines) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "ab") as out:
+            out.write(lines)
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.unlink(self.path)
+
+
+class ChDBSink:
+    """Inserts records into a table of the local chDB session.
+
+    Args:
+        run: Runs a statement in the chDB session
+        table: Table name, optionally qualified by its database
+    """
+
+    name = "chdb"
+
+    def __init__(self, run: Callable[[str], Any], table: str):
+        self._run = run
+        self.table = table
+        self._created = False
+
+    def write(self, records: list[dict]) -> None:
+        if not self._created:
+            database, _, _ = self.table.rpartition(".")
+            if database:
+                self._run(f"CREATE DATABASE IF NOT EXISTS {database}")
+            self._run(AUDIT_TABLE_DDL.format(table=self.table))
+            self._created = True
+        rows = "\n".join(
+            json.dumps(
+                {**r, "event_time": _event_time(r).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]},
+                ensure_ascii=False,
+            )
+            for r in records
+        )
+        self._run(f"INSERT INTO {self.table} FORMAT JSONEachRow\n{rows}")
+
+
+class ClickHouseSink:
+    """Inserts records into an existing ClickHouse table with asynchronous inserts.
+
+    The server buffers the rows and writes them as one part, so frequent small batches
+    do not create many parts.
+
+    Args:
+        connect: Creates a ClickHouse client
+        table: Table name, optionally qualified by its database
+    """
+
+    name = "clickhouse"
+
+    def __init__(self, connect: Callable[[], Any], table: str):
+        self._connect = connect
+        self.table = table
+
+    def write(self, records: list[dict]) -> None:
+        rows = [[_event_time(r), *(r[c] for c in AUDIT_COLUMNS[1:])] for r in records]
+        self._connect().insert(
+            self.table,
+            rows,
+            column_names=AUDIT_COLUMNS,
+            settings={"async_insert": 1, "wait_for_async_insert": 0},
+        )
+
+
+class AuditLog:
+    """Bounded in-memory buffer of audit records, flushed to sinks by a background thread.
+
+    Args:
+        max_queued: Maximum number of buffered records; new records are dropped beyond it
+        batch_size: Number of buffered records that triggers a flush, and the maximum
+            number of records written to a sink at once
+    """
+
+    def __init__(self, max_queued: int = 10000, batch_size: int = 1000):
+        self.sinks: list = []
+        self.max_queued = max_queued
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def add(self, record: dict) -> bool:
+        """Buffer a record; returns False if the buffer was full and it was dropped."""
+        with self._lock:
+            if len(self._queue) >= self.max_queued:
+                self.dropped += 1
+                return False
+            self._queue.append(record)
+            full = len(self._queue) >= self.batch_size
+        if full:
+            self._wake.set()
+        return True
+
+    def flush(self) -> int:
+        """Write every buffered record to the sinks, returning the number of records."""
+        with self._flush_lock:
+            with self._lock:
+                records = list(self._queue)
+                self._queue.clear()
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                log_event(logger, logging.WARNING, "audit.dropped", records=dropped)
+            if not records:
+                return 0
+            # Fingerprints are computed here rather than on the request path
+            for record in records:
+                query = record.get("query")
+                record["fingerprint"] = query_fingerprint(query) if query else ""
+            for start in range(0, len(records), self.batch_size):
+                batch = records[start : start + self.batch_size]
+                for sink in self.sinks:
+                    try:
+                        sink.write(batch)
+                    except Exception as e:
+                        log_event(
+                            logger,
+                            logging.ERROR,
+                            "audit.write_failed",
+                            sink=sink.name,
+                            records=len(batch),
+                            error=str(e),
+                        )
+            self.written += len(records)
+            return len(records)
+
+    def start(self, sinks: list, flush_secs: float) -> None:
+        """Start flushing to `sinks` every `flush_secs` seconds."""
+        self.sinks = list(sinks)
+        if not self.sinks or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, args=(flush_secs,), name="audit-log", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop the flush thread and write what is still buffered."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.flush()
+
+    def _run(self, flush_secs: float) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(max(flush_secs, 0.1))
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Audit log flush failed: %s", e)
+
+
+class AuditMiddleware(Middleware):
+    """FastMCP middleware adding a record of every tool call to an audit log.
+
+    Added ahead of the rate limiter, circuit breaker and credential check, so that the
+    calls they reject are recorded as errors too.
+
+    Args:
+        audit_log: Log the records are added to
+        default_user: User recorded for calls without request credentials
+    """
+
+    def __init__(self, audit_log: AuditLog, default_user: Callable[[], str]):
+        self.audit_log = audit_log
+        self.default_user = default_user
+
+    async def on_call_tool(self, context, call_next):
+        if not self.audit_log.enabled:
+            return await call_next(context)
+        from mcp_clickhouse.credentials import peek_request_credentials
+
+        arguments = context.message.arguments or {}
+        query = arguments.get("query")
+        fastmcp_context = context.fastmcp_context
+        # Read from the headers: calls rejected by CredentialMiddleware are recorded too
+        credentials = peek_request_credentials()
+        record = {
+            "event_time": time.time(),
+            "tool": context.message.name,
+            "session": (fastmcp_context.session_id if fastmcp_context else None) or "",
+            "user": credentials.username if credentials else self.default_user(),
+            "query": query if isinstance(query, str) else "",
+            "duration_ms": 0.0,
+            "rows": None,
+            "bytes": None,
+            "status": "ok",
+            "error": "",
+        }
+        token = AUDIT_RECORD.set(record)
+        start = time.perf_counter()
+        try:
+            return await call_next(context)
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+            raise
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            AUDIT_RECORD.reset(token)
+            self.audit_log.add(record)
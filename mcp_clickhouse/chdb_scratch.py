@@ -0,0 +1,133 @@
+"""Scratch tables holding ClickHouse results in chDB.
+
+`materialize_query` pulls a result from ClickHouse once, in Native format, and stores
+it as a table of the `mcp_scratch` database in the chDB session, so that follow-up
+slices of the same data run locally with `run_chdb_select_query` at no cost to the
+cluster. Scratch tables share a byte quota, measured on the uncompressed data pulled,
+and are dropped once left unused for the configured idle time. They last only as long
+as the process: the database is recreated empty when chDB starts.
+"""
+
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+SCRATCH_DATABASE = "mcp_scratch"
+
+_TABLE_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,63}$")
+_REFERENCE_RE = re.compile(rf"\b{SCRATCH_DATABASE}\s*\.\s*[`\"]?(\w+)")
+
+
+class ScratchQuotaExceeded(ValueError):
+    """Raised when a result does not fit in the space left for scratch tables."""
+
+
+@dataclass
+class ScratchTable:
+    name: str
+    rows: int
+    bytes: int
+    created_at: float
+    last_used: float
+
+    def to_dict(self, idle_ttl_secs: int) -> dict:
+        info = asdict(self)
+        info["table"] = f"{SCRATCH_DATABASE}.{self.name}"
+        info["expires_at"] = self.last_used + idle_ttl_secs if idle_ttl_secs > 0 else None
+        return info
+
+
+def check_table_name(name: str) -> str:
+    """Check that a scratch table name is a plain identifier.
+
+    Raises:
+        ValueError: If the name is not letters, digits and underscores
+    """
+    if not _TABLE_NAME_RE.match(name):
+        raise ValueError(
+            f"Invalid scratch table name '{name}': use up to 64 letters, digits and "
+            "underscores, not starting with a digit"
+        )
+    return name
+
+
+class ScratchTables:
+    """Registry of the scratch tables with their sizes and last use.
+
+    Only the bookkeeping lives here; creating and dropping the tables in chDB is up to
+    the caller, which drops the names `expire()` returns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables: dict[str, ScratchTable] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tables)
+
+    def available_bytes(self, max_bytes: int, replacing: Optional[str] = None) -> int:
+        """Get the bytes left in the quota, counting a table about to be replaced as free."""
+        with self._lock:
+            used = sum(table.bytes for table in self._tables.values() if table.name != replacing)
+        return max(max_bytes - used, 0)
+
+    def add(self, name: str, rows: int, nbytes: int, max_bytes: int, now=None) -> ScratchTable:
+        """Record a new table, replacing any table of the same name.
+
+        Raises:
+            ScratchQuotaExceeded: If the table does not fit in the quota, e.g. because
+                another table was added while its data was being pulled
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            used = sum(table.bytes for table in self._tables.values() if table.name != name)
+            if used + nbytes > max_bytes:
+                raise ScratchQuotaExceeded(
+                    f"Scratch table '{name}' needs {nbytes} bytes but only "
+                    f"{max(max_bytes - used, 0)} of {max_bytes} are free"
+                )
+            table = ScratchTable(name, rows, nbytes, created_at=now, last_used=now)
+            self._tables[name] = table
+            return table
+
+    def remove(self, name: str) -> Optional[ScratchTable]:
+        with self._lock:
+            return self._tables.pop(name, None)
+
+    def touch(self, query: str, now=None) -> list[str]:
+        """Mark the scratch tables a query refers to as used.
+
+        Returns:
+            The names of the referenced tables that exist
+        """
+        now = time.time() if now is None else now
+        touched = []
+        with self._lock:
+            for name in set(_REFERENCE_RE.findall(query)):
+                table = self._tables.get(name)
+                if table is not None:
+                    table.last_used = now
+                    touched.append(name)
+        return touched
+
+    def expire(self, idle_ttl_secs: int, now=None) -> list[str]:
+        """Forget the tables unused for longer than the idle TTL, 0 keeping them all.
+
+        Returns:
+            The names of the expired tables, which the caller drops
+        """
+        if idle_ttl_secs <= 0:
+            return []
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                name
+                for name, table in self._tables.items()
+                if now - table.last_used > idle_ttl_secs
+            ]
+            for name in expired:
+                del self._tables[name]
+        return expired
@@ -0,0 +1,290 @@
+"""Failing fast while the ClickHouse backend is unhealthy.
+
+Without a breaker, a degraded server makes every tool call wait for the full connect
+or query timeout. The calls pile up on the query threads until the server stops
+answering anything, chDB included. The circuit breaker judges the backend on its
+recent ClickHouse tool calls:
+
+* closed: calls go through. A call fails if it ended on a connection or transport
+  error, or took longer than the slow-call threshold. Errors returned by ClickHouse,
+  such as a syntax error, and query timeouts count as successes: the server is
+  answering, and a heavy query only says something about that query. Once enough of
+  the recent calls failed, the circuit opens.
+* open: calls are rejected at once with the seconds to wait before retrying.
+* half-open: after the open period, a few trial calls go through. The first trial to
+  succeed closes the circuit, a failed one opens it again.
+
+The breaker also adapts the connect timeout to recent connect latencies, so that a
+server that stops accepting connections is noticed in seconds rather than after the
+configured timeout.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from fastmcp.exceptions import ToolError
+from fastmcp.server.middleware import Middleware
+from urllib3.exceptions import (
+    ConnectTimeoutError,
+    MaxRetryError,
+    NewConnectionError,
+    ProtocolError,
+)
+
+from mcp_clickhouse.mcp_env import get_config
+from mcp_clickhouse.mcp_logging import log_event
+
+logger = logging.getLogger("mcp-clickhouse")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Connect timeouts allow this many times the 99th percentile of recent connects
+TIMEOUT_MULTIPLIER = 4
+# Latencies kept per window, and needed before timeouts adapt
+LATENCY_SAMPLES = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+class BackendUnavailable(ToolError):
+    """Raised when a tool call is rejected because the circuit is open.
+
+    The message is a JSON object carrying `retry_after_secs`, like rate limit errors.
+    """
+
+    def __init__(self, retry_after_secs: float):
+        self.retry_after_secs = retry_after_secs
+        super().__init__(
+            json.dumps(
+                {
+                    "status": "unavailable",
+                    "message": "ClickHouse is failing or too slow, calls are rejected "
+                    f"for {retry_after_secs:.1f} more seconds",
+                    "retry_after_secs": round(retry_after_secs, 2),
+                }
+            )
+        )
+
+
+# Errors showing the server cannot be reached or dropped the connection. Timeouts waiting
+# for a query, on the client or in urllib3's read, are not among them: a user's heavy
+# query must not open the circuit for everyone.
+_TRANSPORT_ERRORS = (ConnectionError, NewConnectionError, ConnectTimeoutError, ProtocolError)
+
+
+def is_backend_failure(err: Optional[BaseException]) -> bool:
+    """Tell whether an error, or an error it was raised from, is a connection or transport error."""
+    seen = set()
+    while err is not None and id(err) not in seen:
+        if isinstance(err, _TRANSPORT_ERRORS):
+            return True
+        seen.add(id(err))
+        if isinstance(err, MaxRetryError) and err.reason is not None:
+            err = err.reason
+        else:
+            err = err.__cause__ or err.__context__
+    return False
+
+
+class LatencyWindow:
+    """The most recent latencies, in seconds, for percentiles."""
+
+    def __init__(self, size: int = LATENCY_SAMPLES):
+        self._values: deque = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, secs: float) -> None:
+        self._values.append(secs)
+
+    def percentile(self, q: float) -> Optional[float]:
+        values = sorted(self._values)
+        if not values:
+            return None
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+
+class CircuitBreaker:
+    """Circuit breaker around the ClickHouse backend.
+
+    Thresholds are passed to each method, so that a reloaded configuration applies to
+    the next call.
+    """
+
+    def __init__(self):
+        self.state = CLOSED
+        self.rejected = 0
+        self.opened = 0
+        self.connect_latencies = LatencyWindow()
+        self.call_latencies = LatencyWindow()
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+
+    def acquire(self, open_secs: float, half_open_calls: int, now: Optional[float] = None) -> bool:
+        """Admit a call or reject it.
+
+        Returns:
+            Whether the call is a trial call of the half-open state
+
+        Raises:
+            BackendUnavailable: If the circuit is open, or enough trials are running
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == OPEN:
+                retry_after = self._opened_at + open_secs - now
+                if retry_after > 0:
+                    self.rejected += 1
+                    raise BackendUnavailable(retry_after)
+                self._transition(HALF_OPEN, "open period elapsed")
+            if self.state == HALF_OPEN:
+                if self._trials >= max(half_open_calls, 1):
+                    self.rejected += 1
+                    raise BackendUnavailable(1.0)
+                self._trials += 1
+                return True
+            return False
+
+    def record(
+        self,
+        trial: bool,
+        failed: bool,
+        window: int,
+        min_calls: int,
+        failure_percent: int,
+        now: Optional[float] = None,
+    ) -> None:
+        """Record the outcome of a call admitted by `acquire`."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if trial:
+                self._trials = max(self._trials - 1, 0)
+                if self.state != HALF_OPEN:
+                    return
+                if failed:
+                    self._open(now, "trial call failed")
+                else:
+                    self._transition(CLOSED, "trial call succeeded")
+                return
+            # Calls admitted before the circuit opened say nothing about the backend now
+            if self.state != CLOSED:
+                return
+            self._outcomes.append(failed)
+            self._failures += failed
+            while len(self._outcomes) > max(window, 1):
+                self._failures -= self._outcomes.popleft()
+            calls = len(self._outcomes)
+            if calls >= min_calls and self._failures * 100 >= failure_percent * calls:
+                self._open(now, f"{self._failures} of the last {calls} calls failed")
+
+    def release(self, trial: bool) -> None:
+        """Give back a call admitted by `acquire` without judging the backend on it."""
+        if trial:
+            with self._lock:
+                self._trials = max(self._trials - 1, 0)
+
+    def connect_timeout(self, max_secs: float, min_secs: float) -> float:
+        """Connect timeout adapted to the latency of recent connects."""
+        if len(self.connect_latencies) < MIN_LATENCY_SAMPLES or min_secs >= max_secs:
+            return max_secs
+        p99 = self.connect_latencies.percentile(0.99)
+        return min(max_secs, max(min_secs, p99 * TIMEOUT_MULTIPLIER))
+
+    def reset(self) -> None:
+        """Close the circuit and forget recent calls, e.g. when the backend changes."""
+        with self._lock:
+            if self.state != CLOSED:
+                self._transition(CLOSED, "reset")
+            self._outcomes.clear()
+            self._failures = 0
+            self._trials = 0
+
+    def snapshot(self, open_secs: float, now: Optional[float] = None) -> dict:
+        """Describe the state of the breaker for monitoring."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            snapshot = {
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+            if self.state == OPEN:
+                snapshot["retry_after_secs"] = round(max(self._opened_at + open_secs - now, 0), 2)
+        for name, latencies in (("call", self.call_latencies), ("connect", self.connect_latencies)):
+            for q in (0.5, 0.99):
+                value = latencies.percentile(q)
+                if value is not None:
+                    snapshot[f"{name}_p{round(q * 100)}_ms"] = round(value * 1000, 1)
+        return snapshot
+
+    def _open(self, now: float, reason: str) -> None:
+        self._opened_at = now
+        self.opened += 1
+        self._transition(OPEN, reason)
+
+    def _transition(self, state: str, reason: str) -> None:
+        log_event(
+            logger,
+            logging.INFO if state == CLOSED else logging.WARNING,
+            "circuit.state",
+            previous=self.state,
+            state=state,
+            reason=reason,
+        )
+        self.state = state
+        self._outcomes.clear()
+        self._failures = 0
+
+
+class CircuitBreakerMiddleware(Middleware):
+    """FastMCP middleware guarding the tools that call ClickHouse with a circuit breaker.
+
+    Args:
+        breaker: Breaker deciding which calls go through
+        tools: Names of the tools guarded
+    """
+
+    def __init__(self, breaker: CircuitBreaker, tools):
+        self.breaker = breaker
+        self.tools = frozenset(tools)
+
+    async def on_call_tool(self, context, call_next):
+        config = get_config()
+        if config.circuit_window <= 0 or context.message.name not in self.tools:
+            return await call_next(context)
+        trial = self.breaker.acquire(config.circuit_open_secs, config.circuit_half_open_calls)
+        start = time.perf_counter()
+        try:
+            result = await call_next(context)
+        except Exception as e:
+            self._record(config, trial, is_backend_failure(e))
+            raise
+        except BaseException:
+            # Cancelled by the client: the backend may not even have been reached
+            self.breaker.release(trial)
+            raise
+        elapsed = time.perf_counter() - start
+        self.breaker.call_latencies.add(elapsed)
+        slow_secs = config.circuit_slow_call_secs
+        self._record(config, trial, slow_secs > 0 and elapsed > slow_secs)
+        return result
+
+    def _record(self, config, trial: bool, failed: bool) -> None:
+        self.breaker.record(
+            trial,
+            failed,
+            config.circuit_window,
+            config.circuit_min_calls,
+            config.circuit_failure_percent,
+        )
@@ -0,0 +1,141 @@
+"""Opening ClickHouse connections ahead of tool calls and keeping them open.
+
+A cold connection to ClickHouse Cloud pays DNS, TCP, TLS and authentication before the
+query is even sent. The warmer opens connections in the background at startup, so the
+first tool calls find them in clickhouse_connect's pool, then pings them on an
+interval shorter than the server's keep-alive timeout, so idle connections are not
+closed under the next caller.
+
+Connections in a pool are handed out one per request in flight, so opening or pinging
+N of them takes N requests sent at the same moment. A failed ping drops the pool and
+warms it again, retrying with a backoff while the server stays unreachable.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from mcp_clickhouse.mcp_logging import log_event
+
+logger = logging.getLogger("mcp-clickhouse")
+
+# clickhouse_connect keeps at most this many idle connections per host
+MAX_WARM_CONNECTIONS = 8
+MAX_RETRY_SECS = 60
+
+
+def _at_once(fn: Callable[[], Any], n: int) -> list:
+    """Call `fn` from `n` threads released together, returning results or exceptions."""
+    barrier = threading.Barrier(n)
+
+    def call():
+        try:
+            barrier.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+        try:
+            return fn()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=n, thread_name_prefix="pool-warmup") as executor:
+        return list(executor.map(lambda _: call(), range(n)))
+
+
+class ConnectionWarmer:
+    """Keeps a number of validated connections to ClickHouse open.
+
+    Args:
+        connect: Creates a client on the shared connection pool, authenticating with a
+            query so that credentials are validated too
+        clear_pool: Closes every pooled connection
+    """
+
+    def __init__(self, connect: Callable[[], Any], clear_pool: Callable[[], None]):
+        self._connect = connect
+        self._clear_pool = clear_pool
+        self._client: Optional[Any] = None
+        self._failures = 0
+        self._wake = threading.Event()
+
+    @property
+    def warm(self) -> bool:
+        return self._client is not None
+
+    def reset(self) -> None:
+        """Drop the pooled connections and open new ones without waiting for the interval.
+
+        Call it after a network error: the other pooled connections may be broken too.
+        """
+        self._client = None
+        self._clear_pool()
+        self._wake.set()
+
+    def step(self, connections: int) -> float:
+        """Warm the pool or ping its connections, once.
+
+        Args:
+            connections: Number of connections to keep open
+
+        Returns:
+            Seconds to wait before the next step: a backoff after a failure, otherwise
+            0 to use the keep-alive interval
+        """
+        connections = min(connections, MAX_WARM_CONNECTIONS)
+        if connections <= 0:
+            return 0
+        warming = self._client is None
+        start = time.perf_counter()
+        if warming:
+            results = _at_once(self._connect, connections)
+            errors = [r for r in results if isinstance(r, Exception)]
+        else:
+            results = _at_once(self._client.ping, connections)
+            errors = [r for r in results if r is not True]
+
+        if errors:
+            self._failures += 1
+            retry_secs = min(2 ** (self._failures - 1), MAX_RETRY_SECS)
+            log_event(
+                logger,
+                logging.WARNING,
+                "pool.warm_failed" if warming else "pool.ping_failed",
+                connections=connections,
+                failed=len(errors),
+                error=str(errors[0]),
+                retry_secs=retry_secs,
+            )
+            # The other connections may be half-closed as well: open new ones
+            self._client = None
+            self._clear_pool()
+            return retry_secs
+
+        if warming:
+            self._client = results[0]
+            log_event(
+                logger,
+                logging.INFO,
+                "pool.warmed",
+                connections=connections,
+                elapsed_ms=round((time.perf_counter() - start) * 1000, 1),
+            )
+        self._failures = 0
+        return 0
+
+    def run(self, get_settings: Callable[[], tuple]) -> None:
+        """Warm and ping forever; `get_settings` returns (connections, interval secs)."""
+        while True:
+            self._wake.clear()
+            connections, interval_secs = get_settings()
+            try:
+                retry_secs = self.step(connections)
+            except Exception as e:
+                logger.error("Connection warm-up failed: %s", e)
+                retry_secs = interval_secs
+            if retry_secs:
+                # The step's own failed connects reset the warmer too, which must not
+                # cut its backoff short
+                self._wake.clear()
+            self._wake.wait(max(retry_secs or interval_secs, 1))
@@ -0,0 +1,155 @@
+"""Per-request ClickHouse credentials for multi-tenant hosting over HTTP.
+
+With `CLICKHOUSE_MCP_REQUEST_CREDENTIALS=true`, every tool call must carry the
+ClickHouse user it runs as, in `X-ClickHouse-User` / `X-ClickHouse-Key` headers or a
+Basic `Authorization` header. Queries then run as that user, so its grants, quotas
+and row policies apply, instead of as the shared `CLICKHOUSE_USER`.
+
+Each set of credentials gets its own small connection pool, keyed by a hash of the
+credentials. Pools are kept least recently used first: at most a fixed number exist,
+and the pools of tenants idle for too long are closed.
+"""
+
+import base64
+import binascii
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Mapping, Optional
+
+from fastmcp.exceptions import ToolError
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware
+
+from mcp_clickhouse.mcp_env import get_config
+from mcp_clickhouse.mcp_logging import log_event
+
+logger = logging.getLogger("mcp-clickhouse")
+
+
+@dataclass(frozen=True)
+class Credentials:
+    username: str
+    password: str = field(default="", repr=False)
+
+    @property
+    def key(self) -> str:
+        """Hash identifying the credentials in pool and cache keys, never the password."""
+        secret = f"{self.username}\0{self.password}".encode("utf-8")
+        return hashlib.sha256(secret).hexdigest()
+
+
+# Credentials of the tool call being served, None to use the configured user
+REQUEST_CREDENTIALS: ContextVar[Optional[Credentials]] = ContextVar(
+    "request_credentials", default=None
+)
+
+
+def credentials_from_headers(headers: Mapping[str, str]) -> Optional[Credentials]:
+    """Read ClickHouse credentials from lower-cased HTTP request headers.
+
+    Raises:
+        ValueError: If a Basic authorization header is malformed
+    """
+    username = headers.get("x-clickhouse-user")
+    if username:
+        return Credentials(username, headers.get("x-clickhouse-key", ""))
+    scheme, _, value = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+        return None
+    try:
+        decoded = base64.b64decode(value.strip(), validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Malformed Basic authorization header") from None
+    username, separator, password = decoded.partition(":")
+    if not separator or not username:
+        raise ValueError("Malformed Basic authorization header")
+    return Credentials(username, password)
+
+
+def peek_request_credentials() -> Optional[Credentials]:
+    """Read the credentials of the current tool call ahead of CredentialMiddleware.
+
+    For the middleware running before it, such as the rate limiter and the audit log.
+
+    Returns:
+        The credentials, or None if request credentials are off or the call carries
+        none or malformed ones, which CredentialMiddleware then rejects
+    """
+    if not get_config().mcp_request_credentials:
+        return None
+    try:
+        return credentials_from_headers(get_http_headers(include_all=True))
+    except ValueError:
+        return None
+
+
+class CredentialPools:
+    """Connection pools keyed by credential hash, bounded in number and idle time.
+
+    Args:
+        make_pool: Creates an empty urllib3 PoolManager
+    """
+
+    def __init__(self, make_pool: Callable[[], Any]):
+        self._make_pool = make_pool
+        self._lock = threading.Lock()
+        # key -> (pool, last use), least recently used first
+        self._pools: OrderedDict[str, tuple] = OrderedDict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pools)
+
+    def get(self, key: str, max_pools: int, idle_secs: int, now=None):
+        """Get the pool of a credential key, creating it and evicting others as needed."""
+        now = time.monotonic() if now is None else now
+        evicted = []
+        with self._lock:
+            entry = self._pools.pop(key, None)
+            while self._pools and (
+                len(self._pools) >= max_pools
+                or (idle_secs > 0 and now - next(iter(self._pools.values()))[1] > idle_secs)
+            ):
+                evicted.append(self._pools.popitem(last=False)[1][0])
+            pool = entry[0] if entry is not None else self._make_pool()
+            self._pools[key] = (pool, now)
+        for old in evicted:
+            old.clear()
+        if evicted:
+            log_event(logger, logging.DEBUG, "credentials.pools_evicted", pools=len(evicted))
+        return pool
+
+    def clear(self) -> None:
+        """Close every pool, e.g. when the server they connect to changes."""
+        with self._lock:
+            pools = [pool for pool, _ in self._pools.values()]
+            self._pools.clear()
+        for pool in pools:
+            pool.clear()
+
+
+class CredentialMiddleware(Middleware):
+    """FastMCP middleware running each tool call as the ClickHouse user it carries."""
+
+    async def on_call_tool(self, context, call_next):
+        if not get_config().mcp_request_credentials:
+            return await call_next(context)
+        try:
+            credentials = credentials_from_headers(get_http_headers(include_all=True))
+        except ValueError as e:
+            raise ToolError(str(e))
+        if credentials is None:
+            raise ToolError(
+                "ClickHouse credentials are required: send X-ClickHouse-User and "
+                "X-ClickHouse-Key headers or a Basic Authorization header"
+            )
+        token = REQUEST_CREDENTIALS.set(credentials)
+        try:
+            return await call_next(context)
+        finally:
+            REQUEST_CREDENTIALS.reset(token)
@@ -0,0 +1,87 @@
+"""Graceful drain of the HTTP transports on shutdown.
+
+Uvicorn waits for open connections on shutdown, but the SSE streams of the MCP
+transports are closed by sse_starlette as soon as the shutdown signal arrives, which
+cuts off the responses of tool calls still running. `DrainingServer` instead stops
+accepting connections, waits for the MCP requests in flight (counted by
+`InFlightRequests`) to finish, and only then lets the streams close.
+"""
+
+import asyncio
+import logging
+import time
+
+import uvicorn
+from fastmcp.server.middleware import Middleware
+from sse_starlette.sse import AppStatus
+
+logger = logging.getLogger("mcp-clickhouse")
+
+# Time left for the last responses to be written to their streams once no request is
+# in flight any more
+STREAM_FLUSH_SECS = 0.5
+
+
+class InFlightRequests(Middleware):
+    """FastMCP middleware counting the MCP requests being handled."""
+
+    def __init__(self):
+        self.count = 0
+
+    async def on_request(self, context, call_next):
+        self.count += 1
+        try:
+            return await call_next(context)
+        finally:
+            self.count -= 1
+
+
+IN_FLIGHT = InFlightRequests()
+
+
+def _close_streams() -> None:
+    AppStatus.should_exit = True
+    # sse_starlette < 3 waits on an event rather than polling the flag
+    event = getattr(AppStatus, "should_exit_event", None)
+    if event is not None:
+        event.set()
+
+
+class DrainingServer(uvicorn.Server):
+    """Uvicorn server giving in-flight MCP requests the graceful shutdown timeout to finish."""
+
+    def __init__(self, config: uvicorn.Config):
+        super().__init__(config)
+        if hasattr(AppStatus, "disable_automatic_graceful_drain"):
+            AppStatus.disable_automatic_graceful_drain()
+
+    def handle_exit(self, sig, frame) -> None:
+        # Bypass the handler sse_starlette patches into uvicorn, which closes the streams
+        original = AppStatus.original_handler or uvicorn.Server.handle_exit
+        original(self, sig, frame)
+
+    async def shutdown(self, sockets=None) -> None:
+        drain = asyncio.create_task(self._drain())
+        try:
+            await super().shutdown(sockets=sockets)
+        finally:
+            drain.cancel()
+            _close_streams()
+
+    async def _drain(self) -> None:
+        timeout = self.config.timeout_graceful_shutdown
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if IN_FLIGHT.count:
+            logger.info("Waiting for %d in-flight MCP requests", IN_FLIGHT.count)
+        while IN_FLIGHT.count and (deadline is None or time.monotonic() < deadline):
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(STREAM_FLUSH_SECS)
+        _close_streams()
+
+
+def serve(app, drain_timeout_secs: int, **config) -> None:
+    """Run an MCP HTTP app with uvicorn, draining in-flight requests on shutdown."""
+    server_config = uvicorn.Config(
+        app, lifespan="on", timeout_graceful_shutdown=drain_timeout_secs, **config
+    )
+    DrainingServer(server_config).run()
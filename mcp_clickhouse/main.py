@@ -1,13 +1,46 @@
-import os
-from mcp_clickhouse.mcp_server import mcp
+from mcp_clickhouse.drain import serve
+from mcp_clickhouse.mcp_env import TransportType, get_config, get_logging_config
+from mcp_clickhouse.mcp_server import (
+    install_reload_handler,
+    mcp,
+    start_audit_log,
+    start_connection_warmup,
+    start_preview_prewarm,
+    start_read_count_backfill,
+)
+
+
+def main():
+    config = get_config()
+    install_reload_handler()
+    transport = config.mcp_server_transport
+
+    if transport == TransportType.STDIO.value:
+        start_connection_warmup()
+        start_audit_log()
+        start_read_count_backfill()
+        start_preview_prewarm()
+        mcp.run(transport=transport)
+        return
+
+    if config.mcp_workers > 1:
+        from mcp_clickhouse.workers import run_workers
+
+        run_workers(config)
+        return
+
+    start_connection_warmup()
+    start_audit_log()
+    start_read_count_backfill()
+    start_preview_prewarm()
+    serve(
+        mcp.http_app(transport=transport),
+        config.mcp_drain_timeout_secs,
+        host=config.mcp_bind_host,
+        port=config.mcp_bind_port,
+        log_level=get_logging_config().level.lower(),
+    )
+
 
 if __name__ == "__main__":
-    # Get port from Render environment or default to 8000
-    port = int(os.environ.get("PORT", 8000))
-    
-    # Run the server with SSE transport
-    mcp.run(
-        transport="sse",
-        host="0.0.0.0", 
-        port=port
-    )
\ No newline at end of file
+    main()
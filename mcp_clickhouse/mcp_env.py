@@ -1,14 +1,19 @@
 """Environment configuration for the MCP ClickHouse server.
 
 This module handles all environment variable configuration with sensible defaults
-and type conversion.
+and type conversion. The environment is parsed once into immutable snapshots; call
+`reload_config()` to re-read it and atomically swap the active snapshots.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import logging
 import os
-from typing import Optional
+import threading
+from typing import Callable, Mapping, Optional
 from enum import Enum
 
+logger = logging.getLogger("mcp-clickhouse")
+
 
 class TransportType(str, Enum):
     """Supported MCP server transport types."""
@@ -23,12 +28,24 @@ class TransportType(str, Enum):
         return [transport.value for transport in cls]
 
 
-@dataclass
+def _env_bool(environ: Mapping[str, str], name: str, default: str) -> bool:
+    return environ.get(name, default).lower() == "true"
+
+
+def _env_int(environ: Mapping[str, str], name: str, default: str) -> int:
+    value = environ.get(name, default)
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid integer value for {name}: '{value}'") from None
+
+
+@dataclass(frozen=True, slots=True)
 class ClickHouseConfig:
     """Configuration for ClickHouse connection settings.
 
-    This class handles all environment variable configuration with sensible defaults
-    and type conversion. It provides typed methods for accessing each configuration value.
+    Instances are immutable snapshots built by `from_env()`, which parses and validates
+    every environment variable once. Attribute access is a plain slot read.
 
     Required environment variables:
         CLICKHOUSE_HOST: The hostname of the ClickHouse server
@@ -43,131 +60,156 @@ class ClickHouseConfig:
         CLICKHOUSE_SEND_RECEIVE_TIMEOUT: Send/receive timeout in seconds (default: 300)
         CLICKHOUSE_DATABASE: Default database to use (default: None)
         CLICKHOUSE_PROXY_PATH: Path to be added to the host URL. For instance, for servers behind an HTTP proxy (default: None)
+        CLICKHOUSE_POOL_WARM_CONNECTIONS: Connections opened in the background at startup
+            and kept open, at most 8, 0 disables (default: 2)
+        CLICKHOUSE_POOL_KEEPALIVE_SECS: Seconds between pings of the warm connections,
+            below the server's keep-alive timeout (default: 5)
+        CLICKHOUSE_CONNECT_TIMEOUT_MIN_SECS: Lower bound of the connect timeout, which
+            adapts to recent connect latencies below CLICKHOUSE_CONNECT_TIMEOUT; set it
+            to CLICKHOUSE_CONNECT_TIMEOUT to disable adaptation (default: 2)
+        CLICKHOUSE_CIRCUIT_WINDOW: Recent ClickHouse tool calls the circuit breaker
+            judges the server on, 0 disables the breaker (default: 20)
+        CLICKHOUSE_CIRCUIT_MIN_CALLS: Calls in the window before the circuit may open
+            (default: 5)
+        CLICKHOUSE_CIRCUIT_FAILURE_PERCENT: Percentage of failed calls in the window
+            that opens the circuit (default: 50)
+        CLICKHOUSE_CIRCUIT_SLOW_CALL_SECS: Calls slower than this count as failures,
+            0 for none (default: 0)
+        CLICKHOUSE_CIRCUIT_OPEN_SECS: Seconds calls are rejected once the circuit opens,
+            before trial calls are let through (default: 30)
+        CLICKHOUSE_CIRCUIT_HALF_OPEN_CALLS: Trial calls let through at once when the
+            open period ends (default: 1)
         CLICKHOUSE_MCP_SERVER_TRANSPORT: MCP server transport method - "stdio", "http", or "sse" (default: stdio)
         CLICKHOUSE_MCP_BIND_HOST: Host to bind the MCP server to when using HTTP or SSE transport (default: 127.0.0.1)
         CLICKHOUSE_MCP_BIND_PORT: Port to bind the MCP server to when using HTTP or SSE transport (default: 8000)
+        CLICKHOUSE_MCP_WORKERS: Number of server processes for the "http" transport;
+            sessions stick to the worker that created them (default: 1)
+        CLICKHOUSE_MCP_DRAIN_TIMEOUT_SECS: Seconds in-flight requests are given to finish
+            on shutdown when using HTTP or SSE transport (default: 30)
+        CLICKHOUSE_MCP_REQUEST_CREDENTIALS: Run every tool call as the ClickHouse user
+            of its HTTP request headers instead of CLICKHOUSE_USER; requires the "http"
+            or "sse" transport (default: false)
+        CLICKHOUSE_MCP_CREDENTIAL_POOLS: Maximum number of per-user connection pools kept
+            with request credentials, least recently used evicted first (default: 64)
+        CLICKHOUSE_MCP_CREDENTIAL_POOL_IDLE_SECS: Seconds after which the connection pool
+            of an idle user is closed, 0 for never (default: 600)
+        CLICKHOUSE_MCP_QUERY_RATE_PER_MIN: Sustained query tool calls allowed per minute
+            and session, 0 disables the limit (default: 120)
+        CLICKHOUSE_MCP_QUERY_BURST: Query tool calls a session may make at once before
+            the rate applies (default: 30)
+        CLICKHOUSE_MCP_METADATA_RATE_PER_MIN: Sustained metadata tool calls allowed per
+            minute and session, 0 disables the limit (default: 600)
+        CLICKHOUSE_MCP_METADATA_BURST: Metadata tool calls a session may make at once
+            before the rate applies (default: 100)
         CLICKHOUSE_ENABLED: Enable ClickHouse server (default: true)
+        CLICKHOUSE_SCHEMA_INDEX_REFRESH_SECS: Minimum age in seconds of the schema search
+            index before it is refreshed in the background (default: 60)
+        CLICKHOUSE_QUERY_MAX_EXECUTION_TIME: Server-side limit in seconds on the run time
+            of run_select_query queries, 0 for none (default: 30)
+        CLICKHOUSE_QUERY_MAX_MEMORY_USAGE: Memory limit in bytes of a query, 0 for the
+            server's default (default: 0)
+        CLICKHOUSE_QUERY_MAX_ROWS_TO_READ: Maximum rows a query may read, 0 for no limit
+            (default: 0)
+        CLICKHOUSE_QUERY_MAX_BYTES_TO_READ: Maximum uncompressed bytes a query may read,
+            0 for no limit (default: 0)
+        CLICKHOUSE_QUERY_MAX_THREADS: Maximum threads of a query, 0 for the server's
+            default (default: 0)
+        CLICKHOUSE_QUERY_TIMEOUT_OVERFLOW_MODE: What a query over a limit does - "throw"
+            an error or "break" and return the rows read so far (default: throw)
+        CLICKHOUSE_QUERY_CACHE: Use the server's query cache for eligible
+            run_select_query queries on ClickHouse 23.5 and later (default: false)
+        CLICKHOUSE_QUERY_CACHE_TTL_SECS: Seconds a cached query result stays valid
+            (default: 60)
+        CLICKHOUSE_QUERY_CACHE_MIN_DURATION_MS: Only store the results of queries that
+            ran at least this many milliseconds (default: 0)
+        CLICKHOUSE_JOBS_MAX: Maximum number of query jobs kept, finished or not (default: 100)
+        CLICKHOUSE_JOBS_TTL_SECS: Seconds a finished query job and its result are kept
+            (default: 3600)
+        CLICKHOUSE_JOBS_MAX_EXECUTION_TIME: Server-side limit in seconds on the run time
+            of query jobs, replacing CLICKHOUSE_QUERY_MAX_EXECUTION_TIME, 0 for none
+            (default: 3600)
+        CLICKHOUSE_JOBS_MAX_RESULT_BYTES: Maximum size in bytes of the result a query
+            job spills to disk; rows beyond it are dropped, 0 disables (default: 1073741824)
+        CLICKHOUSE_JOBS_DIR: Directory query job results are spilled to
+            (default: mcp-clickhouse-jobs in the system's temporary directory)
+        CLICKHOUSE_MAX_CELL_CHARS: Maximum characters of a single value in a query
+            result; longer values are truncated, 0 disables (default: 2000)
+        CLICKHOUSE_MAX_RESULT_BYTES: Approximate maximum size in bytes of the rows of a
+            query result; rows beyond it are dropped, 0 disables (default: 1000000)
+        CLICKHOUSE_PREVIEW_CACHE_TTL_SECS: Lifetime in seconds of cached table previews
+            and column values (default: 300)
+        CLICKHOUSE_PREVIEW_PREWARM_TABLES: Number of tables whose previews are computed
+            in the background, 0 disables (default: 0)
+        CLICKHOUSE_PREVIEW_PREWARM_BY: Pick the pre-warmed tables by "size" (largest on
+            disk) or "queries" (most queried in the last day per system.query_log)
+            (default: size)
+        CLICKHOUSE_SCHEMA_CACHE_DIR: Directory of the on-disk schema snapshot used to
+            answer list_tables in a fresh process (default: unset, no snapshot)
+        CLICKHOUSE_QUERY_STATS_MAX_FINGERPRINTS: Query fingerprints whose statistics are
+            kept for query_stats and /metrics, 0 disables them (default: 1000)
+        CLICKHOUSE_METRICS_TOP_FINGERPRINTS: Query fingerprints, with the most total
+            time, exported by /metrics (default: 50)
     """
 
-    def __init__(self):
-        """Initialize the configuration from environment variables."""
-        if self.enabled:
-            self._validate_required_vars()
-
-    @property
-    def enabled(self) -> bool:
-        """Get whether ClickHouse server is enabled.
-
-        Default: True
-        """
-        return os.getenv("CLICKHOUSE_ENABLED", "true").lower() == "true"
-
-    @property
-    def host(self) -> str:
-        """Get the ClickHouse host."""
-        return os.environ["CLICKHOUSE_HOST"]
-
-    @property
-    def port(self) -> int:
-        """Get the ClickHouse port.
-
-        Defaults to 8443 if secure=True, 8123 if secure=False.
-        Can be overridden by CLICKHOUSE_PORT environment variable.
-        """
-        if "CLICKHOUSE_PORT" in os.environ:
-            return int(os.environ["CLICKHOUSE_PORT"])
-        return 8443 if self.secure else 8123
-
-    @property
-    def username(self) -> str:
-        """Get the ClickHouse username."""
-        return os.environ["CLICKHOUSE_USER"]
-
-    @property
-    def password(self) -> str:
-        """Get the ClickHouse password."""
-        return os.environ["CLICKHOUSE_PASSWORD"]
-
-    @property
-    def database(self) -> Optional[str]:
-        """Get the default database name if set."""
-        return os.getenv("CLICKHOUSE_DATABASE")
-
-    @property
-    def secure(self) -> bool:
-        """Get whether HTTPS is enabled.
-
-        Default: True
-        """
-        return os.getenv("CLICKHOUSE_SECURE", "true").lower() == "true"
-
-    @property
-    def verify(self) -> bool:
-        """Get whether SSL certificate verification is enabled.
-
-        Default: True
-        """
-        return os.getenv("CLICKHOUSE_VERIFY", "true").lower() == "true"
-
-    @property
-    def connect_timeout(self) -> int:
-        """Get the connection timeout in seconds.
-
-        Default: 30
-        """
-        return int(os.getenv("CLICKHOUSE_CONNECT_TIMEOUT", "30"))
-
-    @property
-    def send_receive_timeout(self) -> int:
-        """Get the send/receive timeout in seconds.
-
-        Default: 300 (ClickHouse default)
-        """
-        return int(os.getenv("CLICKHOUSE_SEND_RECEIVE_TIMEOUT", "300"))
-
-    @property
-    def proxy_path(self) -> str:
-        return os.getenv("CLICKHOUSE_PROXY_PATH")
-
-    @property
-    def mcp_server_transport(self) -> str:
-        """Get the MCP server transport method.
-
-        Valid options: "stdio", "http", "sse"
-        Default: "stdio"
-        """
-        transport = os.getenv("CLICKHOUSE_MCP_SERVER_TRANSPORT", TransportType.STDIO.value).lower()
-
-        # Validate transport type
-        if transport not in TransportType.values():
-            valid_options = ", ".join(f'"{t}"' for t in TransportType.values())
-            raise ValueError(f"Invalid transport '{transport}'. Valid options: {valid_options}")
-        return transport
-
-    @property
-    def mcp_bind_host(self) -> str:
-        """Get the host to bind the MCP server to.
-
-        Only used when transport is "http" or "sse".
-        Default: "127.0.0.1"
-        """
-        return os.getenv("CLICKHOUSE_MCP_BIND_HOST", "127.0.0.1")
-
-    @property
-    def mcp_bind_port(self) -> int:
-        """Get the port to bind the MCP server to.
-
-        Only used when transport is "http" or "sse".
-        Default: 8000
-        """
-        return int(os.getenv("CLICKHOUSE_MCP_BIND_PORT", "8000"))
-
-    def get_client_config(self) -> dict:
-        """Get the configuration dictionary for clickhouse_connect client.
-
-        Returns:
-            dict: Configuration ready to be passed to clickhouse_connect.get_client()
-        """
+    enabled: bool = True
+    host: str = ""
+    port: int = 8443
+    username: str = ""
+    password: str = field(default="", repr=False)
+    database: Optional[str] = None
+    secure: bool = True
+    verify: bool = True
+    connect_timeout: int = 30
+    send_receive_timeout: int = 300
+    proxy_path: Optional[str] = None
+    pool_warm_connections: int = 2
+    pool_keepalive_secs: int = 5
+    connect_timeout_min_secs: int = 2
+    circuit_window: int = 20
+    circuit_min_calls: int = 5
+    circuit_failure_percent: int = 50
+    circuit_slow_call_secs: int = 0
+    circuit_open_secs: int = 30
+    circuit_half_open_calls: int = 1
+    mcp_server_transport: str = TransportType.STDIO.value
+    mcp_bind_host: str = "127.0.0.1"
+    mcp_bind_port: int = 8000
+    mcp_workers: int = 1
+    mcp_drain_timeout_secs: int = 30
+    mcp_request_credentials: bool = False
+    mcp_credential_pools: int = 64
+    mcp_credential_pool_idle_secs: int = 600
+    mcp_query_rate_per_min: int = 120
+    mcp_query_burst: int = 30
+    mcp_metadata_rate_per_min: int = 600
+    mcp_metadata_burst: int = 100
+    schema_index_refresh_secs: int = 60
+    query_max_execution_time: int = 30
+    query_max_memory_usage: int = 0
+    query_max_rows_to_read: int = 0
+    query_max_bytes_to_read: int = 0
+    query_max_threads: int = 0
+    query_timeout_overflow_mode: str = "throw"
+    query_cache: bool = False
+    query_cache_ttl_secs: int = 60
+    query_cache_min_duration_ms: int = 0
+    jobs_max: int = 100
+    jobs_ttl_secs: int = 3600
+    jobs_max_execution_time: int = 3600
+    jobs_max_result_bytes: int = 1 << 30
+    jobs_dir: Optional[str] = None
+    max_cell_chars: int = 2000
+    max_result_bytes: int = 1_000_000
+    preview_cache_ttl_secs: int = 300
+    preview_prewarm_tables: int = 0
+    preview_prewarm_by: str = "size"
+    schema_cache_dir: Optional[str] = None
+    query_stats_max_fingerprints: int = 1000
+    metrics_top_fingerprints: int = 50
+    _client_config: dict = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Build the clickhouse_connect client configuration once per snapshot."""
         config = {
             "host": self.host,
             "port": self.port,
@@ -187,9 +229,188 @@ class ClickHouseConfig:
         if self.proxy_path:
             config["proxy_path"] = self.proxy_path
 
-        return config
+        object.__setattr__(self, "_client_config", config)
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "ClickHouseConfig":
+        """Parse and validate a configuration snapshot from the environment.
+
+        Args:
+            environ: Mapping to read variables from. Defaults to os.environ.
 
-    def _validate_required_vars(self) -> None:
+        Raises:
+            ValueError: If a required variable is missing or a value is invalid.
+        """
+        if environ is None:
+            environ = os.environ
+
+        enabled = _env_bool(environ, "CLICKHOUSE_ENABLED", "true")
+        if enabled:
+            cls._validate_required_vars(environ)
+
+        secure = _env_bool(environ, "CLICKHOUSE_SECURE", "true")
+        if "CLICKHOUSE_PORT" in environ:
+            port = _env_int(environ, "CLICKHOUSE_PORT", "")
+        else:
+            port = 8443 if secure else 8123
+
+        transport = environ.get(
+            "CLICKHOUSE_MCP_SERVER_TRANSPORT", TransportType.STDIO.value
+        ).lower()
+        if transport not in TransportType.values():
+            valid_options = ", ".join(f'"{t}"' for t in TransportType.values())
+            raise ValueError(f"Invalid transport '{transport}'. Valid options: {valid_options}")
+
+        workers = _env_int(environ, "CLICKHOUSE_MCP_WORKERS", "1")
+        if workers < 1:
+            raise ValueError(f"Invalid CLICKHOUSE_MCP_WORKERS '{workers}': must be at least 1")
+        if workers > 1 and transport != TransportType.HTTP.value:
+            raise ValueError(
+                f"CLICKHOUSE_MCP_WORKERS above 1 requires the \"http\" transport, got '{transport}'"
+            )
+
+        request_credentials = _env_bool(environ, "CLICKHOUSE_MCP_REQUEST_CREDENTIALS", "false")
+        if request_credentials and transport == TransportType.STDIO.value:
+            raise ValueError(
+                'CLICKHOUSE_MCP_REQUEST_CREDENTIALS requires the "http" or "sse" transport'
+            )
+        credential_pools = _env_int(environ, "CLICKHOUSE_MCP_CREDENTIAL_POOLS", "64")
+        if credential_pools < 1:
+            raise ValueError(
+                f"Invalid CLICKHOUSE_MCP_CREDENTIAL_POOLS '{credential_pools}': must be at least 1"
+            )
+
+        warm_connections = _env_int(environ, "CLICKHOUSE_POOL_WARM_CONNECTIONS", "2")
+        if not 0 <= warm_connections <= 8:
+            raise ValueError(
+                f"Invalid CLICKHOUSE_POOL_WARM_CONNECTIONS '{warm_connections}': "
+                "must be between 0 and 8"
+            )
+
+        failure_percent = _env_int(environ, "CLICKHOUSE_CIRCUIT_FAILURE_PERCENT", "50")
+        if not 1 <= failure_percent <= 100:
+            raise ValueError(
+                f"Invalid CLICKHOUSE_CIRCUIT_FAILURE_PERCENT '{failure_percent}': "
+                "must be between 1 and 100"
+            )
+
+        prewarm_by = environ.get("CLICKHOUSE_PREVIEW_PREWARM_BY", "size").lower()
+        if prewarm_by not in ("size", "queries"):
+            raise ValueError(
+                f"Invalid CLICKHOUSE_PREVIEW_PREWARM_BY '{prewarm_by}'. Valid options: size, queries"
+            )
+
+        overflow_mode = environ.get("CLICKHOUSE_QUERY_TIMEOUT_OVERFLOW_MODE", "throw").lower()
+        if overflow_mode not in ("throw", "break"):
+            raise ValueError(
+                f"Invalid CLICKHOUSE_QUERY_TIMEOUT_OVERFLOW_MODE '{overflow_mode}'. "
+                "Valid options: throw, break"
+            )
+
+        return cls(
+            enabled=enabled,
+            host=environ.get("CLICKHOUSE_HOST", ""),
+            port=port,
+            username=environ.get("CLICKHOUSE_USER", ""),
+            password=environ.get("CLICKHOUSE_PASSWORD", ""),
+            database=environ.get("CLICKHOUSE_DATABASE"),
+            secure=secure,
+            verify=_env_bool(environ, "CLICKHOUSE_VERIFY", "true"),
+            connect_timeout=_env_int(environ, "CLICKHOUSE_CONNECT_TIMEOUT", "30"),
+            send_receive_timeout=_env_int(environ, "CLICKHOUSE_SEND_RECEIVE_TIMEOUT", "300"),
+            proxy_path=environ.get("CLICKHOUSE_PROXY_PATH"),
+            pool_warm_connections=warm_connections,
+            pool_keepalive_secs=_env_int(environ, "CLICKHOUSE_POOL_KEEPALIVE_SECS", "5"),
+            connect_timeout_min_secs=_env_int(environ, "CLICKHOUSE_CONNECT_TIMEOUT_MIN_SECS", "2"),
+            circuit_window=_env_int(environ, "CLICKHOUSE_CIRCUIT_WINDOW", "20"),
+            circuit_min_calls=_env_int(environ, "CLICKHOUSE_CIRCUIT_MIN_CALLS", "5"),
+            circuit_failure_percent=failure_percent,
+            circuit_slow_call_secs=_env_int(environ, "CLICKHOUSE_CIRCUIT_SLOW_CALL_SECS", "0"),
+            circuit_open_secs=_env_int(environ, "CLICKHOUSE_CIRCUIT_OPEN_SECS", "30"),
+            circuit_half_open_calls=_env_int(environ, "CLICKHOUSE_CIRCUIT_HALF_OPEN_CALLS", "1"),
+            mcp_server_transport=transport,
+            mcp_bind_host=environ.get("CLICKHOUSE_MCP_BIND_HOST", "127.0.0.1"),
+            mcp_bind_port=_env_int(environ, "CLICKHOUSE_MCP_BIND_PORT", "8000"),
+            mcp_workers=workers,
+            mcp_drain_timeout_secs=_env_int(environ, "CLICKHOUSE_MCP_DRAIN_TIMEOUT_SECS", "30"),
+            mcp_request_credentials=request_credentials,
+            mcp_credential_pools=credential_pools,
+            mcp_credential_pool_idle_secs=_env_int(
+                environ, "CLICKHOUSE_MCP_CREDENTIAL_POOL_IDLE_SECS", "600"
+            ),
+            mcp_query_rate_per_min=_env_int(environ, "CLICKHOUSE_MCP_QUERY_RATE_PER_MIN", "120"),
+            mcp_query_burst=_env_int(environ, "CLICKHOUSE_MCP_QUERY_BURST", "30"),
+            mcp_metadata_rate_per_min=_env_int(
+                environ, "CLICKHOUSE_MCP_METADATA_RATE_PER_MIN", "600"
+            ),
+            mcp_metadata_burst=_env_int(environ, "CLICKHOUSE_MCP_METADATA_BURST", "100"),
+            schema_index_refresh_secs=_env_int(
+                environ, "CLICKHOUSE_SCHEMA_INDEX_REFRESH_SECS", "60"
+            ),
+            query_max_execution_time=_env_int(environ, "CLICKHOUSE_QUERY_MAX_EXECUTION_TIME", "30"),
+            query_max_memory_usage=_env_int(environ, "CLICKHOUSE_QUERY_MAX_MEMORY_USAGE", "0"),
+            query_max_rows_to_read=_env_int(environ, "CLICKHOUSE_QUERY_MAX_ROWS_TO_READ", "0"),
+            query_max_bytes_to_read=_env_int(environ, "CLICKHOUSE_QUERY_MAX_BYTES_TO_READ", "0"),
+            query_max_threads=_env_int(environ, "CLICKHOUSE_QUERY_MAX_THREADS", "0"),
+            query_timeout_overflow_mode=overflow_mode,
+            query_cache=_env_bool(environ, "CLICKHOUSE_QUERY_CACHE", "false"),
+            query_cache_ttl_secs=_env_int(environ, "CLICKHOUSE_QUERY_CACHE_TTL_SECS", "60"),
+            query_cache_min_duration_ms=_env_int(
+                environ, "CLICKHOUSE_QUERY_CACHE_MIN_DURATION_MS", "0"
+            ),
+            jobs_max=_env_int(environ, "CLICKHOUSE_JOBS_MAX", "100"),
+            jobs_ttl_secs=_env_int(environ, "CLICKHOUSE_JOBS_TTL_SECS", "3600"),
+            jobs_max_execution_time=_env_int(environ, "CLICKHOUSE_JOBS_MAX_EXECUTION_TIME", "3600"),
+            jobs_max_result_bytes=_env_int(
+                environ, "CLICKHOUSE_JOBS_MAX_RESULT_BYTES", str(1 << 30)
+            ),
+            jobs_dir=environ.get("CLICKHOUSE_JOBS_DIR") or None,
+            max_cell_chars=_env_int(environ, "CLICKHOUSE_MAX_CELL_CHARS", "2000"),
+            max_result_bytes=_env_int(environ, "CLICKHOUSE_MAX_RESULT_BYTES", "1000000"),
+            preview_cache_ttl_secs=_env_int(environ, "CLICKHOUSE_PREVIEW_CACHE_TTL_SECS", "300"),
+            preview_prewarm_tables=_env_int(environ, "CLICKHOUSE_PREVIEW_PREWARM_TABLES", "0"),
+            preview_prewarm_by=prewarm_by,
+            schema_cache_dir=environ.get("CLICKHOUSE_SCHEMA_CACHE_DIR") or None,
+            query_stats_max_fingerprints=_env_int(
+                environ, "CLICKHOUSE_QUERY_STATS_MAX_FINGERPRINTS", "1000"
+            ),
+            metrics_top_fingerprints=_env_int(environ, "CLICKHOUSE_METRICS_TOP_FINGERPRINTS", "50"),
+        )
+
+    def get_client_config(self) -> dict:
+        """Get the configuration dictionary for clickhouse_connect client.
+
+        Returns:
+            dict: Configuration ready to be passed to clickhouse_connect.get_client()
+        """
+        return dict(self._client_config)
+
+    def get_query_limits(self) -> dict:
+        """Get the resource profile applied to queries, as ClickHouse settings.
+
+        Limits set to 0 are left out, so the server's own defaults apply.
+        """
+        limits = {
+            "max_execution_time": self.query_max_execution_time,
+            "max_memory_usage": self.query_max_memory_usage,
+            "max_rows_to_read": self.query_max_rows_to_read,
+            "max_bytes_to_read": self.query_max_bytes_to_read,
+            "max_threads": self.query_max_threads,
+        }
+        limits = {name: value for name, value in limits.items() if value > 0}
+        limits["timeout_overflow_mode"] = self.query_timeout_overflow_mode
+        return limits
+
+    def get_job_limits(self) -> dict:
+        """Get the resource profile of query jobs, which may run for longer."""
+        limits = self.get_query_limits()
+        limits.pop("max_execution_time", None)
+        if self.jobs_max_execution_time > 0:
+            limits["max_execution_time"] = self.jobs_max_execution_time
+        return limits
+
+    @staticmethod
+    def _validate_required_vars(environ: Mapping[str, str]) -> None:
         """Validate that all required environment variables are set.
 
         Raises:
@@ -197,41 +418,48 @@ class ClickHouseConfig:
         """
         missing_vars = []
         for var in ["CLICKHOUSE_HOST", "CLICKHOUSE_USER", "CLICKHOUSE_PASSWORD"]:
-            if var not in os.environ:
+            if var not in environ:
                 missing_vars.append(var)
 
         if missing_vars:
             raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ChDBConfig:
     """Configuration for chDB connection settings.
 
-    This class handles all environment variable configuration with sensible defaults
-    and type conversion. It provides typed methods for accessing each configuration value.
+    Instances are immutable snapshots built by `from_env()`.
 
-    Required environment variables:
-        CHDB_DATA_PATH: The path to the chDB data directory (only required if CHDB_ENABLED=true)
+    Optional environment variables (with defaults):
+        CHDB_ENABLED: Enable chDB (default: false)
+        CHDB_DATA_PATH: The path to the chDB data directory (default: :memory:)
+        CHDB_SCRATCH_MAX_BYTES: Total uncompressed bytes of the ClickHouse results
+            materialized as chDB scratch tables (default: 1073741824)
+        CHDB_SCRATCH_IDLE_TTL_SECS: Seconds a scratch table may go unused before it is
+            dropped, 0 for never (default: 1800)
     """
 
-    def __init__(self):
-        """Initialize the configuration from environment variables."""
-        if self.enabled:
-            self._validate_required_vars()
+    enabled: bool = False
+    data_path: str = ":memory:"
+    scratch_max_bytes: int = 1 << 30
+    scratch_idle_ttl_secs: int = 1800
 
-    @property
-    def enabled(self) -> bool:
-        """Get whether chDB is enabled.
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "ChDBConfig":
+        """Parse a configuration snapshot from the environment.
 
-        Default: False
+        Args:
+            environ: Mapping to read variables from. Defaults to os.environ.
         """
-        return os.getenv("CHDB_ENABLED", "false").lower() == "true"
-
-    @property
-    def data_path(self) -> str:
-        """Get the chDB data path."""
-        return os.getenv("CHDB_DATA_PATH", ":memory:")
+        if environ is None:
+            environ = os.environ
+        return cls(
+            enabled=_env_bool(environ, "CHDB_ENABLED", "false"),
+            data_path=environ.get("CHDB_DATA_PATH", ":memory:"),
+            scratch_max_bytes=_env_int(environ, "CHDB_SCRATCH_MAX_BYTES", str(1 << 30)),
+            scratch_idle_ttl_secs=_env_int(environ, "CHDB_SCRATCH_IDLE_TTL_SECS", "1800"),
+        )
 
     def get_client_config(self) -> dict:
         """Get the configuration dictionary for chDB client.
@@ -243,30 +471,168 @@ class ChDBConfig:
             "data_path": self.data_path,
         }
 
-    def _validate_required_vars(self) -> None:
-        """Validate that all required environment variables are set.
+
+def _parse_sample_rates(value: str) -> dict[str, float]:
+    rates = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        event, sep, rate = item.partition("=")
+        try:
+            parsed = float(rate)
+        except ValueError:
+            parsed = -1.0
+        if not sep or not event.strip() or not 0.0 <= parsed <= 1.0:
+            raise ValueError(
+                f"Invalid CLICKHOUSE_LOG_SAMPLE_RATES entry '{item}'. "
+                "Expected event=rate with a rate between 0 and 1"
+            )
+        rates[event.strip()] = parsed
+    return rates
+
+
+@dataclass(frozen=True, slots=True)
+class LoggingConfig:
+    """Configuration for server logging, auditing and tracing.
+
+    Optional environment variables (with defaults):
+        CLICKHOUSE_LOG_LEVEL: Root log level (default: INFO)
+        CLICKHOUSE_LOG_FORMAT: "text" or "json" (default: text)
+        CLICKHOUSE_LOG_QUERY_MAX_CHARS: Query text is truncated to this many characters
+            in log records (default: 200)
+        CLICKHOUSE_LOG_SAMPLE_RATES: Comma-separated event=rate pairs, e.g.
+            "query.start=0.1,query.done=0.1" (default: every event is logged)
+        CLICKHOUSE_AUDIT_SINKS: Comma-separated destinations of the audit log of tool
+            calls - "file", "chdb" and/or "clickhouse"; empty disables it (default: empty)
+        CLICKHOUSE_AUDIT_DIR: Directory of the rotating audit files of the "file" sink
+        CLICKHOUSE_AUDIT_FILE_MAX_BYTES: Size at which an audit file is rotated
+            (default: 67108864)
+        CLICKHOUSE_AUDIT_FILE_BACKUPS: Rotated audit files kept per process (default: 5)
+        CLICKHOUSE_AUDIT_TABLE: Table the "chdb" and "clickhouse" sinks insert into
+            (default: mcp_audit.tool_calls)
+        CLICKHOUSE_AUDIT_QUEUE_SIZE: Audit records buffered in memory; records beyond it
+            are dropped and counted (default: 10000)
+        CLICKHOUSE_AUDIT_FLUSH_SECS: Seconds between flushes of the audit buffer
+            (default: 5)
+        CLICKHOUSE_AUDIT_BATCH_SIZE: Buffered records that trigger a flush before the
+            interval (default: 1000)
+        CLICKHOUSE_TRACING_EXPORTER: Where OpenTelemetry spans go - "none", "console"
+            (stderr), "file", "otlp", or "module:factory" for a callable returning a
+            SpanExporter; requires opentelemetry-sdk unless "none" (default: none)
+        CLICKHOUSE_TRACING_FILE: File spans are appended to as JSON lines with the
+            "file" exporter
+    """
+
+    level: str = "INFO"
+    format: str = "text"
+    query_max_chars: int = 200
+    sample_rates: dict = field(default_factory=dict, compare=False)
+    audit_sinks: tuple = ()
+    audit_dir: Optional[str] = None
+    audit_file_max_bytes: int = 64 << 20
+    audit_file_backups: int = 5
+    audit_table: str = "mcp_audit.tool_calls"
+    audit_queue_size: int = 10000
+    audit_flush_secs: int = 5
+    audit_batch_size: int = 1000
+    tracing_exporter: str = "none"
+    tracing_file: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "LoggingConfig":
+        """Parse and validate a configuration snapshot from the environment.
+
+        Args:
+            environ: Mapping to read variables from. Defaults to os.environ.
 
         Raises:
-            ValueError: If any required environment variable is missing.
+            ValueError: If a value is invalid.
         """
-        pass
+        if environ is None:
+            environ = os.environ
+
+        level = environ.get("CLICKHOUSE_LOG_LEVEL", "INFO").upper()
+        if level not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+            raise ValueError(f"Invalid CLICKHOUSE_LOG_LEVEL '{level}'")
+
+        log_format = environ.get("CLICKHOUSE_LOG_FORMAT", "text").lower()
+        if log_format not in ("text", "json"):
+            raise ValueError(
+                f"Invalid CLICKHOUSE_LOG_FORMAT '{log_format}'. Valid options: text, json"
+            )
+
+        audit_sinks = tuple(
+            sink.strip().lower()
+            for sink in environ.get("CLICKHOUSE_AUDIT_SINKS", "").split(",")
+            if sink.strip()
+        )
+        unknown_sinks = sorted(set(audit_sinks) - {"file", "chdb", "clickhouse"})
+        if unknown_sinks:
+            raise ValueError(
+                f"Invalid CLICKHOUSE_AUDIT_SINKS '{', '.join(unknown_sinks)}'. "
+                "Valid options: file, chdb, clickhouse"
+            )
+        audit_dir = environ.get("CLICKHOUSE_AUDIT_DIR") or None
+        if "file" in audit_sinks and audit_dir is None:
+            raise ValueError('CLICKHOUSE_AUDIT_SINKS "file" requires CLICKHOUSE_AUDIT_DIR')
+        for name in ("CLICKHOUSE_AUDIT_QUEUE_SIZE", "CLICKHOUSE_AUDIT_BATCH_SIZE"):
+            if _env_int(environ, name, "1") < 1:
+                raise ValueError(f"Invalid {name} '{environ[name]}': must be at least 1")
+
+        tracing_exporter = environ.get("CLICKHOUSE_TRACING_EXPORTER", "none").strip() or "none"
+        if tracing_exporter.lower() in ("none", "console", "file", "otlp"):
+            tracing_exporter = tracing_exporter.lower()
+        elif ":" not in tracing_exporter:
+            raise ValueError(
+                f"Invalid CLICKHOUSE_TRACING_EXPORTER '{tracing_exporter}'. "
+                "Valid options: none, console, file, otlp, module:factory"
+            )
+        tracing_file = environ.get("CLICKHOUSE_TRACING_FILE") or None
+        if tracing_exporter == "file" and tracing_file is None:
+            raise ValueError('CLICKHOUSE_TRACING_EXPORTER "file" requires CLICKHOUSE_TRACING_FILE')
+
+        return cls(
+            level=level,
+            format=log_format,
+            query_max_chars=_env_int(environ, "CLICKHOUSE_LOG_QUERY_MAX_CHARS", "200"),
+            sample_rates=_parse_sample_rates(environ.get("CLICKHOUSE_LOG_SAMPLE_RATES", "")),
+            audit_sinks=audit_sinks,
+            audit_dir=audit_dir,
+            audit_file_max_bytes=_env_int(
+                environ, "CLICKHOUSE_AUDIT_FILE_MAX_BYTES", str(64 << 20)
+            ),
+            audit_file_backups=_env_int(environ, "CLICKHOUSE_AUDIT_FILE_BACKUPS", "5"),
+            audit_table=environ.get("CLICKHOUSE_AUDIT_TABLE", "mcp_audit.tool_calls"),
+            audit_queue_size=_env_int(environ, "CLICKHOUSE_AUDIT_QUEUE_SIZE", "10000"),
+            audit_flush_secs=_env_int(environ, "CLICKHOUSE_AUDIT_FLUSH_SECS", "5"),
+            audit_batch_size=_env_int(environ, "CLICKHOUSE_AUDIT_BATCH_SIZE", "1000"),
+            tracing_exporter=tracing_exporter,
+            tracing_file=tracing_file,
+        )
 
 
 # Global instance placeholders for the singleton pattern
 _CONFIG_INSTANCE = None
 _CHDB_CONFIG_INSTANCE = None
+_LOGGING_CONFIG_INSTANCE = None
+_CONFIG_LOCK = threading.Lock()
+_RELOAD_CALLBACKS: list[Callable[[Optional[ClickHouseConfig], ClickHouseConfig], None]] = []
 
 
-def get_config():
+def get_config() -> ClickHouseConfig:
     """
     Gets the singleton instance of ClickHouseConfig.
     Instantiates it on the first call.
     """
     global _CONFIG_INSTANCE
-    if _CONFIG_INSTANCE is None:
-        # Instantiate the config object here, ensuring load_dotenv() has likely run
-        _CONFIG_INSTANCE = ClickHouseConfig()
-    return _CONFIG_INSTANCE
+    config = _CONFIG_INSTANCE
+    if config is None:
+        with _CONFIG_LOCK:
+            if _CONFIG_INSTANCE is None:
+                # Instantiate the config object here, ensuring load_dotenv() has likely run
+                _CONFIG_INSTANCE = ClickHouseConfig.from_env()
+            config = _CONFIG_INSTANCE
+    return config
 
 
 def get_chdb_config() -> ChDBConfig:
@@ -278,6 +644,72 @@ def get_chdb_config() -> ChDBConfig:
         ChDBConfig: The chDB configuration instance
     """
     global _CHDB_CONFIG_INSTANCE
-    if _CHDB_CONFIG_INSTANCE is None:
-        _CHDB_CONFIG_INSTANCE = ChDBConfig()
-    return _CHDB_CONFIG_INSTANCE
+    config = _CHDB_CONFIG_INSTANCE
+    if config is None:
+        with _CONFIG_LOCK:
+            if _CHDB_CONFIG_INSTANCE is None:
+                _CHDB_CONFIG_INSTANCE = ChDBConfig.from_env()
+            config = _CHDB_CONFIG_INSTANCE
+    return config
+
+
+def get_logging_config() -> LoggingConfig:
+    """
+    Gets the singleton instance of LoggingConfig.
+    Instantiates it on the first call.
+
+    Returns:
+        LoggingConfig: The logging configuration instance
+    """
+    global _LOGGING_CONFIG_INSTANCE
+    config = _LOGGING_CONFIG_INSTANCE
+    if config is None:
+        with _CONFIG_LOCK:
+            if _LOGGING_CONFIG_INSTANCE is None:
+                _LOGGING_CONFIG_INSTANCE = LoggingConfig.from_env()
+            config = _LOGGING_CONFIG_INSTANCE
+    return config
+
+
+def on_config_reload(
+    callback: Callable[[Optional[ClickHouseConfig], ClickHouseConfig], None],
+) -> Callable[[Optional[ClickHouseConfig], ClickHouseConfig], None]:
+    """Register a callback invoked with (old, new) after every successful reload.
+
+    Can be used as a decorator. Callbacks run on the reloading thread after the new
+    snapshot is visible, so they can drain or rebuild anything derived from the old one.
+    A callback that raises is logged and does not stop the others.
+    """
+    _RELOAD_CALLBACKS.append(callback)
+    return callback
+
+
+def reload_config() -> ClickHouseConfig:
+    """Re-read the environment and atomically swap the configuration snapshots.
+
+    The new snapshots are fully parsed and validated before the swap, so an invalid
+    environment leaves the current configuration in place.
+
+    Returns:
+        ClickHouseConfig: The newly active configuration.
+
+    Raises:
+        ValueError: If the new environment is invalid.
+    """
+    global _CONFIG_INSTANCE, _CHDB_CONFIG_INSTANCE, _LOGGING_CONFIG_INSTANCE
+    new_config = ClickHouseConfig.from_env()
+    new_chdb_config = ChDBConfig.from_env()
+    new_logging_config = LoggingConfig.from_env()
+    with _CONFIG_LOCK:
+        old_config = _CONFIG_INSTANCE
+        _CONFIG_INSTANCE = new_config
+        _CHDB_CONFIG_INSTANCE = new_chdb_config
+        _LOGGING_CONFIG_INSTANCE = new_logging_config
+
+    for callback in list(_RELOAD_CALLBACKS):
+        try:
+            callback(old_config, new_config)
+        except Exception as e:
+            name = getattr(callback, "__qualname__", repr(callback))
+            logger.error(f"Configuration reload callback {name} failed: {e}")
+    return new_config
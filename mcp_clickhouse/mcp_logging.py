@@ -0,0 +1,170 @@
+"""Low-overhead structured logging for the MCP ClickHouse server.
+
+Log records are handed to a background thread through a bounded queue, so the calling
+thread never formats messages or writes to stderr. Hot-path events go through
+`log_event()`, which checks the level and per-event sample rate before allocating
+anything, and renders its fields (including truncated query text and its fingerprint)
+only when the record is finally formatted.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from mcp_clickhouse.mcp_env import get_logging_config
+from mcp_clickhouse.sql_fingerprint import query_fingerprint
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_QUEUE_SIZE = 10000
+
+_LISTENER: Optional[QueueListener] = None
+
+
+class QueryText:
+    """Query text that is whitespace-collapsed and truncated only when rendered."""
+
+    __slots__ = ("query", "max_chars")
+
+    def __init__(self, query: str, max_chars: Optional[int] = None):
+        self.query = query
+        self.max_chars = max_chars
+
+    @property
+    def fingerprint(self) -> str:
+        return query_fingerprint(self.query)
+
+    def __str__(self) -> str:
+        max_chars = self.max_chars
+        if max_chars is None:
+            max_chars = get_logging_config().query_max_chars
+        # Only the prefix that can be shown is whitespace-collapsed, so rendering cost
+        # does not grow with the size of the query.
+        text = " ".join(self.query[: max_chars * 2].split())
+        if len(text) > max_chars or len(self.query) > max_chars * 2:
+            return f"{text[:max_chars]}... ({len(self.query)} chars)"
+        return text
+
+
+class LogEvent:
+    """A named event with key/value fields, rendered lazily as logfmt or a dict."""
+
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event: str, fields: dict[str, Any]):
+        self.event = event
+        self.fields = fields
+
+    def as_dict(self) -> dict[str, Any]:
+        """Render the fields, expanding query text into its text and fingerprint."""
+        rendered = {"event": self.event}
+        for key, value in self.fields.items():
+            if isinstance(value, QueryText):
+                rendered[key] = str(value)
+                rendered["fingerprint"] = value.fingerprint
+            else:
+                rendered[key] = value
+        return rendered
+
+    def __str__(self) -> str:
+        parts = [self.event]
+        for key, value in self.as_dict().items():
+            if key == "event":
+                continue
+            if isinstance(value, str) and (not value or any(c in value for c in ' "=')):
+                value = json.dumps(value, ensure_ascii=False)
+            parts.append(f"{key}={value}")
+        return " ".join(parts)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, flattening LogEvent fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, LogEvent):
+            payload.update(record.msg.as_dict())
+        else:
+            payload["message"] = record.getMessage()
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats each record in the calling thread so that it can be
+    pickled; records here never leave the process, so that work is skipped. Records are
+    dropped rather than blocking the caller when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging() -> None:
+    """Route root logging through a background queue listener writing to stderr.
+
+    Like logging.basicConfig(), this does nothing if the root logger already has
+    handlers, so embedding applications and test runners keep their own setup.
+    """
+    global _LISTENER
+    root = logging.getLogger()
+    if _LISTENER is not None or root.handlers:
+        return
+
+    config = get_logging_config()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if config.format == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(config.level)
+
+    _LISTENER = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _LISTENER.start()
+    # Stopping the listener flushes every record that is still queued
+    atexit.register(_LISTENER.stop)
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields: Any) -> None:
+    """Log a structured event, subject to the level and the event's sample rate.
+
+    Sampled events carry their `sample_rate` so that counts can be scaled back up.
+
+    Args:
+        logger: Logger to emit on
+        level: Logging level, e.g. logging.INFO
+        event: Event name, e.g. "query.start"
+        **fields: Event fields. Wrap SQL in QueryText so it is truncated and fingerprinted.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = get_logging_config().sample_rates.get(event)
+    if rate is not None and rate < 1.0:
+        if random.random() >= rate:
+            return
+        fields["sample_rate"] = rate
+    logger.log(level, LogEvent(event, fields))
@@ -3,22 +3,97 @@ import json
 from typing import Optional, List, Any
 import concurrent.futures
 import atexit
+import base64
 import os
+import re
+import signal
+import tempfile
+import threading
+import time
+import uuid
 
 import clickhouse_connect
 import chdb.session as chs
-from clickhouse_connect.driver.binding import format_query_value
+from clickhouse_connect.driver.binding import format_query_value, quote_identifier
+from clickhouse_connect.driver.exceptions import DatabaseError, OperationalError
+from clickhouse_connect.driver.httputil import default_pool_manager, get_pool_manager
 from dotenv import load_dotenv
+from urllib3.exceptions import HTTPError
 from fastmcp import FastMCP
 from fastmcp.tools import Tool
 from fastmcp.prompts import Prompt
 from fastmcp.exceptions import ToolError
-from dataclasses import dataclass, field, asdict, is_dataclass
+from dataclasses import dataclass, field, asdict, is_dataclass, fields as dataclass_fields
 from starlette.requests import Request
 from starlette.responses import PlainTextResponse
 
-from mcp_clickhouse.mcp_env import get_config, get_chdb_config
+from mcp_clickhouse.mcp_env import (
+    get_config,
+    get_chdb_config,
+    get_logging_config,
+    on_config_reload,
+    reload_config,
+)
+from mcp_clickhouse.audit_log import (
+    AuditLog,
+    AuditMiddleware,
+    ChDBSink,
+    ClickHouseSink,
+    FileSink,
+    audit_result,
+)
+from mcp_clickhouse.cache import BoundedCache
 from mcp_clickhouse.chdb_prompt import CHDB_PROMPT
+from mcp_clickhouse.chdb_scratch import (
+    SCRATCH_DATABASE,
+    ScratchQuotaExceeded,
+    ScratchTables,
+    check_table_name,
+)
+from mcp_clickhouse.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerMiddleware,
+)
+from mcp_clickhouse.connection_warmup import ConnectionWarmer
+from mcp_clickhouse.credentials import REQUEST_CREDENTIALS, CredentialMiddleware, CredentialPools
+from mcp_clickhouse.drain import IN_FLIGHT
+from mcp_clickhouse.mcp_logging import QueryText, configure_logging, log_event
+from mcp_clickhouse.metrics import CONTENT_TYPE, MetricFamily, render
+from mcp_clickhouse.query_cache import query_cache_settings
+from mcp_clickhouse.query_jobs import (
+    CANCELLED,
+    DONE,
+    RUNNING,
+    JobLimitExceeded,
+    QueryJob,
+    QueryJobRegistry,
+)
+from mcp_clickhouse.query_limits import (
+    locked_limits,
+    server_limits,
+    settable_limits,
+    tighten_limits,
+)
+from mcp_clickhouse.query_stats import SORT_KEYS, QueryStats, summary_counts
+from mcp_clickhouse.rate_limit import RateLimitMiddleware
+from mcp_clickhouse.result_budget import ResultBudget
+from mcp_clickhouse.result_summary import ResultSummary
+from mcp_clickhouse.schema_index import SYSTEM_DATABASES, ClickHouseSchemaIndex
+from mcp_clickhouse.schema_snapshot import SchemaSnapshotStore, snapshot_path, sql_like
+from mcp_clickhouse.single_flight import SingleFlight
+from mcp_clickhouse.tracing import (
+    TracingMiddleware,
+    configure_tracing,
+    in_current_context,
+    serialize_result,
+    set_attributes,
+    span,
+    trace_headers,
+)
+from mcp_clickhouse.sql_fingerprint import normalize_query
 
 
 @dataclass
@@ -56,14 +131,59 @@ class Table:
 MCP_SERVER_NAME = "mcp-clickhouse"
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+configure_logging()
 logger = logging.getLogger(MCP_SERVER_NAME)
+configure_tracing()
 
 QUERY_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=10)
 atexit.register(lambda: QUERY_EXECUTOR.shutdown(wait=True))
 SELECT_QUERY_TIMEOUT_SECS = 30
+# Identical queries running at the same time share one execution on QUERY_EXECUTOR
+QUERY_FLIGHTS = SingleFlight(QUERY_EXECUTOR)
+
+# Per-table caches keyed by (database, table), each entry tagged with the parts version
+# it was computed from so that inserts, merges and mutations invalidate it.
+STORAGE_STATS_CACHE = BoundedCache(maxsize=256)
+# Keyed by (database, table, rows) and the request's credentials; entries also expire
+# after the configured TTL, as views, Distributed and external tables have no parts to
+# version them by.
+PREVIEW_CACHE = BoundedCache(maxsize=128)
+# Keyed by (database, table, column, top_k) and credentials, versioned and expiring like previews
+COLUMN_VALUES_CACHE = BoundedCache(maxsize=512)
+
+SCHEMA_INDEX = ClickHouseSchemaIndex()
+
+# Result column names and types of run_select_query queries, keyed by query text. A
+# template with {name:Type} placeholders is described once whatever its parameters.
+QUERY_PLAN_CACHE = BoundedCache(maxsize=512, ttl_secs=60)
+
+# Connection pools of the users of request credentials, keyed by credential hash
+CREDENTIAL_POOL_CONNECTIONS = 4
+CREDENTIAL_POOLS = CredentialPools(
+    lambda: get_pool_manager(verify=get_config().verify, maxsize=CREDENTIAL_POOL_CONNECTIONS)
+)
+# (database, table) pairs visible to each user of request credentials, keyed by hash
+VISIBLE_TABLES_CACHE = BoundedCache(maxsize=256, ttl_secs=60)
+
+# ClickHouse results materialized into the chDB session by materialize_query
+SCRATCH_TABLES = ScratchTables()
+# Size of the reads from a result streamed into a scratch table
+SCRATCH_CHUNK_BYTES = 1 << 20
+
+# Jobs of submit_query, each run on its own daemon thread once one of the slots is free
+QUERY_JOBS = QueryJobRegistry()
+# Statistics of the queries tools run, by fingerprint
+QUERY_STATS = QueryStats()
+# Their final read counts are looked up in system.query_log, which the server flushes
+# every 7.5 seconds by default; queries missing from it after the wait keep partial counts
+QUERY_LOG_POLL_SECS = 10
+QUERY_LOG_MAX_WAIT_SECS = 120
+QUERY_JOB_SLOTS = threading.BoundedSemaphore(4)
+QUERY_JOB_PAGE_MAX_ROWS = 10000
+
+# Created on first use from the configured cache directory; see _schema_snapshot()
+_SCHEMA_SNAPSHOT: Optional[SchemaSnapshotStore] = None
+_SCHEMA_SNAPSHOT_LOCK = threading.Lock()
 
 load_dotenv()
 
@@ -76,6 +196,49 @@ mcp = FastMCP(
         "chdb",
     ],
 )
+mcp.add_middleware(IN_FLIGHT)
+mcp.add_middleware(TracingMiddleware())
+# Middleware runs in the order added: the audit log also records the calls rejected below
+AUDIT_LOG = AuditLog(
+    max_queued=get_logging_config().audit_queue_size,
+    batch_size=get_logging_config().audit_batch_size,
+)
+mcp.add_middleware(AuditMiddleware(AUDIT_LOG, default_user=lambda: get_config().username))
+# Tools reading table data share the query rate limit, the others the metadata one
+mcp.add_middleware(
+    RateLimitMiddleware(
+        {
+            "run_select_query",
+            "run_chdb_select_query",
+            "preview_table",
+            "column_values",
+            "materialize_query",
+            "submit_query",
+            "summarize_query",
+        }
+    )
+)
+BACKEND_BREAKER = CircuitBreaker()
+# Every tool calling ClickHouse; query job status and results are read from disk
+mcp.add_middleware(
+    CircuitBreakerMiddleware(
+        BACKEND_BREAKER,
+        {
+            "list_databases",
+            "list_tables",
+            "describe_table_storage",
+            "preview_table",
+            "column_values",
+            "search_schema",
+            "run_select_query",
+            "summarize_query",
+            "submit_query",
+            "cancel_query",
+            "materialize_query",
+        },
+    )
+)
+mcp.add_middleware(CredentialMiddleware())
 
 
 @mcp.custom_route("/health", methods=["GET"])
@@ -84,6 +247,14 @@ async def health_check(request: Request) -> PlainTextResponse:
 
     Returns OK if the server is running and can connect to ClickHouse.
     """
+    config = get_config()
+    if config.circuit_window > 0 and BACKEND_BREAKER.state == OPEN:
+        breaker = BACKEND_BREAKER.snapshot(config.circuit_open_secs)
+        return PlainTextResponse(
+            "ERROR - ClickHouse circuit breaker is open, retrying in "
+            f"{breaker['retry_after_secs']} seconds",
+            status_code=503,
+        )
     try:
         # Try to create a client connection to verify ClickHouse connectivity
         client = create_clickhouse_client()
@@ -94,6 +265,40 @@ async def health_check(request: Request) -> PlainTextResponse:
         return PlainTextResponse(f"ERROR - Cannot connect to ClickHouse: {str(e)}", status_code=503)
 
 
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    """Prometheus metrics: query statistics by fingerprint and the circuit breaker state."""
+    config = get_config()
+    families = QUERY_STATS.metric_families(config.metrics_top_fingerprints)
+    state = MetricFamily(
+        "mcp_clickhouse_circuit_state", "gauge", "1 for the current state of the circuit breaker"
+    )
+    for name in (CLOSED, OPEN, HALF_OPEN):
+        state.add(int(BACKEND_BREAKER.state == name), state=name)
+    opened = MetricFamily(
+        "mcp_clickhouse_circuit_opened_total", "counter", "Times the circuit breaker opened"
+    )
+    opened.add(BACKEND_BREAKER.opened)
+    rejected = MetricFamily(
+        "mcp_clickhouse_circuit_rejected_total",
+        "counter",
+        "Tool calls rejected by the circuit breaker",
+    )
+    rejected.add(BACKEND_BREAKER.rejected)
+    families.extend((state, opened, rejected))
+    return PlainTextResponse(render(families), media_type=CONTENT_TYPE)
+
+
+def _tenant() -> Optional[str]:
+    """Identify the request credentials of the current call, None for the configured user.
+
+    Part of the key of everything cached from query results, so that users never see
+    each other's data, grants or row policies.
+    """
+    credentials = REQUEST_CREDENTIALS.get()
+    return credentials.key if credentials is not None else None
+
+
 def result_to_table(query_columns, result) -> List[Table]:
     return [Table(**dict(zip(query_columns, row))) for row in result]
 
@@ -114,7 +319,7 @@ def to_json(obj: Any) -> str:
 
 def list_databases():
     """List available ClickHouse databases"""
-    logger.info("Listing all databases")
+    logger.debug("Listing all databases")
     client = create_clickhouse_client()
     result = client.command("SHOW DATABASES")
 
@@ -124,100 +329,1237 @@ def list_databases():
     else:
         databases = [result]
 
-    logger.info(f"Found {len(databases)} databases")
+    logger.info("Found %d databases", len(databases))
     return json.dumps(databases)
 
 
-def list_tables(database: str, like: Optional[str] = None, not_like: Optional[str] = None):
+TABLE_FIELDS = [f.name for f in dataclass_fields(Table) if f.name != "columns"]
+COLUMN_FIELDS = [f.name for f in dataclass_fields(Column)]
+# Always selected: they identify each table, for pagination and for joining columns
+TABLE_KEY_FIELDS = ["database", "name"]
+
+
+def _encode_page_token(last_name: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": last_name}).encode()).decode()
+
+
+def _decode_page_token(page_token: str) -> str:
+    try:
+        return json.loads(base64.urlsafe_b64decode(page_token.encode()))["after"]
+    except (ValueError, KeyError, TypeError):
+        raise ToolError("Invalid page_token") from None
+
+
+def _fetch_columns(client, database: str, table_names: List[str]) -> dict:
+    """Fetch the columns of several tables in one query, grouped by table name."""
+    columns = {name: [] for name in table_names}
+    if not table_names:
+        return columns
+    select = ", ".join(
+        "type AS column_type" if name == "column_type" else name for name in COLUMN_FIELDS
+    )
+    names = ", ".join(format_query_value(name) for name in table_names)
+    result = client.query(
+        f"SELECT {select} FROM system.columns "
+        f"WHERE database = {format_query_value(database)} AND table IN ({names}) "
+        "ORDER BY table, position"
+    )
+    for column in result_to_column(result.column_names, result.result_rows):
+        columns[column.table].append(asdict(column))
+    return columns
+
+
+def list_tables(
+    database: str,
+    like: Optional[str] = None,
+    not_like: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    include_columns: bool = True,
+    limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+):
     """List available ClickHouse tables in a database, including schema, comment,
-    row count, and column count."""
-    logger.info(f"Listing tables in database '{database}'")
-    client = create_clickhouse_client()
-    query = f"SELECT database, name, engine, create_table_query, dependencies_database, dependencies_table, engine_full, sorting_key, primary_key, total_rows, total_bytes, total_bytes_uncompressed, parts, active_parts, total_marks, comment FROM system.tables WHERE database = {format_query_value(database)}"
-    if like:
-        query += f" AND name LIKE {format_query_value(like)}"
-
-    if not_like:
-        query += f" AND name NOT LIKE {format_query_value(not_like)}"
-
-    result = client.query(query)
-
-    # Deserialize result as Table dataclass instances
-    tables = result_to_table(result.column_names, result.result_rows)
-
-    for table in tables:
-        column_data_query = f"SELECT database, table, name, type AS column_type, default_kind, default_expression, comment FROM system.columns WHERE database = {format_query_value(database)} AND table = {format_query_value(table.name)}"
-        column_data_query_result = client.query(column_data_query)
-        table.columns = [
-            c
-            for c in result_to_column(
-                column_data_query_result.column_names,
-                column_data_query_result.result_rows,
+    row count, and column count.
+
+    To keep responses small on large databases, pass `fields` to return only some
+    table attributes (database and name are always included), set `include_columns`
+    to false to skip column details, and page through results with `limit`. With
+    `limit` or `page_token` the result is an object with `tables` and
+    `next_page_token`; pass the token back to fetch the next page."""
+    logger.debug("Listing tables in database '%s'", database)
+    if fields is None:
+        selected = TABLE_FIELDS
+    else:
+        unknown = sorted(set(fields) - set(TABLE_FIELDS))
+        if unknown:
+            raise ToolError(
+                f"Unknown table fields: {', '.join(unknown)}. "
+                f"Valid fields: {', '.join(TABLE_FIELDS)}"
             )
+        selected = [name for name in TABLE_FIELDS if name in TABLE_KEY_FIELDS or name in fields]
+    if limit is not None and limit <= 0:
+        raise ToolError("limit must be a positive integer")
+    paginated = limit is not None or page_token is not None
+
+    after = _decode_page_token(page_token) if page_token else None
+
+    # The snapshot is read as the configured user, not as the user of the request
+    store = _schema_snapshot() if _tenant() is None else None
+    snapshot_tables = store.tables(database) if store is not None else None
+    if snapshot_tables is not None:
+        tables = [
+            table
+            for table in snapshot_tables
+            if (not like or sql_like(table["name"], like))
+            and (not not_like or not sql_like(table["name"], not_like))
+            and (after is None or table["name"] > after)
         ]
+        if paginated:
+            tables.sort(key=lambda table: table["name"])
+            if limit is not None:
+                tables = tables[: limit + 1]
+        tables = [
+            {
+                **{name: table[name] for name in selected},
+                **({"columns": [dict(c) for c in table["columns"]]} if include_columns else {}),
+            }
+            for table in tables
+        ]
+    else:
+        client = create_clickhouse_client()
+        query = f"SELECT {', '.join(selected)} FROM system.tables WHERE database = {format_query_value(database)}"
+        if like:
+            query += f" AND name LIKE {format_query_value(like)}"
+
+        if not_like:
+            query += f" AND name NOT LIKE {format_query_value(not_like)}"
+
+        if after is not None:
+            query += f" AND name > {format_query_value(after)}"
+
+        if paginated:
+            query += " ORDER BY name"
+            if limit is not None:
+                # One extra row tells whether there is a next page
+                query += f" LIMIT {int(limit) + 1}"
+
+        result = client.query(query)
+        tables = [dict(zip(result.column_names, row)) for row in result.result_rows]
+        if include_columns:
+            # Only the tables of the page need columns; the extra row is dropped below
+            columns = _fetch_columns(client, database, [table["name"] for table in tables[:limit]])
+            for table in tables:
+                table["columns"] = columns.get(table["name"], [])
+
+    next_page_token = None
+    if limit is not None and len(tables) > limit:
+        tables = tables[:limit]
+        next_page_token = _encode_page_token(tables[-1]["name"])
+
+    logger.info("Found %d tables in database '%s'", len(tables), database)
+    if paginated:
+        return {"tables": tables, "next_page_token": next_page_token}
+    return tables
+
+
+def _schema_snapshot() -> Optional[SchemaSnapshotStore]:
+    """Get the schema snapshot store, loading the on-disk snapshot on first use.
+
+    Returns None when the snapshot is disabled. A snapshot that was not reconciled in
+    this process recently is reconciled in the background while it keeps being served.
+    """
+    global _SCHEMA_SNAPSHOT
+    config = get_config()
+    if not config.schema_cache_dir:
+        return None
+    with _SCHEMA_SNAPSHOT_LOCK:
+        if _SCHEMA_SNAPSHOT is None:
+            path = snapshot_path(config.schema_cache_dir, config.host, config.port, config.username)
+            _SCHEMA_SNAPSHOT = SchemaSnapshotStore(path, TABLE_FIELDS, COLUMN_FIELDS)
+            _SCHEMA_SNAPSHOT.load()
+        store = _SCHEMA_SNAPSHOT
+    if store.is_stale(config.schema_index_refresh_secs):
+        store.reconcile_in_background(create_clickhouse_client)
+    return store
+
+
+@on_config_reload
+def _reset_schema_snapshot(old_config, new_config):
+    """Switch to the snapshot of the new server or cache directory after a reload."""
+    global _SCHEMA_SNAPSHOT
+    key = ("schema_cache_dir", "host", "port", "username")
+    if old_config is None or any(
+        getattr(old_config, name) != getattr(new_config, name) for name in key
+    ):
+        with _SCHEMA_SNAPSHOT_LOCK:
+            _SCHEMA_SNAPSHOT = None
+
+
+def _table_parts_version(client, database: str, table: str) -> tuple:
+    """Get a cheap version tag for a table's data: active part count and last part change.
+
+    Any insert, merge or mutation changes the set of active parts, which changes the
+    count or the latest modification time.
+    """
+    result = client.query(
+        "SELECT count(), max(modification_time) FROM system.parts "
+        f"WHERE database = {format_query_value(database)} "
+        f"AND table = {format_query_value(table)} AND active"
+    )
+    return tuple(result.result_rows[0])
 
-    logger.info(f"Found {len(tables)} tables")
-    return [asdict(table) for table in tables]
 
+_IDENTIFIER_RE = re.compile(
+    r"'(?:[^'\\]|\\.)*'"  # string literals are matched only to be skipped
+    r"|`((?:[^`\\]|\\.)+)`"
+    r'|"((?:[^"\\]|\\.)+)"'
+    r"|([A-Za-z_][\w.]*)"
+)
+
+
+def _expression_identifiers(expression: str) -> set:
+    """Get the identifiers referenced by a ClickHouse expression."""
+    return {
+        identifier
+        for match in _IDENTIFIER_RE.finditer(expression)
+        for identifier in match.groups()
+        if identifier
+    }
 
-def execute_query(query: str):
+
+def describe_table_storage(database: str, table: str):
+    """Describe how a ClickHouse table's data is stored, per column: compressed and
+    uncompressed bytes, compression ratio, marks size, codec, whether the column is part
+    of the primary, sorting or partition key, and which data-skipping indices cover it.
+    Columns are ordered from heaviest to lightest on disk."""
+    logger.debug("Describing storage of table '%s.%s'", database, table)
+    client = create_clickhouse_client()
+    version = _table_parts_version(client, database, table)
+    cache_key = (database, table, _tenant())
+    cached = STORAGE_STATS_CACHE.get(cache_key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    db = format_query_value(database)
+    tbl = format_query_value(table)
+    query = f"""
+        WITH
+            (SELECT groupArray((name, type_full, expr, granularity))
+             FROM system.data_skipping_indices
+             WHERE database = {db} AND table = {tbl}) AS skip_indices,
+            (SELECT countIf(part_type = 'Compact')
+             FROM system.parts
+             WHERE database = {db} AND table = {tbl} AND active) AS compact_parts
+        SELECT
+            c.name AS name,
+            c.type AS column_type,
+            c.compression_codec AS codec,
+            c.is_in_primary_key AS in_primary_key,
+            c.is_in_sorting_key AS in_sorting_key,
+            c.is_in_partition_key AS in_partition_key,
+            p.compressed_bytes AS compressed_bytes,
+            p.uncompressed_bytes AS uncompressed_bytes,
+            p.marks_bytes AS marks_bytes,
+            compact_parts,
+            skip_indices
+        FROM system.columns AS c
+        LEFT JOIN
+        (
+            SELECT
+                column,
+                sum(column_data_compressed_bytes) AS compressed_bytes,
+                sum(column_data_uncompressed_bytes) AS uncompressed_bytes,
+                sum(column_marks_bytes) AS marks_bytes
+            FROM system.parts_columns
+            WHERE database = {db} AND table = {tbl} AND active
+            GROUP BY column
+        ) AS p ON p.column = c.name
+        WHERE c.database = {db} AND c.table = {tbl}
+        ORDER BY compressed_bytes DESC, c.position
+    """
+    result = client.query(query, settings={"join_use_nulls": 0})
+    if not result.result_rows:
+        raise ToolError(f"Table '{database}.{table}' not found")
+
+    indices = [
+        {"name": name, "type": index_type, "expression": expr, "granularity": granularity}
+        for name, index_type, expr, granularity in result.result_rows[0][-1]
+    ]
+    index_columns = {
+        index["name"]: _expression_identifiers(index["expression"]) for index in indices
+    }
+
+    columns = []
+    for row in result.result_rows:
+        column = dict(zip(result.column_names[:-2], row[:-2]))
+        uncompressed = column["uncompressed_bytes"]
+        compressed = column["compressed_bytes"]
+        column["compression_ratio"] = round(uncompressed / compressed, 2) if compressed else None
+        column["skip_indices"] = [
+            name for name, identifiers in index_columns.items() if column["name"] in identifiers
+        ]
+        columns.append(column)
+
+    description = {
+        "database": database,
+        "table": table,
+        "active_parts": version[0],
+        # Compact parts store all columns in one file, so their bytes are not attributed
+        # to individual columns and are missing from the per-column figures.
+        "compact_parts": result.result_rows[0][-2],
+        "compressed_bytes": sum(c["compressed_bytes"] for c in columns),
+        "uncompressed_bytes": sum(c["uncompressed_bytes"] for c in columns),
+        "columns": columns,
+        "skip_indices": indices,
+    }
+    STORAGE_STATS_CACHE.set(cache_key, (version, description))
+    return description
+
+
+PREVIEW_MAX_ROWS = 100
+# Rows read for per-column stats, and for tables with a sampling key, the approximate
+# number of rows the SAMPLE clause selects them from
+PREVIEW_STATS_ROWS = 10000
+PREVIEW_MAX_STATS_COLUMNS = 100
+_MIN_MAX_TYPE_RE = re.compile(
+    r"^(?:Nullable\()?(?:U?Int\d+|Float\d+|Decimal|Date|DateTime|BFloat16)\b"
+)
+_NO_UNIQ_TYPE_RE = re.compile(r"^(?:AggregateFunction|SimpleAggregateFunction|Object|JSON|Dynamic)")
+
+
+def _preview_stats_expression(name: str, column_type: str) -> str:
+    column = quote_identifier(name)
+    nulls = f"countIf(isNull({column}))" if "Nullable(" in column_type else "0"
+    distinct = "NULL" if _NO_UNIQ_TYPE_RE.match(column_type) else f"uniq({column})"
+    if _MIN_MAX_TYPE_RE.match(column_type):
+        return f"({nulls}, {distinct}, min({column}), max({column}))"
+    return f"({nulls}, {distinct}, NULL, NULL)"
+
+
+def preview_table(database: str, table: str, rows: int = 10):
+    """Preview a ClickHouse table: a small sample of rows plus per-column stats (nulls,
+    approximate distinct values, min and max) computed over a bounded sample. Tables with
+    a sampling key are sampled across their whole key range. Prefer this over running
+    SELECT * LIMIT on an unfamiliar table; results are cached."""
+    if not 0 < rows <= PREVIEW_MAX_ROWS:
+        raise ToolError(f"rows must be between 1 and {PREVIEW_MAX_ROWS}")
+    logger.debug("Previewing table '%s.%s'", database, table)
+    client = create_clickhouse_client()
+    config = get_config()
+    version = _table_parts_version(client, database, table)
+    cache_key = (database, table, rows, _tenant())
+    cached = PREVIEW_CACHE.get(cache_key)
+    if (
+        cached is not None
+        and cached[0] == version
+        and time.monotonic() - cached[1] <= config.preview_cache_ttl_secs
+    ):
+        return cached[2]
+
+    db = format_query_value(database)
+    tbl = format_query_value(table)
+    table_info = client.query(
+        f"SELECT engine, sampling_key, total_rows FROM system.tables "
+        f"WHERE database = {db} AND name = {tbl}"
+    ).result_rows
+    if not table_info:
+        raise ToolError(f"Table '{database}.{table}' not found")
+    engine, sampling_key, total_rows = table_info[0]
+    columns = client.query(
+        f"SELECT name, type FROM system.columns WHERE database = {db} AND table = {tbl} "
+        "ORDER BY position"
+    ).result_rows
+
+    source = f"{quote_identifier(database)}.{quote_identifier(table)}"
+    sampled = bool(sampling_key) and (total_rows or 0) > PREVIEW_STATS_ROWS
+    if sampled:
+        source += f" SAMPLE {PREVIEW_STATS_ROWS}"
+    settings = {"readonly": get_readonly_setting(client)}
+
+    sample = client.query(f"SELECT * FROM {source} LIMIT {rows}", settings=settings)
+    budget = ResultBudget(config.max_cell_chars, config.max_result_bytes)
+    budget.add_rows(sample.result_rows)
+
+    stats_columns = columns[:PREVIEW_MAX_STATS_COLUMNS]
+    stats_query = (
+        "SELECT count(), "
+        + ", ".join(
+            _preview_stats_expression(name, column_type) for name, column_type in stats_columns
+        )
+        + f" FROM (SELECT * FROM {source} LIMIT {PREVIEW_STATS_ROWS})"
+    )
+    stats_row = client.query(stats_query, settings=settings).result_rows[0]
+    column_stats = [
+        {
+            "name": name,
+            "column_type": column_type,
+            "nulls": nulls,
+            "approx_distinct": distinct,
+            "min": min_value,
+            "max": max_value,
+        }
+        for (name, column_type), (nulls, distinct, min_value, max_value) in zip(
+            stats_columns, stats_row[1:]
+        )
+    ]
+
+    preview = {
+        "database": database,
+        "table": table,
+        "engine": engine,
+        "total_rows": total_rows,
+        "sampled": sampled,
+        "columns": sample.column_names,
+        "rows": budget.rows,
+        "stats_rows": stats_row[0],
+        "column_stats": column_stats,
+    }
+    PREVIEW_CACHE.set(cache_key, (version, time.monotonic(), preview))
+    return preview
+
+
+COLUMN_VALUES_MAX_TOP_K = 100
+# Tables with a sampling key and more rows than this are read with SAMPLE
+COLUMN_VALUES_SAMPLE_ROWS = 1_000_000
+
+
+def column_values(database: str, table: str, column: str, top_k: int = 20):
+    """Get the approximate number of distinct values of a column and its most frequent
+    values with their counts. Use this to learn valid filter values (statuses,
+    countries, event types) instead of running SELECT DISTINCT or uniq; results are
+    cached until the table's data changes. Tables with a sampling key are sampled,
+    with counts scaled to the whole table."""
+    if not 0 < top_k <= COLUMN_VALUES_MAX_TOP_K:
+        raise ToolError(f"top_k must be between 1 and {COLUMN_VALUES_MAX_TOP_K}")
+    logger.debug("Counting values of '%s.%s.%s'", database, table, column)
     client = create_clickhouse_client()
+    config = get_config()
+    version = _table_parts_version(client, database, table)
+    cache_key = (database, table, column, top_k, _tenant())
+    cached = COLUMN_VALUES_CACHE.get(cache_key)
+    if (
+        cached is not None
+        and cached[0] == version
+        and time.monotonic() - cached[1] <= config.preview_cache_ttl_secs
+    ):
+        return cached[2]
+
+    db = format_query_value(database)
+    tbl = format_query_value(table)
+    table_info = client.query(
+        f"SELECT sampling_key, total_rows FROM system.tables WHERE database = {db} AND name = {tbl}"
+    ).result_rows
+    if not table_info:
+        raise ToolError(f"Table '{database}.{table}' not found")
+    sampling_key, total_rows = table_info[0]
+    column_info = client.query(
+        f"SELECT type FROM system.columns WHERE database = {db} AND table = {tbl} "
+        f"AND name = {format_query_value(column)}"
+    ).result_rows
+    if not column_info:
+        raise ToolError(f"Column '{column}' not found in '{database}.{table}'")
+    column_type = column_info[0][0]
+    if _NO_UNIQ_TYPE_RE.match(column_type):
+        raise ToolError(f"Values of {column_type} columns cannot be counted")
+
+    source = f"{quote_identifier(database)}.{quote_identifier(table)}"
+    sampled = bool(sampling_key) and (total_rows or 0) > COLUMN_VALUES_SAMPLE_ROWS
+    # Counts read from a sample are scaled by the fraction of the table it covers
+    count = "count()"
+    if sampled:
+        source += f" SAMPLE {COLUMN_VALUES_SAMPLE_ROWS}"
+        count = "toUInt64(round(count() * any(_sample_factor)))"
+    settings = {
+        **settable_limits(config.get_query_limits(), client.server_settings),
+        "readonly": get_readonly_setting(client),
+    }
+    name = quote_identifier(column)
+
+    rows, distinct = client.query(
+        f"SELECT {count}, uniqCombined({name}) FROM {source}", settings=settings
+    ).result_rows[0]
+    top = client.query(
+        f"SELECT {name}, {count} AS count FROM {source} "
+        f"GROUP BY {name} ORDER BY count DESC LIMIT {int(top_k)}",
+        settings=settings,
+    ).result_rows
+    budget = ResultBudget(config.max_cell_chars, config.max_result_bytes)
+    budget.add_rows(top)
+
+    result = {
+        "database": database,
+        "table": table,
+        "column": column,
+        "column_type": column_type,
+        "rows": rows,
+        "approx_distinct": distinct,
+        "sampled": sampled,
+        "top_values": [{"value": value, "count": n} for value, n in budget.rows],
+    }
+    COLUMN_VALUES_CACHE.set(cache_key, (version, time.monotonic(), result))
+    return result
+
+
+def _prewarm_tables(client, limit: int, by: str) -> list:
+    """Pick the tables to pre-warm previews for: the largest or the most queried."""
+    excluded = ", ".join(format_query_value(db) for db in SYSTEM_DATABASES)
+    if by == "queries":
+        rows = client.query(
+            "SELECT splitByChar('.', name, 2) AS parts, count() AS queries "
+            "FROM system.query_log ARRAY JOIN tables AS name "
+            "WHERE event_time > now() - INTERVAL 1 DAY AND type = 'QueryFinish' "
+            f"AND parts[1] NOT IN ({excluded}) "
+            f"GROUP BY parts ORDER BY queries DESC LIMIT {int(limit)}"
+        ).result_rows
+        return [tuple(parts) for parts, _ in rows if len(parts) == 2]
+    return client.query(
+        f"SELECT database, name FROM system.tables WHERE database NOT IN ({excluded}) "
+        f"AND NOT is_temporary ORDER BY total_bytes DESC LIMIT {int(limit)}"
+    ).result_rows
+
+
+def _prewarm_previews():
+    """Keep previews of the configured number of tables warm, refreshing every TTL."""
+    while True:
+        config = get_config()
+        if config.preview_prewarm_tables > 0:
+            try:
+                client = create_clickhouse_client()
+                tables = _prewarm_tables(
+                    client, config.preview_prewarm_tables, config.preview_prewarm_by
+                )
+                for database, table in tables:
+                    try:
+                        preview_table(database, table)
+                    except Exception as e:
+                        logger.warning("Preview pre-warm of '%s.%s' failed: %s", database, table, e)
+                log_event(logger, logging.DEBUG, "preview.prewarmed", tables=len(tables))
+            except Exception as e:
+                logger.error("Preview pre-warm failed: %s", e)
+        time.sleep(max(config.preview_cache_ttl_secs, 1))
+
+
+def start_preview_prewarm():
+    """Start keeping table previews warm in the background, if configured."""
+    config = get_config()
+    if config.enabled and config.preview_prewarm_tables > 0:
+        threading.Thread(target=_prewarm_previews, name="preview-prewarm", daemon=True).start()
+
+
+CONNECTION_WARMER = ConnectionWarmer(
+    connect=lambda: create_clickhouse_client(),
+    clear_pool=lambda: default_pool_manager().clear(),
+)
+
+
+def start_connection_warmup():
+    """Open connections to ClickHouse in the background and keep them alive, if configured."""
+    config = get_config()
+    if config.enabled and config.pool_warm_connections > 0:
+        threading.Thread(
+            target=CONNECTION_WARMER.run,
+            args=(lambda: (get_config().pool_warm_connections, get_config().pool_keepalive_secs),),
+            name="pool-warmup",
+            daemon=True,
+        ).start()
+
+
+def start_audit_log():
+    """Start flushing the audit log of tool calls to the configured sinks, if any."""
+    config = get_logging_config()
+    sinks = []
+    for name in config.audit_sinks:
+        if name == "file":
+            os.makedirs(config.audit_dir, exist_ok=True)
+            path = os.path.join(config.audit_dir, f"audit-{os.getpid()}.jsonl")
+            sinks.append(FileSink(path, config.audit_file_max_bytes, config.audit_file_backups))
+        elif name == "chdb":
+            if not get_chdb_config().enabled or _chdb_client is None:
+                logger.error("Audit sink chdb requires CHDB_ENABLED=true, skipping it")
+                continue
+            sinks.append(
+                ChDBSink(
+                    lambda statement: _chdb_command(_chdb_client, statement), config.audit_table
+                )
+            )
+        elif name == "clickhouse":
+            sinks.append(
+                ClickHouseSink(
+                    lambda: create_clickhouse_client(request_credentials=False), config.audit_table
+                )
+            )
+    AUDIT_LOG.start(sinks, config.audit_flush_secs)
+    if sinks:
+        atexit.register(AUDIT_LOG.close)
+
+
+def _reset_connections_on_network_error(err: Exception):
+    """Replace pooled connections when a request failed on the network, not in ClickHouse."""
+    if isinstance(err.__cause__, HTTPError):
+        CONNECTION_WARMER.reset()
+
+
+def _visible_tables() -> Optional[set]:
+    """Get the tables the user of the request credentials can see, None without them.
+
+    The schema index is shared and built as the configured user, so its matches are
+    filtered down to these.
+    """
+    tenant = _tenant()
+    if tenant is None:
+        return None
+    tables = VISIBLE_TABLES_CACHE.get(tenant)
+    if tables is None:
+        result = create_clickhouse_client().query("SELECT database, name FROM system.tables")
+        tables = {tuple(row) for row in result.result_rows}
+        VISIBLE_TABLES_CACHE.set(tenant, tables)
+    return tables
+
+
+def search_schema(query: str, limit: int = 20, database: Optional[str] = None):
+    """Search table and column names and comments across all databases.
+
+    Matches are fuzzy (partial words and small typos still match) and ranked best
+    first; use this to find relevant tables instead of listing every database. Each
+    match gives the database, table, and for columns the column name and type."""
+    if not SCHEMA_INDEX.is_built:
+        SCHEMA_INDEX.refresh(create_clickhouse_client(request_credentials=False), wait=True)
+    elif SCHEMA_INDEX.is_stale(get_config().schema_index_refresh_secs):
+        SCHEMA_INDEX.refresh_in_background(create_clickhouse_client)
+
+    matches = SCHEMA_INDEX.search(query, limit=limit, database=database, tables=_visible_tables())
+    return [{**entry.to_dict(), "score": round(score, 3)} for score, entry in matches]
+
+
+def _record_query_stats(
+    query: str,
+    start: float,
+    failed: bool = False,
+    rows: int = 0,
+    summary=None,
+    query_id: Optional[str] = None,
+):
+    """Fold a query run by a tool, started at `start`, into its fingerprint's statistics."""
+    read_rows, read_bytes = summary_counts(summary)
+    QUERY_STATS.record(
+        query,
+        time.perf_counter() - start,
+        get_config().query_stats_max_fingerprints,
+        failed=failed,
+        rows=rows,
+        read_rows=read_rows,
+        read_bytes=read_bytes,
+        query_id=query_id,
+    )
+
+
+def _backfill_read_counts() -> int:
+    """Complete the statistics of recent queries from system.query_log.
+
+    Their read counts, taken from the response header, are replaced with the final
+    ones, and their query cache hits are counted.
+    """
+    query_ids = QUERY_STATS.pending_query_ids(QUERY_LOG_MAX_WAIT_SECS)
+    if not query_ids:
+        return 0
+    # Read as the configured user, whatever the credentials the queries ran with
+    result = create_clickhouse_client(request_credentials=False).query(
+        "SELECT query_id, sum(read_rows), sum(read_bytes), "
+        "sum(ProfileEvents['QueryCacheHits']) FROM system.query_log "
+        "WHERE event_date >= yesterday() AND type != 'QueryStart' "
+        "AND query_id IN {query_ids:Array(String)} GROUP BY query_id",
+        parameters={"query_ids": query_ids},
+    )
+    return QUERY_STATS.apply_final_counts({row[0]: row[1:] for row in result.result_rows})
+
+
+def _backfill_read_counts_forever():
+    failing = False
+    while True:
+        time.sleep(QUERY_LOG_POLL_SECS)
+        try:
+            _backfill_read_counts()
+            failing = False
+        except Exception as e:
+            # Only the first failure in a row is worth a warning; counts stay partial meanwhile
+            logger.log(
+                logging.DEBUG if failing else logging.WARNING,
+                "Cannot read final read counts from system.query_log: %s",
+                e,
+            )
+            failing = True
+
+
+def start_read_count_backfill():
+    """Start completing the read counts of query_stats from system.query_log."""
+    config = get_config()
+    if config.enabled and config.query_stats_max_fingerprints > 0:
+        threading.Thread(
+            target=_backfill_read_counts_forever, name="read-count-backfill", daemon=True
+        ).start()
+
+
+def execute_query(
+    query: str,
+    query_id: Optional[str] = None,
+    limits: Optional[dict] = None,
+    parameters: Optional[dict] = None,
+    use_query_cache: Optional[bool] = None,
+):
+    client = create_clickhouse_client()
+    budget = None
+    start = time.perf_counter()
     try:
         read_only = get_readonly_setting(client)
-        res = client.query(query, settings={"readonly": read_only})
-        logger.info(f"Query returned {len(res.result_rows)} rows")
-        return {"columns": res.column_names, "rows": res.result_rows}
+        config = get_config()
+        if limits is None:
+            limits = config.get_query_limits()
+        limits = settable_limits(limits, client.server_settings)
+        # readonly goes last: with readonly=1 the server rejects settings changed after it
+        settings = {**limits, "readonly": read_only}
+        budget = ResultBudget(config.max_cell_chars, config.max_result_bytes)
+        with span("clickhouse.query", {"db.system": "clickhouse", "clickhouse.query_id": query_id}):
+            wrapped_query = budget.prepare_query(
+                client,
+                query,
+                settings,
+                parameters,
+                plan_cache=QUERY_PLAN_CACHE,
+                plan_scope=_tenant(),
+            )
+            cache_settings, cache_report = query_cache_settings(
+                config, client, query, use_query_cache
+            )
+            # Added after the description above, which is never worth caching
+            settings = {**limits, **cache_settings, "readonly": read_only}
+            if query_id is not None:
+                settings["query_id"] = query_id
+            try:
+                stream = _collect_rows(client, budget, wrapped_query, parameters, settings)
+            except DatabaseError as err:
+                if not budget.pushed_down or isinstance(err, OperationalError):
+                    raise
+                # The server rejected the truncating wrapper, not necessarily the query
+                logger.debug("Truncation pushdown failed, running the query as is: %s", err)
+                QUERY_PLAN_CACHE.pop(budget.plan_key)
+                budget.undo_pushdown()
+                stream = _collect_rows(client, budget, query, parameters, settings)
+            column_names = budget.column_names(stream.source.column_names)
+            _record_query_stats(
+                query,
+                start,
+                rows=len(budget.rows),
+                summary=stream.source.summary,
+                query_id=query_id,
+            )
+            set_attributes({"db.response.returned_rows": len(budget.rows)})
+        log_event(
+            logger,
+            logging.INFO,
+            "query.done",
+            rows=len(budget.rows),
+            result_bytes=budget.result_bytes,
+            truncated_cells=budget.truncated_cells,
+            rows_truncated=budget.exhausted,
+        )
+        result = {
+            "columns": column_names,
+            "rows": budget.rows,
+            "budget": budget.summary(column_names),
+        }
+        if cache_report is not None:
+            result["query_cache"] = cache_report
+        return result
     except Exception as err:
-        logger.error(f"Error executing query: {err}")
+        _record_query_stats(query, start, failed=True, query_id=query_id)
+        if budget is not None and budget.pushed_down:
+            # The cached description may predate a schema change
+            QUERY_PLAN_CACHE.pop(budget.plan_key)
+        _reset_connections_on_network_error(err)
+        log_event(logger, logging.ERROR, "query.error", query=QueryText(query), error=str(err))
         raise ToolError(f"Query execution failed: {str(err)}")
 
 
-def run_select_query(query: str):
-    """Run a SELECT query in a ClickHouse database"""
-    logger.info(f"Executing SELECT query: {query}")
+def _collect_rows(client, budget: ResultBudget, query: str, parameters, settings: dict):
+    """Read the rows of a query into the budget, returning the closed stream."""
+    # Rows are read block by block so that reading stops once the budget is spent
+    with client.query_row_block_stream(
+        query,
+        parameters=parameters,
+        settings=settings,
+        transport_settings=trace_headers(),
+    ) as stream:
+        for block in stream:
+            if not budget.add_rows(block):
+                break
+    return stream
+
+
+@on_config_reload
+def _clear_query_plans(old_config, new_config):
+    """Forget query descriptions, which may come from another server or database."""
+    QUERY_PLAN_CACHE.clear()
+
+
+def _query_flight_key(
+    query: str,
+    limits: dict,
+    parameters: Optional[dict] = None,
+    use_query_cache: Optional[bool] = None,
+) -> tuple:
+    """Identify a query and the settings shaping its result for single-flight sharing."""
+    config = get_config()
+    return (
+        normalize_query(query, strip_literals=False),
+        json.dumps(parameters or {}, sort_keys=True, default=str),
+        config.max_cell_chars,
+        config.max_result_bytes,
+        tuple(sorted(limits.items())),
+        use_query_cache,
+        _tenant(),
+    )
+
+
+_QUERY_PARAMETER_RE = re.compile(r"\{\s*(\w+)\s*:\s*[^{}]+\}")
+
+
+def _check_query_parameters(query: str, parameters: dict) -> None:
+    """Check that the parameters match the query's {name:Type} placeholders.
+
+    Values are always bound by the server; without placeholders clickhouse_connect
+    would substitute them into the query text instead.
+    """
+    placeholders = set(_QUERY_PARAMETER_RE.findall(query))
+    missing = sorted(placeholders - parameters.keys())
+    if missing:
+        raise ToolError(f"Missing values for query parameters: {', '.join(missing)}")
+    unused = sorted(parameters.keys() - placeholders)
+    if unused:
+        raise ToolError(
+            f"Parameters without a {{name:Type}} placeholder in the query: {', '.join(unused)}"
+        )
+
+
+def _kill_query(query_id: str):
+    try:
+        client = create_clickhouse_client()
+        client.command(f"KILL QUERY WHERE query_id = {format_query_value(query_id)} ASYNC")
+        log_event(logger, logging.INFO, "query.killed", query_id=query_id)
+    except Exception as e:
+        logger.warning("Failed to kill abandoned query %s: %s", query_id, e)
+
+
+def _kill_query_in_background(query_id: str):
+    # Killed as the user that ran the query
+    threading.Thread(
+        target=in_current_context(_kill_query), args=(query_id,), name="kill-query", daemon=True
+    ).start()
+
+
+def _tighten_limits(profile: dict, requested: Optional[dict]) -> dict:
+    """Apply the limits requested for a query to a profile, as a tool error if refused.
+
+    Requested limits are checked against the settings of the user the query runs as,
+    which are only read from the server when there are any: a limit the user may not
+    change is refused, and one the profile leaves unset is capped by the user's default.
+    """
+    server_defaults = None
+    locked = ()
+    if requested:
+        server_settings = create_clickhouse_client().server_settings
+        server_defaults = server_limits(server_settings)
+        locked = locked_limits(server_settings)
+    try:
+        return tighten_limits(profile, requested, server_defaults, locked)
+    except ValueError as e:
+        raise ToolError(str(e))
+
+
+def run_select_query(
+    query: str,
+    parameters: Optional[dict] = None,
+    limits: Optional[dict] = None,
+    use_query_cache: Optional[bool] = None,
+):
+    """Run a SELECT query in a ClickHouse database
+
+    Pass values through `parameters` rather than writing them into the query: use
+    ClickHouse placeholders such as {id:UInt64} or {names:Array(String)} in the query
+    and give their values by name, e.g. {"id": 42}. The server binds them, and repeated
+    queries that only differ in values share cached work.
+
+    The server applies a resource profile to every query (max_execution_time,
+    max_memory_usage, max_rows_to_read, max_bytes_to_read, max_threads and
+    timeout_overflow_mode). Pass `limits` with any of these settings to tighten them
+    for this query, e.g. {"max_rows_to_read": 1000000}; they cannot be loosened.
+
+    When the server's query cache is enabled, eligible queries are answered from it
+    while their cached result is fresh. The response's `query_cache` object reports
+    whether the cache was used, or why not; query_stats counts the hits. Pass
+    `use_query_cache` to override that policy for this query: false for the latest
+    data, true to cache an expensive query."""
+    limits = _tighten_limits(get_config().get_query_limits(), limits)
+    if parameters:
+        _check_query_parameters(query, parameters)
+    log_event(logger, logging.INFO, "query.start", query=QueryText(query))
     try:
-        future = QUERY_EXECUTOR.submit(execute_query, query)
+        query_id = str(uuid.uuid4())
         try:
-            result = future.result(timeout=SELECT_QUERY_TIMEOUT_SECS)
+            result = QUERY_FLIGHTS.run(
+                _query_flight_key(query, limits, parameters, use_query_cache),
+                SELECT_QUERY_TIMEOUT_SECS,
+                in_current_context(execute_query),
+                query,
+                query_id,
+                limits,
+                parameters or None,
+                use_query_cache,
+                on_abandon=lambda: _kill_query_in_background(query_id),
+            )
             # Check if we received an error structure from execute_query
             if isinstance(result, dict) and "error" in result:
-                logger.warning(f"Query failed: {result['error']}")
+                logger.warning("Query failed: %s", result["error"])
                 # MCP requires structured responses; string error messages can cause
                 # serialization issues leading to BrokenResourceError
                 return {
                     "status": "error",
                     "message": f"Query failed: {result['error']}",
                 }
+            audit_result(rows=len(result["rows"]), result_bytes=result["budget"]["result_bytes"])
             return result
         except concurrent.futures.TimeoutError:
-            logger.warning(f"Query timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds: {query}")
-            future.cancel()
+            log_event(
+                logger,
+                logging.WARNING,
+                "query.timeout",
+                query=QueryText(query),
+                timeout_secs=SELECT_QUERY_TIMEOUT_SECS,
+            )
             raise ToolError(f"Query timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
     except ToolError:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in run_select_query: {str(e)}")
+        logger.error("Unexpected error in run_select_query: %s", e)
         raise RuntimeError(f"Unexpected error during query execution: {str(e)}")
 
 
-def create_clickhouse_client():
-    client_config = get_config().get_client_config()
-    logger.info(
-        f"Creating ClickHouse client connection to {client_config['host']}:{client_config['port']} "
-        f"as {client_config['username']} "
-        f"(secure={client_config['secure']}, verify={client_config['verify']}, "
-        f"connect_timeout={client_config['connect_timeout']}s, "
-        f"send_receive_timeout={client_config['send_receive_timeout']}s)"
+def execute_summary(query: str, query_id: str, parameters: Optional[dict], top_k: int):
+    client = create_clickhouse_client()
+    config = get_config()
+    settings = {
+        **settable_limits(config.get_query_limits(), client.server_settings),
+        "readonly": get_readonly_setting(client),
+        "query_id": query_id,
+    }
+    start = time.perf_counter()
+    try:
+        with span("clickhouse.query", {"db.system": "clickhouse", "clickhouse.query_id": query_id}):
+            # Columns are read as NumPy arrays, one block at a time
+            with client.query_np_stream(
+                query,
+                parameters=parameters,
+                settings=settings,
+                transport_settings=trace_headers(),
+            ) as stream:
+                summary = ResultSummary(
+                    stream.source.column_names,
+                    [column_type.name for column_type in stream.source.column_types],
+                    top_k=top_k,
+                    max_chars=config.max_cell_chars,
+                )
+                for block in stream:
+                    summary.add_block(block)
+    except Exception:
+        _record_query_stats(query, start, failed=True, query_id=query_id)
+        raise
+    _record_query_stats(
+        query, start, rows=summary.rows, summary=stream.source.summary, query_id=query_id
     )
+    log_event(logger, logging.INFO, "summary.done", rows=summary.rows)
+    audit_result(rows=summary.rows)
+    return summary.to_dict()
+
+
+def summarize_query(query: str, parameters: Optional[dict] = None, top_k: int = 5):
+    """Run a SELECT query in ClickHouse and return a summary of each result column
+    instead of its rows
+
+    Use it to learn the shape of a large result: for every column the number of
+    nulls; for numbers min, max, mean, standard deviation, quantiles and a histogram;
+    for dates min and max; for other types the `top_k` most frequent values (at most
+    100). Quantiles and histograms come from a sample of 10,000 values per column.
+    `parameters` works as in run_select_query."""
+    if not 1 <= top_k <= 100:
+        raise ToolError("top_k must be between 1 and 100")
+    if parameters:
+        _check_query_parameters(query, parameters)
+    log_event(logger, logging.INFO, "summary.start", query=QueryText(query))
+    query_id = str(uuid.uuid4())
+    future = QUERY_EXECUTOR.submit(
+        in_current_context(execute_summary), query, query_id, parameters or None, top_k
+    )
+    try:
+        return future.result(timeout=SELECT_QUERY_TIMEOUT_SECS)
+    except concurrent.futures.TimeoutError:
+        log_event(
+            logger,
+            logging.WARNING,
+            "summary.timeout",
+            query=QueryText(query),
+            timeout_secs=SELECT_QUERY_TIMEOUT_SECS,
+        )
+        _kill_query_in_background(query_id)
+        raise ToolError(f"Query timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
+    except Exception as e:
+        log_event(logger, logging.ERROR, "summary.error", query=QueryText(query), error=str(e))
+        raise ToolError(f"Query execution failed: {e}")
+
+
+def query_stats(sort_by: str = "total_time", limit: int = 10):
+    """Show the query shapes that cost the most, from statistics kept by this server
+
+    Queries run by run_select_query, summarize_query, materialize_query and query jobs
+    are grouped by fingerprint: the query with its literals replaced by `?`, so that
+    queries differing only in their constants share one entry. For each shape: calls,
+    errors, total, mean, max and p50/p95/p99 latency, rows returned, and rows and bytes
+    read by the server, and query cache hits. Read counts are completed from
+    system.query_log shortly after a query ends, which is also where hits are counted
+    from; `partial_read_counts` is the number of calls still counted from the response
+    header, which falls short for streamed scans. Sort by "total_time", "mean_time",
+    "max_time", "p95_time", "calls", "errors", "read_rows" or "read_bytes"; `limit` is
+    at most 100."""
+    if sort_by not in SORT_KEYS:
+        raise ToolError(f"sort_by must be one of: {', '.join(SORT_KEYS)}")
+    if not 1 <= limit <= 100:
+        raise ToolError("limit must be between 1 and 100")
+    if _tenant() is not None:
+        raise ToolError(
+            "query_stats is not available with request credentials: "
+            "the statistics cover the queries of every user"
+        )
+    return {
+        "since": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(QUERY_STATS.started_at)),
+        "fingerprints": len(QUERY_STATS),
+        "evicted_fingerprints": QUERY_STATS.evicted,
+        "queries": QUERY_STATS.top(sort_by, limit),
+    }
+
+
+def _jobs_dir() -> str:
+    path = get_config().jobs_dir or os.path.join(tempfile.gettempdir(), "mcp-clickhouse-jobs")
+    # Spill files hold query results: keep them from other users of the machine
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def execute_query_job(job: QueryJob, limits: dict, parameters: Optional[dict]):
+    """Run a query job, spilling its rows to the job's file."""
+    with QUERY_JOB_SLOTS:
+        if not QUERY_JOBS.start(job):
+            return
+        log_event(logger, logging.INFO, "job.start", job_id=job.job_id, query=QueryText(job.query))
+        start = time.perf_counter()
+        try:
+            client = create_clickhouse_client()
+            settings = {
+                **settable_limits(limits, client.server_settings),
+                "readonly": get_readonly_setting(client),
+                "query_id": job.query_id,
+            }
+            max_bytes = get_config().jobs_max_result_bytes
+            with span(
+                "clickhouse.query", {"db.system": "clickhouse", "clickhouse.query_id": job.query_id}
+            ):
+                with (
+                    client.query_row_block_stream(
+                        job.query,
+                        parameters=parameters,
+                        settings=settings,
+                        transport_settings=trace_headers(),
+                    ) as stream,
+                    job.open_spill() as out,
+                ):
+                    job.columns = list(stream.source.column_names)
+                    for block in stream:
+                        if job.cancel_requested or not job.write_rows(out, block, max_bytes):
+                            break
+            _record_query_stats(
+                job.query,
+                start,
+                rows=job.rows,
+                summary=stream.source.summary,
+                query_id=job.query_id,
+            )
+            QUERY_JOBS.finish(job)
+        except Exception as e:
+            _record_query_stats(job.query, start, failed=True, query_id=job.query_id)
+            QUERY_JOBS.finish(job, error=str(e))
+    log_event(
+        logger,
+        logging.INFO,
+        "job.done",
+        job_id=job.job_id,
+        state=job.state,
+        rows=job.rows,
+        result_bytes=job.bytes,
+        error=job.error,
+    )
+
 
+def _get_query_job(job_id: str) -> QueryJob:
+    QUERY_JOBS.expire(get_config().jobs_ttl_secs)
+    job = QUERY_JOBS.get(job_id)
+    # Jobs of other users of request credentials are not theirs to see
+    if job is None or job.owner != _tenant():
+        raise ToolError(f"Unknown or expired query job '{job_id}'")
+    return job
+
+
+def submit_query(query: str, parameters: Optional[dict] = None, limits: Optional[dict] = None):
+    """Start a long-running SELECT query in ClickHouse without waiting for its result
+
+    Use this for queries that may take longer than run_select_query allows. Returns a
+    job_id at once: follow the job with query_status, page through its rows with
+    fetch_query_result once it is done, or stop it with cancel_query. `parameters`
+    and `limits` work as in run_select_query, except that jobs may run for up to
+    CLICKHOUSE_JOBS_MAX_EXECUTION_TIME seconds."""
+    config = get_config()
+    limits = _tighten_limits(config.get_job_limits(), limits)
+    if parameters:
+        _check_query_parameters(query, parameters)
+    QUERY_JOBS.expire(config.jobs_ttl_secs)
+    job_id = str(uuid.uuid4())
+    job = QueryJob(
+        job_id=job_id,
+        query=query,
+        query_id=str(uuid.uuid4()),
+        path=os.path.join(_jobs_dir(), f"{job_id}.jsonl"),
+        owner=_tenant(),
+    )
     try:
-        client = clickhouse_connect.get_client(**client_config)
-        # Test the connection
-        version = client.server_version
-        logger.info(f"Successfully connected to ClickHouse server version {version}")
+        QUERY_JOBS.add(job, config.jobs_max)
+    except JobLimitExceeded as e:
+        raise ToolError(f"{e}; wait for one to finish or cancel one")
+    threading.Thread(
+        target=in_current_context(execute_query_job),
+        args=(job, limits, parameters or None),
+        name=f"query-job-{job_id[:8]}",
+        daemon=True,
+    ).start()
+    return job.to_dict()
+
+
+def query_status(job_id: str):
+    """Get the state of a query job and, while it runs, its progress on the server"""
+    job = _get_query_job(job_id)
+    status = job.to_dict()
+    if job.state == RUNNING:
+        try:
+            client = create_clickhouse_client()
+            result = client.query(
+                "SELECT elapsed, read_rows, read_bytes, total_rows_approx, memory_usage "
+                "FROM system.processes WHERE query_id = {query_id:String}",
+                parameters={"query_id": job.query_id},
+            )
+            if result.result_rows:
+                progress = dict(zip(result.column_names, result.result_rows[0]))
+                if progress["total_rows_approx"]:
+                    progress["fraction_done"] = round(
+                        min(progress["read_rows"] / progress["total_rows_approx"], 1.0), 4
+                    )
+                status["progress"] = progress
+        except Exception as e:
+            logger.warning("Failed to read the progress of query job %s: %s", job_id, e)
+    return status
+
+
+def fetch_query_result(job_id: str, offset: int = 0, limit: int = 1000):
+    """Get a page of rows of a finished query job
+
+    Rows are numbered from 0; pass the response's next_offset back as `offset` to get
+    the next page, until it is null. Pages are also bounded like run_select_query
+    results, so a page may hold fewer than `limit` rows."""
+    if offset < 0 or not 1 <= limit <= QUERY_JOB_PAGE_MAX_ROWS:
+        raise ToolError(
+            f"offset must be at least 0 and limit between 1 and {QUERY_JOB_PAGE_MAX_ROWS}"
+        )
+    job = _get_query_job(job_id)
+    if job.state not in (DONE, CANCELLED):
+        detail = f": {job.error}" if job.error else ""
+        raise ToolError(f"Query job {job_id} is {job.state}{detail}")
+    config = get_config()
+    budget = ResultBudget(config.max_cell_chars, config.max_result_bytes)
+    try:
+        rows = job.read_rows(offset, limit)
+    except FileNotFoundError:
+        raise ToolError(f"Query job '{job_id}' expired while its result was read")
+    budget.add_rows(rows)
+    next_offset = offset + len(budget.rows)
+    return {
+        "job_id": job_id,
+        "state": job.state,
+        "columns": job.columns,
+        "rows": budget.rows,
+        "offset": offset,
+        "next_offset": next_offset if next_offset < job.rows else None,
+        "total_rows": job.rows,
+        "result_truncated": job.result_truncated,
+        "budget": budget.summary(job.columns),
+    }
+
+
+def cancel_query(job_id: str):
+    """Cancel a queued or running query job, killing its query in ClickHouse"""
+    job = _get_query_job(job_id)
+    if QUERY_JOBS.cancel(job):
+        _kill_query(job.query_id)
+    return job.to_dict()
+
+
+def create_clickhouse_client(request_credentials: bool = True):
+    """Create a client, as the user of the request's credentials if the call has any.
+
+    Args:
+        request_credentials: Set to False to connect as the configured user anyway, for
+            state shared by every user
+    """
+    config = get_config()
+    client_config = config.get_client_config()
+    client_config["connect_timeout"] = BACKEND_BREAKER.connect_timeout(
+        config.connect_timeout, config.connect_timeout_min_secs
+    )
+    credentials = REQUEST_CREDENTIALS.get() if request_credentials else None
+    if credentials is not None:
+        client_config["username"] = credentials.username
+        client_config["password"] = credentials.password
+        client_config["pool_mgr"] = CREDENTIAL_POOLS.get(
+            credentials.key, config.mcp_credential_pools, config.mcp_credential_pool_idle_secs
+        )
+    log_event(
+        logger,
+        logging.DEBUG,
+        "client.connect",
+        host=client_config["host"],
+        port=client_config["port"],
+        user=client_config["username"],
+        secure=client_config["secure"],
+        verify=client_config["verify"],
+        connect_timeout=client_config["connect_timeout"],
+        send_receive_timeout=client_config["send_receive_timeout"],
+    )
+
+    try:
+        start = time.perf_counter()
+        with span("clickhouse.connect", {"server.address": client_config["host"]}):
+            client = clickhouse_connect.get_client(**client_config)
+            # Test the connection
+            version = client.server_version
+        BACKEND_BREAKER.connect_latencies.add(time.perf_counter() - start)
+        log_event(logger, logging.DEBUG, "client.connected", server_version=version)
         return client
     except Exception as e:
-        logger.error(f"Failed to connect to ClickHouse: {str(e)}")
+        logger.error("Failed to connect to ClickHouse: %s", e)
+        _reset_connections_on_network_error(e)
         raise
 
 
@@ -262,10 +1604,15 @@ def execute_chdb_query(query: str):
     """Execute a query using chDB client."""
     client = create_chdb_client()
     try:
-        res = client.query(query, "JSON")
+        SCRATCH_TABLES.touch(query)
+        _drop_expired_scratch_tables(client)
+        with span("chdb.query"):
+            res = client.query(query, "JSON")
         if res.has_error():
             error_msg = res.error_message()
-            logger.error(f"Error executing chDB query: {error_msg}")
+            log_event(
+                logger, logging.ERROR, "chdb_query.error", query=QueryText(query), error=error_msg
+            )
             return {"error": error_msg}
 
         result_data = res.data()
@@ -277,28 +1624,32 @@ def execute_chdb_query(query: str):
         return result_json.get("data", [])
 
     except Exception as err:
-        logger.error(f"Error executing chDB query: {err}")
+        log_event(logger, logging.ERROR, "chdb_query.error", query=QueryText(query), error=str(err))
         return {"error": str(err)}
 
 
 def run_chdb_select_query(query: str):
     """Run SQL in chDB, an in-process ClickHouse engine"""
-    logger.info(f"Executing chDB SELECT query: {query}")
+    log_event(logger, logging.INFO, "chdb_query.start", query=QueryText(query))
     try:
-        future = QUERY_EXECUTOR.submit(execute_chdb_query, query)
+        future = QUERY_EXECUTOR.submit(in_current_context(execute_chdb_query), query)
         try:
             result = future.result(timeout=SELECT_QUERY_TIMEOUT_SECS)
             # Check if we received an error structure from execute_chdb_query
             if isinstance(result, dict) and "error" in result:
-                logger.warning(f"chDB query failed: {result['error']}")
+                logger.warning("chDB query failed: %s", result["error"])
                 return {
                     "status": "error",
                     "message": f"chDB query failed: {result['error']}",
                 }
             return result
         except concurrent.futures.TimeoutError:
-            logger.warning(
-                f"chDB query timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds: {query}"
+            log_event(
+                logger,
+                logging.WARNING,
+                "chdb_query.timeout",
+                query=QueryText(query),
+                timeout_secs=SELECT_QUERY_TIMEOUT_SECS,
             )
             future.cancel()
             return {
@@ -306,15 +1657,194 @@ def run_chdb_select_query(query: str):
                 "message": f"chDB query timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds",
             }
     except Exception as e:
-        logger.error(f"Unexpected error in run_chdb_select_query: {e}")
+        logger.error("Unexpected error in run_chdb_select_query: %s", e)
         return {"status": "error", "message": f"Unexpected error: {e}"}
 
 
+def _chdb_command(client, statement: str):
+    res = client.query(statement, "JSON")
+    if res.has_error():
+        raise RuntimeError(res.error_message())
+    return res
+
+
+def _drop_expired_scratch_tables(client):
+    for name in SCRATCH_TABLES.expire(get_chdb_config().scratch_idle_ttl_secs):
+        _chdb_command(client, f"DROP TABLE IF EXISTS {SCRATCH_DATABASE}.{quote_identifier(name)}")
+        log_event(logger, logging.INFO, "scratch.expired", table=name)
+
+
+def _pull_native(query: str, query_id: str, parameters: Optional[dict], path: str, max_bytes: int):
+    """Stream a ClickHouse result in Native format into a file, returning its size."""
+    client = create_clickhouse_client()
+    config = get_config()
+    settings = {
+        **settable_limits(config.get_query_limits(), client.server_settings),
+        "readonly": get_readonly_setting(client),
+        "query_id": query_id,
+    }
+    size = 0
+    start = time.perf_counter()
+    try:
+        with span("clickhouse.query", {"db.system": "clickhouse", "clickhouse.query_id": query_id}):
+            stream = client.raw_stream(
+                query,
+                parameters=parameters,
+                settings=settings,
+                fmt="Native",
+                transport_settings=trace_headers(),
+            )
+            try:
+                with open(path, "wb") as out:
+                    while chunk := stream.read(SCRATCH_CHUNK_BYTES):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            # Closing the stream early cancels the query on the server
+                            raise ScratchQuotaExceeded(
+                                f"The result exceeds the {max_bytes} bytes left for scratch tables"
+                            )
+                        out.write(chunk)
+            finally:
+                stream.close()
+    except Exception:
+        _record_query_stats(query, start, failed=True, query_id=query_id)
+        raise
+    _record_query_stats(query, start, query_id=query_id)
+    return size
+
+
+def execute_materialize(query: str, table: str, query_id: str, parameters: Optional[dict]):
+    chdb_client = create_chdb_client()
+    chdb_config = get_chdb_config()
+    _drop_expired_scratch_tables(chdb_client)
+    available = SCRATCH_TABLES.available_bytes(chdb_config.scratch_max_bytes, replacing=table)
+    target = f"{SCRATCH_DATABASE}.{quote_identifier(table)}"
+    fd, path = tempfile.mkstemp(prefix="mcp-scratch-", suffix=".native")
+    os.close(fd)
+    try:
+        size = _pull_native(query, query_id, parameters, path, available)
+        if size == 0:
+            raise ToolError("The query returned no rows, there is nothing to materialize")
+        with span("chdb.query"):
+            SCRATCH_TABLES.remove(table)
+            _chdb_command(chdb_client, f"CREATE DATABASE IF NOT EXISTS {SCRATCH_DATABASE}")
+            _chdb_command(chdb_client, f"DROP TABLE IF EXISTS {target}")
+            _chdb_command(
+                chdb_client,
+                f"CREATE TABLE {target} ENGINE = MergeTree ORDER BY tuple() "
+                f"AS SELECT * FROM file({format_query_value(path)}, 'Native')",
+            )
+            described = json.loads(_chdb_command(chdb_client, f"DESCRIBE TABLE {target}").data())
+            counted = json.loads(_chdb_command(chdb_client, f"SELECT count() FROM {target}").data())
+        rows = int(counted["data"][0]["count()"])
+        try:
+            scratch = SCRATCH_TABLES.add(table, rows, size, chdb_config.scratch_max_bytes)
+        except ScratchQuotaExceeded:
+            _chdb_command(chdb_client, f"DROP TABLE IF EXISTS {target}")
+            raise
+    finally:
+        os.unlink(path)
+    log_event(logger, logging.INFO, "scratch.materialized", table=table, rows=rows, bytes=size)
+    audit_result(rows=rows, result_bytes=size)
+    return {
+        **scratch.to_dict(chdb_config.scratch_idle_ttl_secs),
+        "columns": [
+            {"name": column["name"], "type": column["type"]} for column in described["data"]
+        ],
+        "available_bytes": SCRATCH_TABLES.available_bytes(chdb_config.scratch_max_bytes),
+    }
+
+
+def materialize_query(query: str, table: str, parameters: Optional[dict] = None):
+    """Run a SELECT query in ClickHouse and store its result in a chDB scratch table
+
+    The result is pulled once into `mcp_scratch.<table>` in the chDB session, replacing
+    any scratch table of that name. Slice and aggregate it further with
+    run_chdb_select_query, e.g. `SELECT ... FROM mcp_scratch.<table>`, without
+    querying the ClickHouse cluster again. Scratch tables share a size quota and are
+    dropped after being left unused for a while; the response reports when.
+    `parameters` works as in run_select_query."""
+    if _tenant() is not None:
+        raise ToolError(
+            "materialize_query is not available with request credentials: "
+            "the chDB session is shared by every user"
+        )
+    try:
+        check_table_name(table)
+    except ValueError as e:
+        raise ToolError(str(e))
+    if parameters:
+        _check_query_parameters(query, parameters)
+    log_event(logger, logging.INFO, "scratch.start", query=QueryText(query), table=table)
+    query_id = str(uuid.uuid4())
+    future = QUERY_EXECUTOR.submit(
+        in_current_context(execute_materialize), query, table, query_id, parameters or None
+    )
+    try:
+        return future.result(timeout=SELECT_QUERY_TIMEOUT_SECS)
+    except concurrent.futures.TimeoutError:
+        log_event(
+            logger,
+            logging.WARNING,
+            "scratch.timeout",
+            query=QueryText(query),
+            timeout_secs=SELECT_QUERY_TIMEOUT_SECS,
+        )
+        _kill_query_in_background(query_id)
+        raise ToolError(f"Materialization timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
+    except ToolError:
+        raise
+    except Exception as e:
+        log_event(logger, logging.ERROR, "scratch.error", query=QueryText(query), error=str(e))
+        raise ToolError(f"Materialization failed: {e}")
+
+
 def chdb_initial_prompt() -> str:
     """This prompt helps users understand how to interact and perform common operations in chDB"""
     return CHDB_PROMPT
 
 
+@on_config_reload
+def _drain_connection_pool(old_config, new_config):
+    """Drop pooled HTTP connections so new clients connect with the reloaded settings.
+
+    In-flight requests finish on their current connection, which is then discarded.
+    """
+    # Warm connections are opened again with the new settings
+    CONNECTION_WARMER.reset()
+    CREDENTIAL_POOLS.clear()
+    # The reloaded settings may point at another server
+    BACKEND_BREAKER.reset()
+    logger.info("Configuration reloaded, drained pooled ClickHouse connections")
+
+
+def _reload_config_from_signal():
+    """Re-read the .env file and environment, then swap the configuration snapshot."""
+    try:
+        load_dotenv(override=True)
+        reload_config()
+    except Exception as e:
+        logger.error(f"Configuration reload failed, keeping previous configuration: {e}")
+
+
+def install_reload_handler():
+    """Reload the configuration on SIGHUP where the platform supports it.
+
+    Called by the entry points rather than at import, so that importing the module
+    leaves the SIGHUP handler of the host process alone.
+    """
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return
+    # Run the reload off the signal handler so it never contends for locks held by the
+    # interrupted frame.
+    signal.signal(
+        signal.SIGHUP,
+        lambda signum, frame: threading.Thread(
+            target=_reload_config_from_signal, name="config-reload", daemon=True
+        ).start(),
+    )
+
+
 def _init_chdb_client():
     """Initialize the global chDB client instance."""
     try:
@@ -326,6 +1856,8 @@ def _init_chdb_client():
         data_path = client_config["data_path"]
         logger.info(f"Creating chDB client with data_path={data_path}")
         client = chs.Session(path=data_path)
+        # Scratch tables left by an earlier process are not tracked by this one
+        _chdb_command(client, f"DROP DATABASE IF EXISTS {SCRATCH_DATABASE}")
         logger.info(f"Successfully connected to chDB with data_path={data_path}")
         return client
     except Exception as e:
@@ -335,9 +1867,19 @@ def _init_chdb_client():
 
 # Register tools based on configuration
 if os.getenv("CLICKHOUSE_ENABLED", "true").lower() == "true":
-    mcp.add_tool(Tool.from_function(list_databases))
-    mcp.add_tool(Tool.from_function(list_tables))
-    mcp.add_tool(Tool.from_function(run_select_query))
+    mcp.add_tool(Tool.from_function(list_databases, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(list_tables, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(describe_table_storage, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(preview_table, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(column_values, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(search_schema, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(run_select_query, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(summarize_query, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(submit_query, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(query_status, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(fetch_query_result, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(cancel_query, serializer=serialize_result))
+    mcp.add_tool(Tool.from_function(query_stats, serializer=serialize_result))
     logger.info("ClickHouse tools registered")
 
 
@@ -346,7 +1888,9 @@ if os.getenv("CHDB_ENABLED", "false").lower() == "true":
     if _chdb_client:
         atexit.register(lambda: _chdb_client.close())
 
-    mcp.add_tool(Tool.from_function(run_chdb_select_query))
+    mcp.add_tool(Tool.from_function(run_chdb_select_query, serializer=serialize_result))
+    if os.getenv("CLICKHOUSE_ENABLED", "true").lower() == "true":
+        mcp.add_tool(Tool.from_function(materialize_query, serializer=serialize_result))
     chdb_prompt = Prompt.from_function(
         chdb_initial_prompt,
         name="chdb_initial_prompt",
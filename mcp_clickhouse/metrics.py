@@ -0,0 +1,87 @@
+"""Prometheus text exposition of the server's metrics, served at `/metrics`."""
+
+import re
+from typing import Iterable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NAME_END_RE = re.compile(r"[{\s]")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class MetricFamily:
+    """A metric and its samples.
+
+    Args:
+        name: Metric name
+        kind: Prometheus type - "counter", "gauge" or "summary"
+        help: One-line description
+    """
+
+    def __init__(self, name: str, kind: str, help: str):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.samples: list = []
+
+    def add(self, value, suffix: str = "", **labels) -> None:
+        """Add a sample, named after the family plus `suffix`, e.g. "_sum"."""
+        self.samples.append((suffix, labels, value))
+
+
+def render(families: Iterable[MetricFamily]) -> str:
+    lines = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for suffix, labels, value in family.samples:
+            label_text = ",".join(f'{key}="{_escape(v)}"' for key, v in labels.items())
+            label_text = "{" + label_text + "}" if label_text else ""
+            lines.append(f"{family.name}{suffix}{label_text} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _add_label(sample: str, name: str, value: str) -> str:
+    end = _NAME_END_RE.search(sample)
+    if end is None:
+        return sample
+    head, tail = sample[: end.start()], sample[end.start() :]
+    if tail.startswith("{"):
+        return f'{head}{{{name}="{value}",{tail[1:]}'
+    return f'{head}{{{name}="{value}"}}{tail}'
+
+
+def merge_worker_metrics(texts: list) -> str:
+    """Merge the metrics of worker processes, adding a `worker` label to every sample.
+
+    Samples of a metric stay grouped under its HELP and TYPE lines, as the format
+    requires.
+    """
+    # metric name -> (HELP and TYPE lines, samples), in order of first appearance
+    families: dict = {}
+    for index, text in enumerate(texts):
+        current = families.setdefault("", ([], []))
+        for line in text.splitlines():
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) < 3:
+                    continue
+                current = families.setdefault(parts[2], ([], []))
+                if line not in current[0]:
+                    current[0].append(line)
+            elif line.strip():
+                current[1].append(_add_label(line, "worker", str(index)))
+    lines = []
+    for meta, samples in families.values():
+        lines.extend(meta)
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
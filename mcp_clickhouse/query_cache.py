@@ -0,0 +1,72 @@
+"""Use of the ClickHouse query cache by run_select_query.
+
+ClickHouse 23.5 and later can keep the result of a SELECT and answer the same query
+from memory until the entry expires (the `use_query_cache` setting). The cache is
+opt-in, since a cached result may be up to `query_cache_ttl` seconds old. Queries
+calling non-deterministic functions or reading system tables are not eligible: the
+server either refuses to cache them or fails them, depending on its version.
+
+Whether a result came from the cache is not known when the response is built: the
+progress summary sent with the response headers is taken before a streamed scan has
+read much, if anything. Hits are counted from system.query_log afterwards instead, by
+query fingerprint (see `QueryStats.apply_final_counts`).
+"""
+
+import re
+from typing import Optional, Tuple
+
+from mcp_clickhouse.sql_fingerprint import normalize_query
+
+MIN_SERVER_VERSION = "23.5"
+
+# Matched against the normalized query, which is lowercase outside quoted identifiers
+_NONDETERMINISTIC_RE = re.compile(
+    r"\b(?:now|now64|nowinblock|today|yesterday|rand\w*|generateuuidv\d|generateulid"
+    r"|generatesnowflakeid|currentuser|currentroles|enabledroles|defaultroles"
+    r"|currentprofiles|queryid|initialqueryid|uptime|hostname|fqdn|serveruuid"
+    r"|rownumberinallblocks|blocknumber|runningdifference\w*|runningaccumulate"
+    r"|neighbor|timezone|servertimezone)\s*\("
+)
+_SYSTEM_TABLE_RE = re.compile(
+    r"(?:\bsystem|\binformation_schema|[\"`](?:system|information_schema|INFORMATION_SCHEMA)[\"`])"
+    r"\s*\."
+)
+
+
+def is_cacheable(query: str) -> bool:
+    """Tell whether the result of a query depends on nothing but the data it reads."""
+    normalized = normalize_query(query)
+    return not (_NONDETERMINISTIC_RE.search(normalized) or _SYSTEM_TABLE_RE.search(normalized))
+
+
+def query_cache_settings(
+    config, client, query: str, requested: Optional[bool] = None
+) -> Tuple[dict, Optional[dict]]:
+    """Decide whether a query uses the server's query cache.
+
+    Args:
+        config: ClickHouseConfig with the cache policy
+        client: Connected clickhouse_connect client, whose server version is checked
+        query: The query to run
+        requested: The caller's choice, overriding the policy unless None
+
+    Returns:
+        The settings to add to the query, and the `query_cache` report of the
+        response, None when the cache is neither configured nor requested
+    """
+    if requested is None and not config.query_cache:
+        return {}, None
+    if requested is False:
+        return {}, {"used": False, "reason": "disabled for this query"}
+    if not client.min_version(MIN_SERVER_VERSION):
+        reason = f"requires ClickHouse {MIN_SERVER_VERSION} or later"
+        return {}, {"used": False, "reason": reason}
+    if not is_cacheable(query):
+        reason = "query calls non-deterministic functions or reads system tables"
+        return {}, {"used": False, "reason": reason}
+    settings = {
+        "use_query_cache": 1,
+        "query_cache_ttl": config.query_cache_ttl_secs,
+        "query_cache_min_query_duration": config.query_cache_min_duration_ms,
+    }
+    return settings, {"used": True}
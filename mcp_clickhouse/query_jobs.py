@@ -0,0 +1,215 @@
+"""Asynchronous query jobs.
+
+`submit_query` registers a job and returns at once; the query runs on a background
+thread for as long as its own limits allow, with no MCP request waiting on it. Rows are
+spilled to a file of JSON lines on local disk as they arrive, so a large result holds
+no memory, and `fetch_query_result` pages through the file once the job is done.
+
+The registry is bounded: when it is full the oldest finished job makes room, and jobs
+expire with their files a TTL after they finish.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from pydantic_core import to_json
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# The file offset of every PAGE_INDEX_ROWS-th row is kept so that pages start with a seek
+PAGE_INDEX_ROWS = 1000
+
+
+class JobLimitExceeded(ValueError):
+    """Raised when the registry is full of jobs that have not finished."""
+
+
+@dataclass
+class QueryJob:
+    job_id: str
+    query: str
+    query_id: str
+    path: str
+    state: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    columns: list = field(default_factory=list)
+    rows: int = 0
+    bytes: int = 0
+    result_truncated: bool = False
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    # Credential hash of the user that submitted the job, None for the configured user
+    owner: Optional[str] = None
+    _row_offsets: list = field(default_factory=list, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "query_id": self.query_id,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "rows": self.rows,
+            "result_bytes": self.bytes,
+            "result_truncated": self.result_truncated,
+            "error": self.error,
+        }
+
+    def open_spill(self):
+        """Create the spill file for writing, readable by its owner only."""
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        return os.fdopen(fd, "wb")
+
+    def write_rows(self, out, rows, max_bytes: int) -> bool:
+        """Append rows to the spill file.
+
+        Returns:
+            False once `max_bytes` is reached and no more rows should be written
+        """
+        for row in rows:
+            line = to_json(list(row), fallback=str) + b"\n"
+            if max_bytes > 0 and self.bytes + len(line) > max_bytes:
+                self.result_truncated = True
+                return False
+            if self.rows % PAGE_INDEX_ROWS == 0:
+                self._row_offsets.append(self.bytes)
+            out.write(line)
+            self.bytes += len(line)
+            self.rows += 1
+        return True
+
+    def read_rows(self, offset: int, limit: int) -> list:
+        """Read up to `limit` rows of the spill file, starting at row `offset`.
+
+        Raises:
+            FileNotFoundError: If the job expired and its spill file was deleted
+        """
+        if offset >= self.rows or limit <= 0:
+            return []
+        index = offset // PAGE_INDEX_ROWS
+        skip = offset - index * PAGE_INDEX_ROWS
+        rows = []
+        with open(self.path, "rb") as spill:
+            spill.seek(self._row_offsets[index])
+            for line in spill:
+                if skip:
+                    skip -= 1
+                    continue
+                rows.append(json.loads(line))
+                if len(rows) == limit:
+                    break
+        return rows
+
+
+def _delete_spill(job: QueryJob) -> None:
+    try:
+        os.unlink(job.path)
+    except FileNotFoundError:
+        pass
+
+
+class QueryJobRegistry:
+    """Bounded registry of query jobs, handling their state changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: dict[str, QueryJob] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def add(self, job: QueryJob, max_jobs: int) -> None:
+        """Register a new job, evicting the oldest finished job if the registry is full.
+
+        Args:
+            job: The new job
+            max_jobs: Maximum number of jobs kept, finished or not
+
+        Raises:
+            JobLimitExceeded: If every registered job is still queued or running
+        """
+        with self._lock:
+            evicted = None
+            if len(self._jobs) >= max_jobs:
+                finished = [j for j in self._jobs.values() if j.finished]
+                if not finished:
+                    raise JobLimitExceeded(
+                        f"{len(self._jobs)} query jobs are already queued or running"
+                    )
+                evicted = min(finished, key=lambda j: j.finished_at)
+                del self._jobs[evicted.job_id]
+            self._jobs[job.job_id] = job
+        if evicted is not None:
+            _delete_spill(evicted)
+
+    def get(self, job_id: str) -> Optional[QueryJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def start(self, job: QueryJob) -> bool:
+        """Move a queued job to running, unless it was cancelled while it waited."""
+        with self._lock:
+            if job.cancel_requested:
+                return False
+            job.state = RUNNING
+            job.started_at = time.time()
+            return True
+
+    def finish(self, job: QueryJob, error: Optional[str] = None) -> None:
+        with self._lock:
+            if job.cancel_requested:
+                job.state = CANCELLED
+            elif error is not None:
+                job.state = FAILED
+                job.error = error
+            else:
+                job.state = DONE
+            job.finished_at = time.time()
+
+    def cancel(self, job: QueryJob) -> bool:
+        """Ask a job to stop.
+
+        Returns:
+            Whether the job was running, in which case its query should be killed
+        """
+        with self._lock:
+            if job.finished:
+                return False
+            job.cancel_requested = True
+            if job.state == QUEUED:
+                job.state = CANCELLED
+                job.finished_at = time.time()
+                return False
+            return True
+
+    def expire(self, ttl_secs: int, now=None) -> list[QueryJob]:
+        """Drop the jobs that finished more than `ttl_secs` ago and delete their files."""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                job
+                for job in self._jobs.values()
+                if job.finished and now - job.finished_at > ttl_secs
+            ]
+            for job in expired:
+                del self._jobs[job.job_id]
+        for job in expired:
+            _delete_spill(job)
+        return expired
@@ -0,0 +1,120 @@
+"""Resource limits applied to queries as ClickHouse settings.
+
+The server's profile (see `ClickHouseConfig.get_query_limits()`) is enforced by
+ClickHouse itself, so a query over a limit is stopped by the cluster rather than only
+abandoned by the client. Callers may tighten the profile for a single query but never
+loosen it. A limit the profile leaves unset is capped by the server's own default for
+the user, as read from its settings; it cannot be set when that default is unknown.
+
+Limits the user may not change, e.g. every setting of a user with readonly=1, are left
+to the user's own profile on the server: clickhouse_connect refuses to send them.
+"""
+
+import re
+from typing import Collection, Mapping, Optional
+
+NUMERIC_LIMITS = (
+    "max_execution_time",
+    "max_memory_usage",
+    "max_rows_to_read",
+    "max_bytes_to_read",
+    "max_threads",
+)
+# Overflow modes from the most to the least permissive
+OVERFLOW_MODES = ("break", "throw")
+
+_INTEGER_RE = re.compile(r"\d+")
+
+
+def server_limits(server_settings: Mapping) -> dict:
+    """Read the numeric limits a ClickHouse user runs with by default.
+
+    Args:
+        server_settings: Settings of a client session, e.g. `client.server_settings`,
+            holding clickhouse_connect SettingDef objects or plain strings
+
+    Returns:
+        The limits whose value could be read, 0 meaning unlimited. `max_threads` reads
+        as the number of threads its `auto(N)` value stands for.
+    """
+    limits = {}
+    for name in NUMERIC_LIMITS:
+        setting = server_settings.get(name)
+        match = _INTEGER_RE.search(str(getattr(setting, "value", setting) or ""))
+        if match:
+            limits[name] = int(match.group())
+    return limits
+
+
+def locked_limits(server_settings: Mapping) -> set:
+    """Get the limits a ClickHouse user may not change.
+
+    Args:
+        server_settings: Settings of a client session, as for `server_limits()`
+
+    Returns:
+        Names of the limits the server reports as readonly or does not know
+    """
+    return {
+        name
+        for name in (*NUMERIC_LIMITS, "timeout_overflow_mode")
+        if server_settings.get(name) is None or getattr(server_settings[name], "readonly", 0)
+    }
+
+
+def settable_limits(limits: dict, server_settings: Mapping) -> dict:
+    """Drop the limits of a query that its user may not change, see `locked_limits()`."""
+    locked = locked_limits(server_settings)
+    return {name: value for name, value in limits.items() if name not in locked}
+
+
+def tighten_limits(
+    profile: dict,
+    requested: Optional[dict],
+    server_defaults: Optional[dict] = None,
+    locked: Collection[str] = (),
+) -> dict:
+    """Combine the server's limits with the limits requested for one query.
+
+    Args:
+        profile: Limits of the server, numeric limits absent when left to the server
+        requested: Limits asked for by the caller, possibly None
+        server_defaults: Limits the server applies when the profile leaves them unset,
+            as returned by `server_limits()`; None if unknown
+        locked: Limits the user may not change, as returned by `locked_limits()`
+
+    Returns:
+        The settings to apply to the query
+
+    Raises:
+        ValueError: If a requested limit is unknown, invalid or looser than the profile
+    """
+    limits = dict(profile)
+    for name, value in (requested or {}).items():
+        if name in locked:
+            raise ValueError(f"{name} cannot be set: the ClickHouse user may not change it")
+        if name in NUMERIC_LIMITS:
+            if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+                raise ValueError(f"{name} must be a positive integer, got {value!r}")
+            if name in profile:
+                if value > profile[name]:
+                    raise ValueError(f"{name} cannot exceed the server limit of {profile[name]}")
+            else:
+                default = (server_defaults or {}).get(name)
+                if default is None:
+                    raise ValueError(f"{name} cannot be set: the server's default is unknown")
+                # 0 is unlimited
+                if 0 < default < value:
+                    raise ValueError(f"{name} cannot exceed the server default of {default}")
+            limits[name] = value
+        elif name == "timeout_overflow_mode":
+            if value not in OVERFLOW_MODES:
+                raise ValueError(f"timeout_overflow_mode must be 'throw' or 'break', got {value!r}")
+            current = profile.get(name, OVERFLOW_MODES[0])
+            if OVERFLOW_MODES.index(value) < OVERFLOW_MODES.index(current):
+                raise ValueError(f"timeout_overflow_mode cannot be relaxed from '{current}'")
+            limits[name] = value
+        else:
+            valid = ", ".join((*NUMERIC_LIMITS, "timeout_overflow_mode"))
+            raise ValueError(f"Unknown limit '{name}'. Valid limits: {valid}")
+    return limits
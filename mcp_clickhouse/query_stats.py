@@ -0,0 +1,345 @@
+"""Per-fingerprint statistics of the queries tools run in ClickHouse.
+
+Every query run by run_select_query, summarize_query, materialize_query or a query job
+is normalized into its fingerprint, and folded into running aggregates for that
+fingerprint: calls, errors, total and maximum latency, rows returned, rows and bytes
+read by the server, and query cache hits. Latency percentiles come from a log-bucketed sketch with a
+bounded relative error, so an entry stays small however often its query runs.
+
+Read counts are first taken from the X-ClickHouse-Summary header, which the server
+sends with the start of a streamed result: for a scan that is still running it falls
+short, often at 0. Queries run with a query_id stay pending until `apply_final_counts`
+replaces their header counts with the final ones, read from system.query_log, where
+their query cache hits are counted too. Each
+entry counts the calls whose read counts are still partial, those whose query never
+showed up in the log (query logging off, no access to system.query_log, ...).
+
+At most a fixed number of fingerprints is tracked. When the table is full, the tenth
+with the least total time is dropped, so the shapes that cost the most survive.
+"""
+
+import math
+import threading
+import time
+from typing import Optional
+
+from mcp_clickhouse.metrics import MetricFamily
+from mcp_clickhouse.sql_fingerprint import normalize_query, normalized_fingerprint
+
+# Percentiles are within 2% of the true value
+RELATIVE_ACCURACY = 0.02
+MAX_SKETCH_BUCKETS = 256
+MIN_LATENCY_SECS = 1e-6
+QUERY_TEXT_CHARS = 500
+# Queries waiting for their final read counts; beyond this the oldest keep their partial ones
+MAX_PENDING_QUERIES = 10000
+METRIC_QUANTILES = (0.5, 0.95, 0.99)
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+class LatencySketch:
+    """Log-bucketed latency histogram answering quantiles within RELATIVE_ACCURACY.
+
+    Once MAX_SKETCH_BUCKETS buckets exist, the lowest two are merged, which only
+    coarsens the fastest latencies.
+    """
+
+    __slots__ = ("count", "_buckets")
+
+    def __init__(self):
+        self.count = 0
+        self._buckets: dict = {}
+
+    def add(self, secs: float) -> None:
+        index = math.ceil(math.log(max(secs, MIN_LATENCY_SECS)) / _LOG_GAMMA)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        if len(self._buckets) > MAX_SKETCH_BUCKETS:
+            lowest, second = sorted(self._buckets)[:2]
+            self._buckets[second] += self._buckets.pop(lowest)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen > rank:
+                break
+        # The middle of the bucket, in relative terms
+        return 2 * _GAMMA**index / (_GAMMA + 1)
+
+
+class FingerprintStats:
+    __slots__ = (
+        "fingerprint",
+        "query",
+        "calls",
+        "errors",
+        "total_secs",
+        "max_secs",
+        "rows",
+        "read_rows",
+        "read_bytes",
+        "partial_reads",
+        "cache_hits",
+        "last_seen",
+        "latency",
+    )
+
+    def __init__(self, fingerprint: str, query: str):
+        self.fingerprint = fingerprint
+        self.query = query
+        self.calls = 0
+        self.errors = 0
+        self.total_secs = 0.0
+        self.max_secs = 0.0
+        self.rows = 0
+        self.read_rows = 0
+        self.read_bytes = 0
+        self.partial_reads = 0
+        self.cache_hits = 0
+        self.last_seen = 0.0
+        self.latency = LatencySketch()
+
+    def to_dict(self) -> dict:
+        quantiles = {
+            f"p{round(q * 100)}_ms": round(self.latency.quantile(q) * 1000, 3)
+            for q in METRIC_QUANTILES
+        }
+        return {
+            "fingerprint": self.fingerprint,
+            "query": self.query,
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 4),
+            "total_ms": round(self.total_secs * 1000, 3),
+            "mean_ms": round(self.total_secs / self.calls * 1000, 3),
+            "max_ms": round(self.max_secs * 1000, 3),
+            **quantiles,
+            "rows_returned": self.rows,
+            "read_rows": self.read_rows,
+            "read_bytes": self.read_bytes,
+            "partial_read_counts": self.partial_reads,
+            "query_cache_hits": self.cache_hits,
+            "last_seen": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.last_seen)),
+        }
+
+
+# Sort orders of `QueryStats.top`, by the name given to query_stats
+SORT_KEYS = {
+    "total_time": lambda s: s.total_secs,
+    "mean_time": lambda s: s.total_secs / s.calls,
+    "max_time": lambda s: s.max_secs,
+    "p95_time": lambda s: s.latency.quantile(0.95),
+    "calls": lambda s: s.calls,
+    "errors": lambda s: s.errors,
+    "read_rows": lambda s: s.read_rows,
+    "read_bytes": lambda s: s.read_bytes,
+}
+
+
+def summary_counts(summary: Optional[dict]) -> tuple:
+    """Read rows and bytes read from a query's X-ClickHouse-Summary.
+
+    The header comes with the start of the response, so these are the counts of
+    what the server had read by then, not of the whole query.
+    """
+    summary = summary or {}
+    try:
+        return int(summary.get("read_rows") or 0), int(summary.get("read_bytes") or 0)
+    except (TypeError, ValueError):
+        return 0, 0
+
+
+class QueryStats:
+    """Statistics of query fingerprints, bounded in number."""
+
+    def __init__(self):
+        self.evicted = 0
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stats: dict = {}
+        # query_id -> (fingerprint, header read rows, header read bytes, monotonic time)
+        self._pending: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def record(
+        self,
+        query: str,
+        elapsed_secs: float,
+        max_fingerprints: int,
+        failed: bool = False,
+        rows: int = 0,
+        read_rows: int = 0,
+        read_bytes: int = 0,
+        query_id: Optional[str] = None,
+    ) -> None:
+        """Fold a query run into the statistics of its fingerprint.
+
+        Args:
+            query: SQL text as run
+            elapsed_secs: Run time, failed or not
+            max_fingerprints: Number of fingerprints tracked, 0 to record nothing
+            failed: Whether the query failed
+            rows: Rows returned to the tool
+            read_rows: Rows read by the server, as far as known when recorded
+            read_bytes: Bytes read by the server, as far as known when recorded
+            query_id: ClickHouse query_id of the run, whose final read counts
+                `apply_final_counts` may then replace these with
+        """
+        if max_fingerprints <= 0:
+            return
+        # Normalized outside the lock, which only guards the dict updates
+        normalized = normalize_query(query)
+        fingerprint = normalized_fingerprint(normalized)
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = FingerprintStats(fingerprint, normalized[:QUERY_TEXT_CHARS])
+                self._stats[fingerprint] = stats
+                if len(self._stats) > max_fingerprints:
+                    self._evict(max_fingerprints)
+            stats.calls += 1
+            stats.errors += failed
+            stats.total_secs += elapsed_secs
+            stats.max_secs = max(stats.max_secs, elapsed_secs)
+            stats.rows += rows
+            stats.read_rows += read_rows
+            stats.read_bytes += read_bytes
+            stats.partial_reads += 1
+            stats.last_seen = time.time()
+            stats.latency.add(elapsed_secs)
+            if query_id is not None:
+                self._pending[query_id] = (fingerprint, read_rows, read_bytes, time.monotonic())
+                if len(self._pending) > MAX_PENDING_QUERIES:
+                    del self._pending[next(iter(self._pending))]
+
+    def pending_query_ids(self, max_wait_secs: float, limit: int = 1000) -> list:
+        """Query ids still waiting for their final read counts, oldest first.
+
+        Queries recorded more than `max_wait_secs` ago are given up on: their read
+        counts stay those of the header.
+        """
+        deadline = time.monotonic() - max_wait_secs
+        with self._lock:
+            expired = [qid for qid, entry in self._pending.items() if entry[3] < deadline]
+            for query_id in expired:
+                del self._pending[query_id]
+            return list(self._pending)[:limit]
+
+    def apply_final_counts(self, counts: dict) -> int:
+        """Replace the header read counts of pending queries with their final counts.
+
+        Args:
+            counts: (read rows, read bytes, query cache hits) by query_id, e.g. from
+                system.query_log
+
+        Returns:
+            Number of pending queries updated
+        """
+        updated = 0
+        with self._lock:
+            for query_id, (read_rows, read_bytes, cache_hits) in counts.items():
+                entry = self._pending.pop(query_id, None)
+                if entry is None:
+                    continue
+                fingerprint, header_rows, header_bytes, _ = entry
+                stats = self._stats.get(fingerprint)
+                if stats is None:
+                    continue
+                stats.read_rows += max(int(read_rows) - header_rows, 0)
+                stats.read_bytes += max(int(read_bytes) - header_bytes, 0)
+                stats.partial_reads -= 1
+                stats.cache_hits += int(cache_hits)
+                updated += 1
+        return updated
+
+    def _evict(self, max_fingerprints: int) -> None:
+        # The entry just added has no calls yet: keep it, or nothing new would ever stay
+        ranked = sorted((s for s in self._stats.values() if s.calls), key=lambda s: s.total_secs)
+        excess = len(self._stats) - max_fingerprints
+        for stats in ranked[: max(excess, max_fingerprints // 10, 1)]:
+            del self._stats[stats.fingerprint]
+            self.evicted += 1
+
+    def top(self, sort_by: str = "total_time", limit: int = 10) -> list:
+        """The `limit` fingerprints ranking highest by a key of SORT_KEYS."""
+        key = SORT_KEYS[sort_by]
+        with self._lock:
+            ranked = sorted((s for s in self._stats.values() if s.calls), key=key, reverse=True)
+            return [stats.to_dict() for stats in ranked[:limit]]
+
+    def metric_families(self, limit: int) -> list:
+        """Metrics of the `limit` fingerprints with the most total time."""
+        duration = MetricFamily(
+            "mcp_clickhouse_query_duration_seconds",
+            "summary",
+            "Duration of the ClickHouse queries run by tools, by query fingerprint",
+        )
+        errors = MetricFamily(
+            "mcp_clickhouse_query_errors_total", "counter", "Failed queries by query fingerprint"
+        )
+        read_rows = MetricFamily(
+            "mcp_clickhouse_query_read_rows_total",
+            "counter",
+            "Rows read by query fingerprint, short of the final count for queries still partial",
+        )
+        read_bytes = MetricFamily(
+            "mcp_clickhouse_query_read_bytes_total",
+            "counter",
+            "Bytes read by query fingerprint, short of the final count for queries still partial",
+        )
+        partial_reads = MetricFamily(
+            "mcp_clickhouse_query_partial_reads",
+            "gauge",
+            "Queries whose read counts are still the response header's, by query fingerprint",
+        )
+        cache_hits = MetricFamily(
+            "mcp_clickhouse_query_cache_hits_total",
+            "counter",
+            "Results served from the ClickHouse query cache, by query fingerprint",
+        )
+        tracked = MetricFamily(
+            "mcp_clickhouse_query_fingerprints", "gauge", "Query fingerprints tracked"
+        )
+        evicted = MetricFamily(
+            "mcp_clickhouse_query_fingerprints_evicted_total",
+            "counter",
+            "Query fingerprints dropped to keep the statistics bounded",
+        )
+        with self._lock:
+            ranked = sorted(
+                (s for s in self._stats.values() if s.calls),
+                key=SORT_KEYS["total_time"],
+                reverse=True,
+            )[:limit]
+            for stats in ranked:
+                for q in METRIC_QUANTILES:
+                    duration.add(
+                        stats.latency.quantile(q), fingerprint=stats.fingerprint, quantile=str(q)
+                    )
+                duration.add(stats.total_secs, "_sum", fingerprint=stats.fingerprint)
+                duration.add(stats.calls, "_count", fingerprint=stats.fingerprint)
+                errors.add(stats.errors, fingerprint=stats.fingerprint)
+                read_rows.add(stats.read_rows, fingerprint=stats.fingerprint)
+                read_bytes.add(stats.read_bytes, fingerprint=stats.fingerprint)
+                partial_reads.add(stats.partial_reads, fingerprint=stats.fingerprint)
+                cache_hits.add(stats.cache_hits, fingerprint=stats.fingerprint)
+            tracked.add(len(self._stats))
+            evicted.add(self.evicted)
+        return [
+            duration,
+            errors,
+            read_rows,
+            read_bytes,
+            partial_reads,
+            cache_hits,
+            tracked,
+            evicted,
+        ]
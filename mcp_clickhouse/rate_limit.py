@@ -0,0 +1,180 @@
+"""Per-session rate limiting of tool calls.
+
+Every client identity (an MCP session, or a ClickHouse user with request credentials)
+gets two token buckets, one for the query tools and one for the metadata tools, so
+that a runaway loop of queries cannot also lock its session out of schema
+exploration. Calls over the limit are rejected at once with a hint of how long
+to wait, instead of queueing on the server.
+
+The buckets are only touched from the event loop thread, between two awaits, so they
+need no lock: checking a call costs a dict lookup and a few float operations.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from fastmcp.exceptions import ToolError
+from fastmcp.server.middleware import Middleware
+
+from mcp_clickhouse.credentials import peek_request_credentials
+from mcp_clickhouse.mcp_env import get_config
+from mcp_clickhouse.mcp_logging import log_event
+
+logger = logging.getLogger("mcp-clickhouse")
+
+QUERY_TOOLS = "query"
+METADATA_TOOLS = "metadata"
+MAX_TRACKED_BUCKETS = 10_000
+
+
+class RateLimitExceeded(ToolError):
+    """Raised when a tool call is over its session's rate limit.
+
+    The message is a JSON object carrying `retry_after_secs`, so that agents can back
+    off without parsing prose.
+    """
+
+    def __init__(self, tool_class: str, retry_after_secs: float):
+        self.tool_class = tool_class
+        self.retry_after_secs = retry_after_secs
+        super().__init__(
+            json.dumps(
+                {
+                    "status": "rate_limited",
+                    "message": f"Too many {tool_class} tool calls in this session, "
+                    f"retry after {retry_after_secs:.1f} seconds",
+                    "limit": tool_class,
+                    "retry_after_secs": round(retry_after_secs, 2),
+                }
+            )
+        )
+
+
+class TokenBucket:
+    """Token bucket refilled continuously, holding at most `burst` tokens."""
+
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, burst: int, now: float):
+        self.tokens = float(burst)
+        self.updated_at = now
+
+    def take(self, rate_per_sec: float, burst: int, now: float) -> float:
+        """Take a token if one is available.
+
+        Returns:
+            0 if a token was taken, otherwise the seconds until one is available
+        """
+        tokens = min(float(burst), self.tokens + (now - self.updated_at) * rate_per_sec)
+        self.updated_at = now
+        if tokens >= 1:
+            self.tokens = tokens - 1
+            return 0.0
+        self.tokens = tokens
+        return (1 - tokens) / rate_per_sec
+
+
+class RateLimiter:
+    """Token buckets by key, keeping the most recently used `max_buckets`.
+
+    Not thread-safe; see the module docstring. An evicted bucket starts full again,
+    which only ever errs on the side of letting calls through.
+    """
+
+    def __init__(self, max_buckets: int = MAX_TRACKED_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict = OrderedDict()
+        self.rejected = 0
+
+    def acquire(
+        self, key: Hashable, rate_per_min: int, burst: int, now: Optional[float] = None
+    ) -> float:
+        """Take a token from the bucket of `key`.
+
+        Args:
+            key: Bucket identity
+            rate_per_min: Tokens added per minute
+            burst: Bucket capacity, at least 1
+            now: Monotonic time, for tests
+
+        Returns:
+            0 if the call may proceed, otherwise the seconds to wait before retrying
+        """
+        if now is None:
+            now = time.monotonic()
+        burst = max(burst, 1)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        retry_after = bucket.take(rate_per_min / 60, burst, now)
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def _client_identity(context) -> str:
+    """Identify the caller by what it cannot choose freely.
+
+    With request credentials, calls are limited per ClickHouse user, identified by the
+    hash of its credentials, across all of its sessions. Otherwise they are limited per
+    MCP session, identified by the server's own session object rather than by a
+    header or the client id in `_meta`, which a client could change at will.
+    """
+    credentials = peek_request_credentials()
+    if credentials is not None:
+        return f"user:{credentials.key}"
+    if context is None:
+        return "anonymous"
+    return f"session:{id(context.session)}"
+
+
+class RateLimitMiddleware(Middleware):
+    """FastMCP middleware applying the per-session rate limits of the configuration.
+
+    Args:
+        query_tools: Names of the tools limited as query tools; every other tool is
+            limited as a metadata tool
+    """
+
+    def __init__(self, query_tools):
+        self.query_tools = frozenset(query_tools)
+        self.limiter = RateLimiter()
+
+    async def on_call_tool(self, context, call_next):
+        config = get_config()
+        name = context.message.name
+        if name in self.query_tools:
+            tool_class = QUERY_TOOLS
+            rate, burst = config.mcp_query_rate_per_min, config.mcp_query_burst
+        else:
+            tool_class = METADATA_TOOLS
+            rate, burst = config.mcp_metadata_rate_per_min, config.mcp_metadata_burst
+
+        if rate > 0:
+            identity = _client_identity(context.fastmcp_context)
+            retry_after = self.limiter.acquire((identity, tool_class), rate, burst)
+            if retry_after:
+                log_event(
+                    logger,
+                    logging.WARNING,
+                    "tool.rate_limited",
+                    tool=name,
+                    identity=identity,
+                    retry_after_secs=round(retry_after, 2),
+                )
+                raise RateLimitExceeded(tool_class, retry_after)
+        return await call_next(context)
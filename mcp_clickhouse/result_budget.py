@@ -0,0 +1,215 @@
+"""Bounding the size of query results returned to MCP clients.
+
+Two limits apply to every result: a maximum number of characters per cell and a total
+byte budget for the response. Where the result's column types allow it, cell truncation
+is pushed down into ClickHouse by wrapping the query, so oversized strings never leave
+the server; any remaining oversized cells are truncated while rows are collected. Rows
+are read block by block and reading stops as soon as the byte budget is spent, so
+memory stays bounded whatever the width of the columns.
+"""
+
+import json
+import logging
+import re
+from typing import Hashable, Optional
+
+from clickhouse_connect.driver.binding import quote_identifier
+
+logger = logging.getLogger("mcp-clickhouse")
+
+TRUNCATION_MARKER = "...[truncated, {length} chars]"
+# Alias of the wrapped query, used to qualify column references. Without it an
+# expression such as `leftUTF8(x, 10) AS x` would shadow `x` for the other columns.
+_SUBQUERY_ALIAS = "__mcp_result"
+_LENGTH_COLUMN_PREFIX = "__mcp_length_"
+# String columns only: leftUTF8 and lengthUTF8 reject FixedString, whose cells are bounded
+# by their declared size anyway and are truncated, if need be, while rows are collected
+_STRING_TYPE_RE = re.compile(r"^(?:LowCardinality\()?(?:Nullable\()?String\)?\)?$")
+
+
+def _truncate(text: str, max_chars: int, length: Optional[int] = None) -> str:
+    if length is None:
+        length = len(text)
+    return text[:max_chars] + TRUNCATION_MARKER.format(length=length)
+
+
+def _value_size(value) -> int:
+    """Approximate the size of a value once encoded as JSON."""
+    if value is None:
+        return 4
+    if isinstance(value, str):
+        return len(value.encode("utf-8", "replace")) + 2
+    if isinstance(value, (bool, int, float)):
+        return len(str(value))
+    if isinstance(value, (list, tuple, dict)):
+        return len(json.dumps(value, default=str, ensure_ascii=False).encode("utf-8", "replace"))
+    return len(str(value)) + 2
+
+
+class ResultBudget:
+    """Collects result rows under a per-cell character limit and a total byte budget.
+
+    Args:
+        max_cell_chars: Maximum characters of a string cell, 0 for no limit. Cells
+            holding arrays, maps or tuples are limited on their JSON text.
+        max_result_bytes: Approximate maximum size of the encoded rows, 0 for no limit
+    """
+
+    def __init__(self, max_cell_chars: int, max_result_bytes: int):
+        self.max_cell_chars = max_cell_chars
+        self.max_result_bytes = max_result_bytes
+        self.rows: list = []
+        self.result_bytes = 0
+        self.truncated_cells = 0
+        self.truncated_columns: set = set()
+        self.exhausted = False
+        self.pushed_down = False
+        self._length_columns: dict[int, int] = {}
+        self._column_count: Optional[int] = None
+        self.plan_key: Optional[Hashable] = None
+
+    def prepare_query(
+        self,
+        client,
+        query: str,
+        settings: dict,
+        parameters: Optional[dict] = None,
+        plan_cache=None,
+        plan_scope: Optional[str] = None,
+    ) -> str:
+        """Wrap the query so that string columns are truncated by the server.
+
+        The result's column names and types are read with `DESCRIBE (query)`, which
+        only analyzes the query. For each string column the wrapper selects a prefix of
+        the value and, as an extra trailing column, its full length. If the query
+        cannot be described or wrapped (duplicate column names, a FORMAT clause, ...)
+        it is returned unchanged and truncation happens while collecting rows. Should
+        the server still reject the wrapped query, `undo_pushdown()` restores that.
+
+        Args:
+            client: ClickHouse client
+            query: Query, possibly with `{name:Type}` placeholders
+            settings: Settings to describe the query with
+            parameters: Values of the query's placeholders
+            plan_cache: Optional BoundedCache of descriptions keyed by query text. The
+                types of a result do not depend on parameter values, so every query of
+                the same template shares one entry. `plan_key` holds the key used.
+            plan_scope: Optional part of the cache key, for descriptions that must not be
+                shared, e.g. between users with different grants
+
+        Returns:
+            The query to run
+        """
+        if self.max_cell_chars <= 0:
+            return query
+        query = query.strip().rstrip(";").rstrip()
+        plan_key = query if plan_scope is None else (plan_scope, query)
+        described = plan_cache.get(plan_key) if plan_cache is not None else None
+        if described is None:
+            try:
+                described = client.query(
+                    f"DESCRIBE ({query})", parameters=parameters, settings=settings
+                ).result_rows
+            except Exception as err:
+                logger.debug("Cannot describe query for truncation pushdown: %s", err)
+                return query
+            described = [(row[0], row[1]) for row in described]
+            if plan_cache is not None:
+                plan_cache.set(plan_key, described)
+        self.plan_key = plan_key
+
+        names = [row[0] for row in described]
+        if len(set(names)) != len(names):
+            return query
+        string_columns = [i for i, row in enumerate(described) if _STRING_TYPE_RE.match(row[1])]
+        if not string_columns:
+            return query
+
+        selected = []
+        for i, name in enumerate(names):
+            column = f"{_SUBQUERY_ALIAS}.{quote_identifier(name)}"
+            if i in string_columns:
+                column = f"leftUTF8({column}, {self.max_cell_chars}) AS {quote_identifier(name)}"
+            selected.append(column)
+        for position, i in enumerate(string_columns):
+            column = f"{_SUBQUERY_ALIAS}.{quote_identifier(names[i])}"
+            selected.append(f"lengthUTF8({column}) AS {_LENGTH_COLUMN_PREFIX}{position}")
+            self._length_columns[len(names) + position] = i
+        self._column_count = len(names)
+        self.pushed_down = True
+        return f"SELECT {', '.join(selected)} FROM ({query}) AS {_SUBQUERY_ALIAS}"
+
+    def undo_pushdown(self) -> None:
+        """Forget the wrapping of `prepare_query()` and the rows collected through it."""
+        self.rows = []
+        self.result_bytes = 0
+        self.truncated_cells = 0
+        self.truncated_columns = set()
+        self.exhausted = False
+        self.pushed_down = False
+        self._length_columns = {}
+        self._column_count = None
+
+    def column_names(self, names) -> list:
+        """Drop the length columns added by `prepare_query()` from the column names."""
+        return list(names[: self._column_count]) if self.pushed_down else list(names)
+
+    def add_rows(self, rows) -> bool:
+        """Collect rows until the byte budget is spent.
+
+        Returns:
+            False once the budget is exhausted and no more rows should be read
+        """
+        max_chars = self.max_cell_chars
+        for row in rows:
+            lengths = {}
+            if self.pushed_down:
+                lengths = {i: row[pos] for pos, i in self._length_columns.items()}
+                row = row[: self._column_count]
+
+            cells = []
+            row_bytes = 2 + max(len(row) - 1, 0)
+            for i, value in enumerate(row):
+                if max_chars > 0:
+                    value = self._limit_cell(i, value, lengths.get(i))
+                cells.append(value)
+                row_bytes += _value_size(value)
+
+            if self.max_result_bytes > 0 and self.result_bytes + row_bytes > self.max_result_bytes:
+                self.exhausted = True
+                return False
+            self.rows.append(cells)
+            self.result_bytes += row_bytes
+        return True
+
+    def _limit_cell(self, index: int, value, length: Optional[int]):
+        max_chars = self.max_cell_chars
+        if isinstance(value, str):
+            if length is not None and length > max_chars:
+                value = _truncate(value, max_chars, length)
+            elif len(value) > max_chars:
+                value = _truncate(value, max_chars)
+            else:
+                return value
+        elif isinstance(value, (list, tuple, dict)):
+            text = json.dumps(value, default=str, ensure_ascii=False)
+            if len(text) <= max_chars:
+                return value
+            value = _truncate(text, max_chars)
+        else:
+            return value
+        self.truncated_cells += 1
+        self.truncated_columns.add(index)
+        return value
+
+    def summary(self, column_names: list) -> dict:
+        """Describe the limits applied to the result and what they cut."""
+        return {
+            "max_cell_chars": self.max_cell_chars,
+            "max_result_bytes": self.max_result_bytes,
+            "result_bytes": self.result_bytes,
+            "rows_returned": len(self.rows),
+            "rows_truncated": self.exhausted,
+            "truncated_cells": self.truncated_cells,
+            "truncated_columns": [column_names[i] for i in sorted(self.truncated_columns)],
+        }
@@ -0,0 +1,269 @@
+"""Per-column summaries of query results, computed in the server.
+
+`summarize_query` reads a result as NumPy arrays, one block at a time, and folds each
+block into fixed-size accumulators per column, so memory stays bounded by one block
+whatever the number of rows. Only the summary goes back to the client:
+
+* numbers: nulls, min, max, mean and standard deviation (blocks are merged with Chan's
+  parallel algorithm), plus quantiles and a histogram from a uniform sample of at most
+  SAMPLE_SIZE values
+* dates and times: nulls, min and max
+* anything else: nulls and the most frequent values, counted exactly up to
+  MAX_TRACKED_VALUES distinct values and approximately beyond
+"""
+
+import json
+import math
+import re
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+
+SAMPLE_SIZE = 10000
+MAX_TRACKED_VALUES = 10000
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+HISTOGRAM_BINS = 10
+
+_WRAPPER_RE = re.compile(r"^(?:Nullable|LowCardinality)\((.*)\)$")
+_NUMERIC_TYPE_RE = re.compile(r"^(?:U?Int\d+|Float\d+|BFloat16|Decimal)")
+_TEMPORAL_TYPE_RE = re.compile(r"^(?:Date|DateTime)")
+_is_none = np.frompyfunc(lambda value: value is None, 1, 1)
+
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+_to_text = np.frompyfunc(
+    lambda value: json.dumps(value, default=_json_default, ensure_ascii=False), 1, 1
+)
+
+
+def _base_type(type_name: str) -> str:
+    while match := _WRAPPER_RE.match(type_name):
+        type_name = match.group(1)
+    return type_name
+
+
+def _python_value(value):
+    """Convert a NumPy scalar to a value the JSON serializer understands."""
+    if isinstance(value, np.datetime64):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class _NumericSummary:
+    def __init__(self, rng: np.random.Generator):
+        self._rng = rng
+        self.count = 0
+        self.nan = 0
+        self.min = None
+        self.max = None
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._sample = np.empty(0)
+        self._keys = np.empty(0)
+
+    def add(self, values: np.ndarray) -> None:
+        if values.dtype.kind == "f":
+            finite = ~np.isnan(values)
+            self.nan += int(len(values) - np.count_nonzero(finite))
+            values = values[finite]
+        if not len(values):
+            return
+        # min and max come from the original type, exact even for 64-bit integers
+        low, high = values.min(), values.max()
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+        floats = values.astype(np.float64)
+        n = len(floats)
+        mean = floats.mean()
+        m2 = np.square(floats - mean).sum()
+        total = self.count + n
+        delta = mean - self._mean
+        self._mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self._add_to_sample(floats)
+
+    def _add_to_sample(self, values: np.ndarray) -> None:
+        # A uniform sample without replacement: the values with the smallest random keys
+        keys = self._rng.random(len(values))
+        if len(values) > SAMPLE_SIZE:
+            keep = np.argpartition(keys, SAMPLE_SIZE)[:SAMPLE_SIZE]
+            keys, values = keys[keep], values[keep]
+        keys = np.concatenate((self._keys, keys))
+        values = np.concatenate((self._sample, values))
+        if len(values) > SAMPLE_SIZE:
+            keep = np.argpartition(keys, SAMPLE_SIZE)[:SAMPLE_SIZE]
+            keys, values = keys[keep], values[keep]
+        self._keys, self._sample = keys, values
+
+    def to_dict(self) -> dict:
+        summary = {"min": _python_value(self.min), "max": _python_value(self.max)}
+        if self.nan:
+            summary["nan"] = self.nan
+        if not self.count:
+            return summary
+        summary["mean"] = float(self._mean)
+        summary["stddev"] = math.sqrt(self._m2 / self.count)
+        quantiles = np.quantile(self._sample, QUANTILES)
+        summary["quantiles"] = {
+            f"p{round(q * 100):02d}": float(value) for q, value in zip(QUANTILES, quantiles)
+        }
+        low, high = float(self.min), float(self.max)
+        if low < high:
+            counts, edges = np.histogram(self._sample, bins=HISTOGRAM_BINS, range=(low, high))
+            scale = self.count / len(self._sample)
+            summary["histogram"] = {
+                "edges": [float(edge) for edge in edges],
+                "counts": [round(float(count) * scale) for count in counts],
+            }
+        summary["sampled"] = len(self._sample) < self.count
+        return summary
+
+
+class _TemporalSummary:
+    def __init__(self):
+        self.min = None
+        self.max = None
+
+    def add(self, values: np.ndarray) -> None:
+        if values.dtype.kind == "M":
+            values = values[~np.isnat(values)]
+        if not len(values):
+            return
+        low, high = values.min(), values.max()
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def to_dict(self) -> dict:
+        return {
+            "min": None if self.min is None else str(_python_value(self.min)),
+            "max": None if self.max is None else str(_python_value(self.max)),
+        }
+
+
+class _ValueSummary:
+    def __init__(self, top_k: int, max_chars: int):
+        self._top_k = top_k
+        self._max_chars = max_chars
+        self._counts: Counter = Counter()
+        self.approximate = False
+
+    def add(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        if values.dtype == object:
+            if isinstance(values[0], (list, dict, tuple, np.ndarray)):
+                # Arrays, maps and tuples are counted by their text, as they may not be hashable
+                values = _to_text(values)
+            # Hashing beats np.unique here, which sorts objects with Python comparisons
+            self._counts.update(values.tolist())
+        else:
+            distinct, counts = np.unique(values, return_counts=True)
+            self._counts.update(dict(zip(distinct.tolist(), counts.tolist())))
+        if len(self._counts) > MAX_TRACKED_VALUES:
+            # Keep the most frequent half: later counts of the dropped values restart at 0
+            self._counts = Counter(dict(self._counts.most_common(MAX_TRACKED_VALUES // 2)))
+            self.approximate = True
+
+    def to_dict(self) -> dict:
+        values = []
+        for value, count in self._counts.most_common(self._top_k):
+            value = _python_value(value)
+            if isinstance(value, str) and self._max_chars and len(value) > self._max_chars:
+                value = value[: self._max_chars] + "..."
+            values.append({"value": value, "count": count})
+        summary = {"top_values": values}
+        if self.approximate:
+            summary["top_values_approximate"] = True
+        else:
+            summary["distinct"] = len(self._counts)
+        return summary
+
+
+class _ColumnSummary:
+    def __init__(self, name: str, type_name: str, top_k: int, max_chars: int, rng):
+        self.name = name
+        self.type_name = type_name
+        self.nulls = 0
+        base = _base_type(type_name)
+        if _NUMERIC_TYPE_RE.match(base):
+            self.kind = "numeric"
+            self._values = _NumericSummary(rng)
+        elif _TEMPORAL_TYPE_RE.match(base):
+            self.kind = "temporal"
+            self._values = _TemporalSummary()
+        else:
+            self.kind = "values"
+            self._values = _ValueSummary(top_k, max_chars)
+
+    def add(self, column: np.ndarray) -> None:
+        if column.dtype == object:
+            # Nullable columns arrive as objects with None for NULL
+            nulls = _is_none(column).astype(bool)
+            self.nulls += int(np.count_nonzero(nulls))
+            column = column[~nulls]
+            if self.kind == "numeric":
+                column = column.astype(np.float64)
+        self._values.add(column)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "type": self.type_name,
+            "nulls": self.nulls,
+            **self._values.to_dict(),
+        }
+
+
+class ResultSummary:
+    """Accumulates per-column summaries of a result read block by block.
+
+    Args:
+        column_names: Names of the result columns
+        column_types: ClickHouse type names of the result columns
+        top_k: Number of most frequent values reported per non-numeric column
+        max_chars: Maximum characters of a reported value, 0 for no limit
+        seed: Seed of the sampling, for reproducible summaries
+    """
+
+    def __init__(
+        self,
+        column_names: list,
+        column_types: list,
+        top_k: int = 5,
+        max_chars: int = 0,
+        seed: Optional[int] = None,
+    ):
+        rng = np.random.default_rng(seed)
+        self.rows = 0
+        self._columns = [
+            _ColumnSummary(name, type_name, top_k, max_chars, rng)
+            for name, type_name in zip(column_names, column_types)
+        ]
+
+    def add_block(self, block: np.ndarray) -> None:
+        """Fold a block of `query_np_stream` into the summaries.
+
+        Blocks are structured arrays with a field per column, or 2-D arrays of rows
+        when every column has the same NumPy type.
+        """
+        self.rows += len(block)
+        for i, column in enumerate(self._columns):
+            if block.dtype.names:
+                column.add(block[block.dtype.names[i]])
+            else:
+                column.add(block[:, i])
+
+    def to_dict(self) -> dict:
+        return {"rows": self.rows, "columns": [column.to_dict() for column in self._columns]}
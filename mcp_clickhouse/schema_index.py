@@ -0,0 +1,351 @@
+"""In-process search index over database, table and column names and comments.
+
+Names are indexed by trigrams, so partial and slightly misspelled terms still match;
+comments are indexed by word. The index is built from two bulk reads of system.tables
+and system.columns and refreshed incrementally: only tables whose definition changed
+(detected by a hash of create_table_query, which, unlike metadata_modification_time,
+also catches several ALTERs within the same second) have their columns read again.
+"""
+
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import chain
+from operator import itemgetter
+from typing import Any, Callable, Collection, Optional
+
+from clickhouse_connect.driver.binding import format_query_value
+
+logger = logging.getLogger("mcp-clickhouse")
+
+SYSTEM_DATABASES = ("system", "INFORMATION_SCHEMA", "information_schema")
+
+# Names sharing less than this fraction of a term's trigrams do not match it
+MIN_NAME_SIMILARITY = 0.3
+# Weights and bonuses of the places a term can match
+OWN_NAME_WEIGHT = 1.0
+PARENT_NAME_WEIGHT = 0.3
+COMMENT_WEIGHT = 0.5
+EXACT_NAME_BONUS = 1.0
+PREFIX_NAME_BONUS = 0.5
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SchemaEntry:
+    kind: str
+    database: str
+    table: str
+    column: Optional[str] = None
+    column_type: Optional[str] = None
+    comment: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.column if self.kind == "column" else self.table
+
+    def to_dict(self) -> dict:
+        result = {"kind": self.kind, "database": self.database, "table": self.table}
+        if self.kind == "column":
+            result["column"] = self.column
+            result["column_type"] = self.column_type
+        result["comment"] = self.comment or None
+        return result
+
+
+def _trigrams(text: str) -> set:
+    text = f"  {text.lower()} "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _words(text: Optional[str]) -> set:
+    return set(_WORD_RE.findall(text.lower())) if text else set()
+
+
+class SchemaIndex:
+    """Trigram/word inverted index over schema entries, maintained per table.
+
+    Trigram postings point at distinct lowercased names rather than entries: column
+    names repeat heavily across tables (id, user_id, created_at), so this keeps the
+    postings short, and matching names are then expanded to their entries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[int, SchemaEntry] = {}
+        self._tables: dict[tuple, tuple] = {}
+        self._next_id = 0
+        # name -> ids of the entries carrying it, and trigram -> names containing it
+        self._name_entries: dict[str, set] = defaultdict(set)
+        self._trigram_postings: dict[str, set] = defaultdict(set)
+        # comment word -> ids of the entries whose comment contains it
+        self._word_postings: dict[str, set] = defaultdict(set)
+
+    @property
+    def table_count(self) -> int:
+        return len(self._tables)
+
+    @property
+    def entry_count(self) -> int:
+        return len(self._entries)
+
+    def table_versions(self) -> dict:
+        """Get the metadata version each indexed table was built from."""
+        with self._lock:
+            return {key: version for key, (version, _) in self._tables.items()}
+
+    def replace_table(
+        self,
+        database: str,
+        table: str,
+        comment: Optional[str],
+        columns: list,
+        version=None,
+    ) -> None:
+        """Index a table and its columns, replacing anything indexed for it before.
+
+        Args:
+            database: Database name
+            table: Table name
+            comment: Table comment
+            columns: (name, type, comment) tuples
+            version: Opaque metadata version used to detect changes on refresh
+        """
+        entries = [SchemaEntry("table", database, table, comment=comment)]
+        entries.extend(
+            SchemaEntry("column", database, table, name, column_type, column_comment)
+            for name, column_type, column_comment in columns
+        )
+        with self._lock:
+            self._remove_table_locked((database, table))
+            ids = []
+            for entry in entries:
+                entry_id = self._next_id
+                self._next_id += 1
+                self._add_entry_locked(entry_id, entry)
+                ids.append(entry_id)
+            self._tables[(database, table)] = (version, ids)
+
+    def remove_table(self, database: str, table: str) -> None:
+        with self._lock:
+            self._remove_table_locked((database, table))
+
+    def _add_entry_locked(self, entry_id: int, entry: SchemaEntry) -> None:
+        self._entries[entry_id] = entry
+        name = entry.name.lower()
+        if name not in self._name_entries:
+            for trigram in _trigrams(name):
+                self._trigram_postings[trigram].add(name)
+        self._name_entries[name].add(entry_id)
+        for word in _words(entry.comment):
+            self._word_postings[word].add(entry_id)
+
+    def _remove_table_locked(self, key: tuple) -> None:
+        _, ids = self._tables.pop(key, (None, []))
+        for entry_id in ids:
+            entry = self._entries.pop(entry_id)
+            name = entry.name.lower()
+            name_entries = self._name_entries[name]
+            name_entries.discard(entry_id)
+            if not name_entries:
+                del self._name_entries[name]
+                for trigram in _trigrams(name):
+                    postings = self._trigram_postings[trigram]
+                    postings.discard(name)
+                    if not postings:
+                        del self._trigram_postings[trigram]
+            for word in _words(entry.comment):
+                postings = self._word_postings[word]
+                postings.discard(entry_id)
+                if not postings:
+                    del self._word_postings[word]
+
+    def _match_names_locked(self, term: str) -> dict:
+        """Score indexed names by the fraction of the term's trigrams they contain."""
+        term_trigrams = _trigrams(term)
+        counts = Counter(
+            chain.from_iterable(self._trigram_postings.get(t, ()) for t in term_trigrams)
+        )
+        matches = {}
+        for name, count in counts.items():
+            score = count / len(term_trigrams)
+            if score < MIN_NAME_SIMILARITY:
+                continue
+            if name == term:
+                score += EXACT_NAME_BONUS
+            elif name.startswith(term):
+                score += PREFIX_NAME_BONUS
+            matches[name] = score
+        return matches
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        database: Optional[str] = None,
+        kind: Optional[str] = None,
+        tables: Optional[Collection[tuple]] = None,
+    ) -> list:
+        """Rank entries against a free-text query.
+
+        Each whitespace-separated term is scored against entry names by trigram
+        overlap, with bonuses for exact names, name prefixes and comment words. For
+        columns that match, a match on their table's name adds a smaller amount, so
+        "orders amount" ranks orders.amount first. Scores are summed over terms.
+
+        Only entries of the (database, table) pairs in `tables` are returned when it
+        is given.
+
+        Returns:
+            List of (score, SchemaEntry) pairs, best first.
+        """
+        terms = [term.lower() for term in query.split() if term]
+        if not terms:
+            return []
+
+        scores: dict[int, float] = defaultdict(float)
+        table_scores: dict[tuple, float] = defaultdict(float)
+        with self._lock:
+            for term in terms:
+                term_scores: dict[int, float] = {}
+                for name, score in self._match_names_locked(term).items():
+                    for entry_id in self._name_entries[name]:
+                        term_scores[entry_id] = score
+                        entry = self._entries[entry_id]
+                        if entry.kind == "table":
+                            key = (entry.database, entry.table)
+                            table_scores[key] += score * OWN_NAME_WEIGHT
+                for entry_id in self._word_postings.get(term, ()):
+                    term_scores[entry_id] = term_scores.get(entry_id, 0.0) + COMMENT_WEIGHT
+                for entry_id, score in term_scores.items():
+                    scores[entry_id] += score
+
+            candidates = []
+            for entry_id, score in scores.items():
+                entry = self._entries[entry_id]
+                if database is not None and entry.database != database:
+                    continue
+                if kind is not None and entry.kind != kind:
+                    continue
+                if tables is not None and (entry.database, entry.table) not in tables:
+                    continue
+                if entry.kind == "column":
+                    score += PARENT_NAME_WEIGHT * table_scores.get(
+                        (entry.database, entry.table), 0.0
+                    )
+                candidates.append((score, entry))
+
+        best = heapq.nlargest(limit, candidates, key=itemgetter(0))
+        best.sort(key=lambda item: (-item[0], item[1].database, item[1].table))
+        return best
+
+
+class ClickHouseSchemaIndex(SchemaIndex):
+    """SchemaIndex loaded from and refreshed against a ClickHouse server."""
+
+    # Above this many changed tables, columns are read in bulk instead of by table list
+    BULK_READ_THRESHOLD = 500
+
+    def __init__(self):
+        super().__init__()
+        self._refreshed_at: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+        self._background_lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def is_built(self) -> bool:
+        return self._refreshed_at is not None
+
+    def is_stale(self, max_age_secs: float) -> bool:
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at > max_age_secs
+
+    def refresh_in_background(self, connect: Callable[[], Any]) -> bool:
+        """Refresh the index on a daemon thread, unless a background refresh is running.
+
+        Args:
+            connect: Creates the ClickHouse client, on the refresh thread
+
+        Returns:
+            Whether a refresh thread was started.
+        """
+        with self._background_lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh(connect())
+            except Exception as e:
+                logger.error("Schema index refresh failed: %s", e)
+            finally:
+                with self._background_lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="schema-index", daemon=True).start()
+        return True
+
+    def refresh(self, client, wait: bool = False) -> int:
+        """Bring the index up to date, reading columns only for changed tables.
+
+        Args:
+            client: ClickHouse client
+            wait: Wait for a refresh already in progress instead of returning at once
+
+        Returns:
+            The number of tables added, changed or removed.
+        """
+        if not self._refresh_lock.acquire(blocking=wait):
+            return 0
+        try:
+            excluded = ", ".join(format_query_value(db) for db in SYSTEM_DATABASES)
+            tables = client.query(
+                "SELECT database, name, comment, cityHash64(create_table_query) "
+                f"FROM system.tables WHERE database NOT IN ({excluded})"
+            ).result_rows
+
+            known = self.table_versions()
+            current = {(db, name): (comment, version) for db, name, comment, version in tables}
+            changed = [key for key, (_, version) in current.items() if known.get(key) != version]
+            removed = [key for key in known if key not in current]
+
+            for database, table in removed:
+                self.remove_table(database, table)
+
+            if changed:
+                columns = defaultdict(list)
+                if len(changed) > self.BULK_READ_THRESHOLD:
+                    column_filter = f"database NOT IN ({excluded})"
+                else:
+                    pairs = ", ".join(
+                        f"({format_query_value(db)}, {format_query_value(name)})"
+                        for db, name in changed
+                    )
+                    column_filter = f"(database, table) IN ({pairs})"
+                for db, table, name, column_type, comment in client.query(
+                    "SELECT database, table, name, type, comment FROM system.columns "
+                    f"WHERE {column_filter} ORDER BY database, table, position"
+                ).result_rows:
+                    columns[(db, table)].append((name, column_type, comment))
+
+                for key in changed:
+                    comment, version = current[key]
+                    self.replace_table(key[0], key[1], comment, columns.get(key, []), version)
+
+            self._refreshed_at = time.monotonic()
+            if changed or removed:
+                logger.info(
+                    "Schema index refreshed: %d tables changed, %d removed, %d entries",
+                    len(changed),
+                    len(removed),
+                    self.entry_count,
+                )
+            return len(changed) + len(removed)
+        finally:
+            self._refresh_lock.release()
@@ -0,0 +1,426 @@
+"""Persistent snapshot of table and column metadata for fast warm starts.
+
+The snapshot holds what `list_tables` returns for every non-system database. It is
+saved to a local cache directory in a compact binary format and memory-mapped when
+loaded: only the directory of databases is read at startup, and a database's tables
+are decoded the first time they are asked for. A fresh process can therefore answer
+`list_tables` without contacting the server while the snapshot is reconciled in the
+background.
+
+Reconciling reads every table row from system.tables in one query and re-reads
+columns only for tables whose metadata_modification_time or definition changed.
+
+File layout (little endian)::
+
+    magic            8 bytes, b"MCHSNAP1"
+    header           encoded value: [table fields, column fields]
+    database count   uint32
+    directory        per database: name (encoded value), section offset and length (uint64)
+    sections         per database: encoded list of [table values, version, column values]
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Optional
+
+from clickhouse_connect.driver.binding import format_query_value
+
+from mcp_clickhouse.schema_index import SYSTEM_DATABASES
+
+logger = logging.getLogger("mcp-clickhouse")
+
+MAGIC = b"MCHSNAP1"
+
+_NONE, _STR, _INT, _FLOAT, _LIST, _BIG_INT = range(6)
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_SECTION = struct.Struct("<QQ")
+
+
+def _encode(value, out: bytearray) -> None:
+    if value is None:
+        out.append(_NONE)
+    elif isinstance(value, bool):
+        out.append(_INT)
+        out += _I64.pack(int(value))
+    elif isinstance(value, int):
+        if -(2**63) <= value < 2**63:
+            out.append(_INT)
+            out += _I64.pack(value)
+        else:
+            data = str(value).encode("ascii")
+            out.append(_BIG_INT)
+            out += _U32.pack(len(data))
+            out += data
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _F64.pack(value)
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        out += _U32.pack(len(value))
+        for item in value:
+            _encode(item, out)
+    else:
+        data = str(value).encode("utf-8")
+        out.append(_STR)
+        out += _U32.pack(len(data))
+        out += data
+
+
+def _decode(buffer, pos: int) -> tuple:
+    """Decode the value at `pos`, returning it and the position after it."""
+    tag = buffer[pos]
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag == _INT:
+        return _I64.unpack_from(buffer, pos)[0], pos + 8
+    if tag == _FLOAT:
+        return _F64.unpack_from(buffer, pos)[0], pos + 8
+    if tag == _LIST:
+        (count,) = _U32.unpack_from(buffer, pos)
+        pos += 4
+        items = []
+        for _ in range(count):
+            item, pos = _decode(buffer, pos)
+            items.append(item)
+        return items, pos
+    if tag in (_STR, _BIG_INT):
+        (length,) = _U32.unpack_from(buffer, pos)
+        pos += 4
+        text = bytes(buffer[pos : pos + length]).decode("utf-8")
+        return (int(text) if tag == _BIG_INT else text), pos + length
+    raise ValueError(f"Unknown value tag {tag} at offset {pos - 1}")
+
+
+def _like_to_regex(pattern: str) -> re.Pattern:
+    """Translate a ClickHouse LIKE pattern into an equivalent regular expression."""
+    parts = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def sql_like(value: str, pattern: str) -> bool:
+    """Evaluate `value LIKE pattern` with ClickHouse semantics."""
+    return _like_to_regex(pattern).fullmatch(value) is not None
+
+
+class SchemaSnapshot:
+    """Tables of every database, as dicts shaped like `list_tables` results.
+
+    Each table carries its column dicts under "columns". Snapshots loaded from a file
+    decode a database's section from the memory map on first access.
+
+    Args:
+        table_fields: Table attributes stored, starting with "database" and "name"
+        column_fields: Column attributes stored, starting with "database" and "table"
+    """
+
+    def __init__(self, table_fields: list, column_fields: list):
+        self.table_fields = list(table_fields)
+        self.column_fields = list(column_fields)
+        self._tables: dict[str, list] = {}
+        self._versions: dict[str, dict] = {}
+        self._sections: dict[str, tuple] = {}
+        self._buffer = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_tables(cls, table_fields: list, column_fields: list, tables: dict, versions: dict):
+        """Build a snapshot from {database: [table dict]} and {database: {table: version}}."""
+        snapshot = cls(table_fields, column_fields)
+        snapshot._tables = tables
+        snapshot._versions = versions
+        return snapshot
+
+    @classmethod
+    def load(cls, path: str, table_fields: list, column_fields: list) -> Optional["SchemaSnapshot"]:
+        """Memory-map a snapshot file, or return None if it is missing or unusable."""
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            if buffer[: len(MAGIC)] != MAGIC:
+                raise ValueError("bad magic")
+            (fields, pos) = _decode(buffer, len(MAGIC))
+            if fields != [list(table_fields), list(column_fields)]:
+                logger.info("Ignoring schema snapshot %s written for other fields", path)
+                return None
+            (count,) = _U32.unpack_from(buffer, pos)
+            pos += 4
+            sections = {}
+            for _ in range(count):
+                database, pos = _decode(buffer, pos)
+                sections[database] = _SECTION.unpack_from(buffer, pos)
+                pos += _SECTION.size
+        except (ValueError, IndexError, struct.error, UnicodeDecodeError) as e:
+            logger.warning("Ignoring unreadable schema snapshot %s: %s", path, e)
+            return None
+
+        snapshot = cls(table_fields, column_fields)
+        snapshot._buffer = buffer
+        snapshot._sections = sections
+        return snapshot
+
+    def databases(self) -> list:
+        return sorted(set(self._tables) | set(self._sections))
+
+    def tables(self, database: str) -> Optional[list]:
+        """Get the tables of a database, or None if the snapshot does not cover it."""
+        tables = self._tables.get(database)
+        if tables is None and database in self._sections:
+            tables = self._decode_section(database)
+        return tables
+
+    def versions(self, database: str) -> dict:
+        """Get {table: version} for a database, where version reflects its definition."""
+        if database not in self._versions and database in self._sections:
+            self._decode_section(database)
+        return self._versions.get(database, {})
+
+    def _decode_section(self, database: str) -> list:
+        with self._lock:
+            if database in self._tables:
+                return self._tables[database]
+            offset, _ = self._sections[database]
+            entries, _ = _decode(self._buffer, offset)
+            tables = []
+            versions = {}
+            for table_values, version, column_values in entries:
+                table = dict(zip(self.table_fields, table_values))
+                table["columns"] = [
+                    dict(zip(self.column_fields, [database, table["name"], *values]))
+                    for values in column_values
+                ]
+                tables.append(table)
+                versions[table["name"]] = version
+            self._versions[database] = versions
+            self._tables[database] = tables
+            return tables
+
+    def save(self, path: str) -> None:
+        """Write the snapshot atomically, readable only by the current user."""
+        out = bytearray(MAGIC)
+        _encode([self.table_fields, self.column_fields], out)
+        databases = self.databases()
+        sections = []
+        for database in databases:
+            section = bytearray()
+            versions = self.versions(database)
+            _encode(
+                [
+                    [
+                        [table[name] for name in self.table_fields],
+                        versions.get(table["name"]),
+                        [
+                            [column[name] for name in self.column_fields[2:]]
+                            for column in table["columns"]
+                        ],
+                    ]
+                    for table in self.tables(database)
+                ],
+                section,
+            )
+            sections.append(section)
+
+        directory = bytearray(_U32.pack(len(databases)))
+        directory_size = len(directory)
+        for database in databases:
+            entry = bytearray()
+            _encode(database, entry)
+            directory_size += len(entry) + _SECTION.size
+        offset = len(out) + directory_size
+        for database, section in zip(databases, sections):
+            _encode(database, directory)
+            directory += _SECTION.pack(offset, len(section))
+            offset += len(section)
+        out += directory
+        for section in sections:
+            out += section
+
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(out)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+def snapshot_path(cache_dir: str, host: str, port: int, username: str) -> str:
+    """Get the snapshot file of a server and user inside the cache directory."""
+    key = hashlib.blake2b(f"{host}:{port}:{username}".encode(), digest_size=8).hexdigest()
+    return os.path.join(os.path.expanduser(cache_dir), f"schema-{key}.bin")
+
+
+class SchemaSnapshotStore:
+    """The current SchemaSnapshot of a server, loaded from and saved to `path`."""
+
+    # Above this many changed tables, columns are read in bulk instead of by table list
+    BULK_READ_THRESHOLD = 500
+
+    def __init__(self, path: str, table_fields: list, column_fields: list):
+        self.path = path
+        self.table_fields = list(table_fields)
+        self.column_fields = list(column_fields)
+        self.snapshot: Optional[SchemaSnapshot] = None
+        self._reconciled_at: Optional[float] = None
+        self._reconcile_lock = threading.Lock()
+        self._background_lock = threading.Lock()
+        self._reconciling = False
+
+    def load(self) -> bool:
+        """Load the snapshot saved by an earlier process, returning whether one was found."""
+        snapshot = SchemaSnapshot.load(self.path, self.table_fields, self.column_fields)
+        if snapshot is not None:
+            self.snapshot = snapshot
+            logger.info("Loaded schema snapshot of %d databases", len(snapshot.databases()))
+        return snapshot is not None
+
+    def tables(self, database: str) -> Optional[list]:
+        snapshot = self.snapshot
+        return None if snapshot is None else snapshot.tables(database)
+
+    def is_stale(self, max_age_secs: float) -> bool:
+        """Whether the snapshot was not reconciled in this process in the last `max_age_secs`."""
+        return self._reconciled_at is None or time.monotonic() - self._reconciled_at > max_age_secs
+
+    def reconcile_in_background(self, connect: Callable[[], Any]) -> bool:
+        """Reconcile on a daemon thread, unless a background reconcile is running.
+
+        Args:
+            connect: Creates the ClickHouse client, on the reconcile thread
+
+        Returns:
+            Whether a reconcile thread was started.
+        """
+        with self._background_lock:
+            if self._reconciling:
+                return False
+            self._reconciling = True
+
+        def run():
+            try:
+                self.reconcile(connect())
+            except Exception as e:
+                logger.error("Schema snapshot reconcile failed: %s", e)
+            finally:
+                with self._background_lock:
+                    self._reconciling = False
+
+        threading.Thread(target=run, name="schema-snapshot", daemon=True).start()
+        return True
+
+    def reconcile(self, client, wait: bool = False) -> int:
+        """Bring the snapshot up to date with the server and save it.
+
+        Table rows are always re-read, so row counts and sizes are current; columns are
+        re-read only for tables whose metadata_modification_time or definition changed.
+
+        Args:
+            client: ClickHouse client
+            wait: Wait for a reconcile already in progress instead of returning at once
+
+        Returns:
+            The number of tables whose columns were re-read.
+        """
+        if not self._reconcile_lock.acquire(blocking=wait):
+            return 0
+        try:
+            excluded = ", ".join(format_query_value(db) for db in SYSTEM_DATABASES)
+            result = client.query(
+                f"SELECT {', '.join(self.table_fields)}, "
+                "toString(metadata_modification_time) || ':' || "
+                "toString(cityHash64(create_table_query)) "
+                f"FROM system.tables WHERE database NOT IN ({excluded}) AND NOT is_temporary "
+                "ORDER BY database, name"
+            )
+            old = self.snapshot
+            old_columns = {}
+            tables = defaultdict(list)
+            versions = defaultdict(dict)
+            changed = []
+            for row in result.result_rows:
+                table = dict(zip(self.table_fields, row[:-1]))
+                database, name, version = table["database"], table["name"], row[-1]
+                tables[database].append(table)
+                versions[database][name] = version
+                if old is not None and database not in old_columns:
+                    old_columns[database] = {
+                        t["name"]: t["columns"] for t in old.tables(database) or []
+                    }
+                if old is None or old.versions(database).get(name) != version:
+                    changed.append(table)
+                else:
+                    table["columns"] = old_columns[database][name]
+
+            columns = self._read_columns(
+                client, [(t["database"], t["name"]) for t in changed], excluded
+            )
+            for table in changed:
+                table["columns"] = columns.get((table["database"], table["name"]), [])
+
+            self.snapshot = SchemaSnapshot.from_tables(
+                self.table_fields, self.column_fields, dict(tables), dict(versions)
+            )
+            self._reconciled_at = time.monotonic()
+            try:
+                self.snapshot.save(self.path)
+            except OSError as e:
+                logger.warning("Failed to save schema snapshot to %s: %s", self.path, e)
+            if changed:
+                logger.info("Schema snapshot reconciled: %d tables changed", len(changed))
+            return len(changed)
+        finally:
+            self._reconcile_lock.release()
+
+    def _read_columns(self, client, changed: list, excluded: str) -> dict:
+        columns = defaultdict(list)
+        if not changed:
+            return columns
+        if len(changed) > self.BULK_READ_THRESHOLD:
+            column_filter = f"database NOT IN ({excluded})"
+        else:
+            pairs = ", ".join(
+                f"({format_query_value(db)}, {format_query_value(name)})" for db, name in changed
+            )
+            column_filter = f"(database, table) IN ({pairs})"
+        select = ", ".join(
+            "type AS column_type" if name == "column_type" else name for name in self.column_fields
+        )
+        result = client.query(
+            f"SELECT {select} FROM system.columns WHERE {column_filter} "
+            "ORDER BY database, table, position"
+        )
+        for row in result.result_rows:
+            column = dict(zip(self.column_fields, row))
+            columns[(column["database"], column["table"])].append(column)
+        return columns
@@ -0,0 +1,102 @@
+"""Coalescing of identical concurrent calls into a single execution.
+
+While a call for a key is in flight, further calls with the same key wait on its
+result instead of starting another execution. Every caller waits with its own timeout;
+the execution is cancelled only when the last caller waiting on it gives up.
+"""
+
+import logging
+import threading
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger("mcp-clickhouse")
+
+
+@dataclass
+class _Call:
+    future: Future
+    on_abandon: Optional[Callable[[], None]]
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Runs at most one execution per key at a time on an executor.
+
+    Args:
+        executor: Executor the executions are submitted to
+    """
+
+    def __init__(self, executor: Executor):
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def run(
+        self,
+        key: Hashable,
+        timeout: Optional[float],
+        fn: Callable,
+        *args: Any,
+        on_abandon: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """Run `fn(*args)`, or join the execution already in flight for `key`.
+
+        Args:
+            key: Identity of the call; calls with equal keys share one execution
+            timeout: Seconds this caller waits for the result
+            fn: Function to execute
+            *args: Arguments of `fn`
+            on_abandon: Called when every caller has given up on an execution that
+                could not be cancelled because it is already running. Only the
+                callback of the call that started the execution is used.
+
+        Raises:
+            concurrent.futures.TimeoutError: If the result is not ready within `timeout`
+            Exception: Whatever `fn` raised, re-raised in every caller
+        """
+        started = False
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call(self._executor.submit(fn, *args), on_abandon)
+                self._calls[key] = call
+                self.executions += 1
+                started = True
+            else:
+                self.coalesced += 1
+            call.waiters += 1
+
+        if started:
+            # Added outside the lock: the callback runs at once if the call is done
+            call.future.add_done_callback(lambda _: self._forget(key, call))
+        try:
+            return call.future.result(timeout=timeout)
+        finally:
+            self._leave(key, call)
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def _leave(self, key: Hashable, call: _Call) -> None:
+        with self._lock:
+            call.waiters -= 1
+            abandoned = call.waiters == 0 and not call.future.done()
+            if abandoned and self._calls.get(key) is call:
+                # Later callers start a fresh execution rather than joining one that
+                # is being cancelled
+                del self._calls[key]
+        if abandoned and not call.future.cancel() and call.on_abandon is not None:
+            try:
+                call.on_abandon()
+            except Exception as e:
+                logger.warning("Cancelling abandoned execution failed: %s", e)
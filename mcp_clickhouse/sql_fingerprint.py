@@ -0,0 +1,69 @@
+"""SQL normalization and fingerprinting.
+
+A fingerprint identifies the shape of a query: comments and redundant whitespace are
+removed, literals are replaced with `?` and lists of literals are collapsed, so that
+queries differing only in their constants share one fingerprint.
+"""
+
+import hashlib
+import re
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:[^'\\]|\\.|'')*')
+    |(?P<quoted>"(?:[^"\\]|\\.|"")*"|`(?:[^`\\]|\\.|``)*`)
+    |(?P<number>(?<![\w.])(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)(?![\w]))
+    |(?P<space>\s+)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_LITERAL_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_query(query: str, strip_literals: bool = True) -> str:
+    """Normalize a query for grouping or comparison.
+
+    Comments are removed and whitespace runs collapse to a single space. With
+    `strip_literals`, string and numeric literals become `?`, literal lists become
+    `(?+)` and the text outside quoted identifiers is lowercased.
+
+    Args:
+        query: SQL text
+        strip_literals: Replace literals so that queries of the same shape compare equal
+
+    Returns:
+        The normalized query text
+    """
+    parts = []
+    pos = 0
+    for match in _TOKEN_RE.finditer(query):
+        plain = query[pos : match.start()]
+        if plain:
+            parts.append(plain.lower() if strip_literals else plain)
+        pos = match.end()
+        kind = match.lastgroup
+        if kind in ("comment", "space"):
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        elif kind in ("string", "number") and strip_literals:
+            parts.append("?")
+        else:
+            parts.append(match.group())
+    tail = query[pos:]
+    parts.append(tail.lower() if strip_literals else tail)
+
+    normalized = "".join(parts).strip()
+    if strip_literals:
+        normalized = _LITERAL_LIST_RE.sub("(?+)", normalized)
+    return normalized
+
+
+def query_fingerprint(query: str) -> str:
+    """Get a short stable hash identifying the shape of a query."""
+    return normalized_fingerprint(normalize_query(query))
+
+
+def normalized_fingerprint(normalized: str) -> str:
+    """Get the fingerprint of a query already normalized by `normalize_query`."""
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
@@ -0,0 +1,180 @@
+"""Optional OpenTelemetry tracing of tool calls.
+
+Tracing is off unless CLICKHOUSE_TRACING_EXPORTER is set. When on, every tool call
+gets a span, with children for the wait in QUERY_EXECUTOR, the connection to
+ClickHouse, the query itself (tagged with its query_id) and the serialization of the
+result. The trace context is sent to ClickHouse in the `traceparent` header, so the
+spans the server records in system.opentelemetry_span_log join the same trace.
+
+When tracing is off nothing from OpenTelemetry is imported, and every helper here
+returns at once: `span()` hands out a shared no-op context manager.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import importlib
+import logging
+import sys
+import time
+from typing import Any, Callable, Optional
+
+from fastmcp.server.middleware import Middleware
+from fastmcp.tools.tool import default_serializer
+
+from mcp_clickhouse.mcp_env import get_logging_config
+
+logger = logging.getLogger("mcp-clickhouse")
+
+TRACER_NAME = "mcp_clickhouse"
+SERVICE_NAME = "mcp-clickhouse"
+
+_TRACER = None
+_PROVIDER = None
+_NO_SPAN = contextlib.nullcontext()
+
+
+def _create_exporter(name: str, path: Optional[str]):
+    if name == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        # stdout carries the stdio transport, so spans go to stderr
+        return ConsoleSpanExporter(out=sys.stderr)
+    if name == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        out = open(path, "a", encoding="utf-8")
+        atexit.register(out.close)
+        return ConsoleSpanExporter(out=out, formatter=lambda s: s.to_json(indent=None) + "\n")
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        # Endpoint, headers and timeouts come from the standard OTEL_EXPORTER_OTLP_* variables
+        return OTLPSpanExporter()
+    module_name, _, attribute = name.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+def configure_tracing(exporter=None) -> bool:
+    """Start exporting spans if tracing is enabled.
+
+    Args:
+        exporter: SpanExporter to use instead of the one named by the configuration
+
+    Returns:
+        Whether tracing is on
+
+    Raises:
+        RuntimeError: If tracing is enabled but opentelemetry-sdk is not installed
+    """
+    global _TRACER, _PROVIDER
+    config = get_logging_config()
+    if exporter is None and config.tracing_exporter == "none":
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        raise RuntimeError(
+            "Tracing requires the OpenTelemetry SDK: pip install opentelemetry-sdk"
+        ) from e
+
+    if exporter is None:
+        exporter = _create_exporter(config.tracing_exporter, config.tracing_file)
+    if _PROVIDER is not None:
+        _PROVIDER.shutdown()
+    else:
+        atexit.register(_shutdown)
+    _PROVIDER = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    _PROVIDER.add_span_processor(BatchSpanProcessor(exporter))
+    _TRACER = _PROVIDER.get_tracer(TRACER_NAME)
+    logger.info("Tracing enabled with %s exporter", type(exporter).__name__)
+    return True
+
+
+def _shutdown() -> None:
+    if _PROVIDER is not None:
+        _PROVIDER.shutdown()
+
+
+def force_flush() -> None:
+    """Export the spans still buffered, e.g. before inspecting them in tests."""
+    if _PROVIDER is not None:
+        _PROVIDER.force_flush()
+
+
+def span(name: str, attributes: Optional[dict] = None):
+    """Context manager recording a span as a child of the current one."""
+    tracer = _TRACER
+    if tracer is None:
+        return _NO_SPAN
+    if attributes:
+        attributes = {key: value for key, value in attributes.items() if value is not None}
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def set_attributes(attributes: dict) -> None:
+    """Set attributes on the current span."""
+    if _TRACER is None:
+        return
+    from opentelemetry import trace
+
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+def in_current_context(fn: Callable) -> Callable:
+    """Wrap a function submitted to an executor so that it runs in the caller's context.
+
+    The function joins the caller's trace and sees its context variables, such as the
+    credentials of the request. The wrapper records how long the call waited in the
+    executor's queue.
+    """
+    tracer = _TRACER
+    context = contextvars.copy_context()
+    if tracer is None:
+
+        def run_untraced(*args, **kwargs):
+            return context.run(fn, *args, **kwargs)
+
+        return run_untraced
+    queued_at = time.time_ns()
+
+    def traced(*args, **kwargs):
+        tracer.start_span("executor.queue", start_time=queued_at).end()
+        return fn(*args, **kwargs)
+
+    def run(*args, **kwargs):
+        return context.run(traced, *args, **kwargs)
+
+    return run
+
+
+def trace_headers() -> Optional[dict]:
+    """Get the W3C trace context headers propagating the current span to ClickHouse."""
+    if _TRACER is None:
+        return None
+    from opentelemetry.propagate import inject
+
+    headers: dict = {}
+    inject(headers)
+    return headers
+
+
+def serialize_result(data: Any) -> str:
+    """Tool result serializer recording the time spent encoding results."""
+    with span("mcp.serialize_result"):
+        return default_serializer(data)
+
+
+class TracingMiddleware(Middleware):
+    """FastMCP middleware opening the root span of every tool call."""
+
+    async def on_call_tool(self, context, call_next):
+        if _TRACER is None:
+            return await call_next(context)
+        with span("mcp.tool_call", {"mcp.tool.name": context.message.name}):
+            return await call_next(context)
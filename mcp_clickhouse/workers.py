@@ -0,0 +1,305 @@
+"""Multi-process deployment of the MCP server over streamable HTTP.
+
+A single Python process is limited by the GIL, so `run_workers()` starts N worker
+processes, each serving the MCP app on a private Unix socket, and a front process that
+listens on the public address and relays requests to them. Streamable HTTP sessions
+live in the memory of the worker that created them, so the front process keeps a
+session -> worker map, learnt from the `mcp-session-id` response header, and sends
+every later request of a session to the same worker. New sessions go to the worker
+with the fewest requests in flight. The front process only relays bytes; all tool
+work happens in the workers. `/metrics` is the exception: it gathers the metrics of
+every worker, labelled with the worker's index.
+
+On SIGTERM or SIGINT the front process stops accepting connections and signals the
+workers, which stop accepting requests too; in-flight requests get up to the drain
+timeout to finish before the workers are killed.
+"""
+
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+import zlib
+from typing import Optional
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from mcp_clickhouse.cache import BoundedCache
+from mcp_clickhouse.drain import serve
+from mcp_clickhouse.mcp_env import ClickHouseConfig, get_logging_config
+from mcp_clickhouse.metrics import CONTENT_TYPE, merge_worker_metrics
+
+logger = logging.getLogger("mcp-clickhouse")
+
+SESSION_HEADER = "mcp-session-id"
+MAX_TRACKED_SESSIONS = 100_000
+WORKER_START_TIMEOUT_SECS = 60
+# Headers that describe one HTTP connection and must not be relayed
+_HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+    "host",
+    "content-length",
+}
+
+
+def _run_worker(index: int, socket_path: str, drain_timeout_secs: int, prewarm: bool):
+    """Entry point of a worker process: serve the MCP app on a Unix socket."""
+    from mcp_clickhouse.mcp_server import (
+        install_reload_handler,
+        mcp,
+        start_audit_log,
+        start_connection_warmup,
+        start_preview_prewarm,
+        start_read_count_backfill,
+    )
+
+    install_reload_handler()
+    # Every worker has its own connection pool
+    start_connection_warmup()
+    start_audit_log()
+    start_read_count_backfill()
+    if prewarm:
+        start_preview_prewarm()
+    serve(
+        mcp.http_app(transport="http"),
+        drain_timeout_secs,
+        uds=socket_path,
+        log_level=get_logging_config().level.lower(),
+    )
+
+
+class _Worker:
+    def __init__(self, index: int, socket_path: str):
+        self.index = index
+        self.socket_path = socket_path
+        self.process: Optional[multiprocessing.Process] = None
+        self.in_flight = 0
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=socket_path),
+            base_url="http://worker",
+            timeout=httpx.Timeout(None),
+        )
+
+
+class WorkerPool:
+    """Worker processes and the session affinity used to route requests to them."""
+
+    def __init__(self, workers: int, drain_timeout_secs: int):
+        self.drain_timeout_secs = drain_timeout_secs
+        self._socket_dir = tempfile.mkdtemp(prefix="mcp-clickhouse-")
+        self._context = multiprocessing.get_context("spawn")
+        self.workers = [
+            _Worker(i, os.path.join(self._socket_dir, f"worker-{i}.sock")) for i in range(workers)
+        ]
+        self.sessions = BoundedCache(maxsize=MAX_TRACKED_SESSIONS)
+        self._stopping = False
+
+    def start(self) -> None:
+        for worker in self.workers:
+            self._spawn(worker)
+        deadline = time.monotonic() + WORKER_START_TIMEOUT_SECS
+        while not all(os.path.exists(w.socket_path) for w in self.workers):
+            if time.monotonic() > deadline:
+                raise RuntimeError("MCP workers did not start in time")
+            if any(not w.process.is_alive() for w in self.workers):
+                raise RuntimeError("An MCP worker exited during startup")
+            time.sleep(0.05)
+        logger.info("Started %d MCP workers", len(self.workers))
+
+    def _spawn(self, worker: _Worker) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(worker.socket_path)
+        worker.process = self._context.Process(
+            target=_run_worker,
+            args=(worker.index, worker.socket_path, self.drain_timeout_secs, worker.index == 0),
+            name=f"mcp-worker-{worker.index}",
+            daemon=False,
+        )
+        worker.process.start()
+
+    async def supervise(self) -> None:
+        """Restart workers that exit unexpectedly.
+
+        Their sessions are lost; requests for them keep going to the restarted worker,
+        which answers that the session is unknown so that clients start a new one.
+        """
+        while not self._stopping:
+            await asyncio.sleep(1)
+            for worker in self.workers:
+                if self._stopping or worker.process.is_alive():
+                    continue
+                logger.error(
+                    "MCP worker %d exited with code %s, restarting",
+                    worker.index,
+                    worker.process.exitcode,
+                )
+                self._spawn(worker)
+
+    def pick(self, session_id: Optional[str]) -> _Worker:
+        """Get the worker owning a session, or the least busy worker for a new one."""
+        if session_id:
+            worker = self.sessions.get(session_id)
+            if worker is not None:
+                return worker
+            # Unknown sessions (e.g. after a front process restart) are spread stably,
+            # so the worker can answer with the protocol's own "session not found"
+            return self.workers[zlib.crc32(session_id.encode()) % len(self.workers)]
+        return min(self.workers, key=lambda w: w.in_flight)
+
+    def drain(self) -> None:
+        """Ask every worker to stop accepting requests and finish the ones in flight."""
+        self._stopping = True
+        for worker in self.workers:
+            if worker.process.is_alive():
+                os.kill(worker.process.pid, signal.SIGTERM)
+
+    async def stop(self) -> None:
+        """Wait for the workers to drain and exit, killing any still running after the timeout."""
+        self.drain()
+        deadline = time.monotonic() + self.drain_timeout_secs + 5
+        for worker in self.workers:
+            remaining = max(deadline - time.monotonic(), 0)
+            await asyncio.to_thread(worker.process.join, remaining)
+            if worker.process.is_alive():
+                logger.warning("MCP worker %d did not drain in time, killing it", worker.index)
+                worker.process.kill()
+            await worker.client.aclose()
+        shutil.rmtree(self._socket_dir, ignore_errors=True)
+        logger.info("All MCP workers stopped")
+
+
+def _relay_app(pool: WorkerPool) -> Starlette:
+    """Build the front app relaying every request to a worker."""
+
+    async def relay(request: Request):
+        session_id = request.headers.get(SESSION_HEADER)
+        worker = pool.pick(session_id)
+        headers = [
+            (key, value)
+            for key, value in request.headers.items()
+            if key.lower() not in _HOP_BY_HOP_HEADERS
+        ]
+        has_body = request.method in ("POST", "PUT", "PATCH")
+        upstream_request = worker.client.build_request(
+            request.method,
+            request.url.path,
+            params=request.url.query,
+            headers=headers,
+            content=request.stream() if has_body else None,
+        )
+        worker.in_flight += 1
+        try:
+            upstream = await worker.client.send(upstream_request, stream=True)
+        except httpx.TransportError as e:
+            worker.in_flight -= 1
+            logger.warning("MCP worker %d unavailable: %s", worker.index, e)
+            return PlainTextResponse("Worker unavailable", status_code=503)
+
+        new_session_id = upstream.headers.get(SESSION_HEADER)
+        if new_session_id and new_session_id != session_id:
+            pool.sessions.set(new_session_id, worker)
+        if request.method == "DELETE" and session_id:
+            pool.sessions.pop(session_id)
+
+        async def body():
+            # Also runs when the client disconnects mid-stream, as the cancellation is
+            # raised inside this generator
+            try:
+                async for chunk in upstream.aiter_raw():
+                    yield chunk
+            finally:
+                worker.in_flight -= 1
+                await upstream.aclose()
+
+        return StreamingResponse(
+            body(),
+            status_code=upstream.status_code,
+            headers={
+                key: value
+                for key, value in upstream.headers.items()
+                if key.lower() not in _HOP_BY_HOP_HEADERS
+            },
+        )
+
+    async def metrics(request: Request):
+        async def scrape(worker):
+            try:
+                response = await worker.client.get("/metrics")
+                response.raise_for_status()
+                return response.text
+            except httpx.HTTPError as e:
+                logger.warning("MCP worker %d metrics unavailable: %s", worker.index, e)
+                return ""
+
+        texts = await asyncio.gather(*(scrape(worker) for worker in pool.workers))
+        return PlainTextResponse(merge_worker_metrics(texts), media_type=CONTENT_TYPE)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        supervisor = asyncio.create_task(pool.supervise())
+        try:
+            yield
+        finally:
+            supervisor.cancel()
+            await pool.stop()
+
+    methods = ["GET", "POST", "DELETE", "PUT", "PATCH", "HEAD", "OPTIONS"]
+    routes = [
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/{path:path}", relay, methods=methods),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+class _RelayServer(uvicorn.Server):
+    """Uvicorn server that signals the workers to drain as soon as shutdown begins.
+
+    The front process and the workers then drain concurrently, so a shutdown takes at
+    most about one drain timeout.
+    """
+
+    def __init__(self, config: uvicorn.Config, pool: WorkerPool):
+        super().__init__(config)
+        self.pool = pool
+
+    def handle_exit(self, sig, frame) -> None:
+        self.pool.drain()
+        super().handle_exit(sig, frame)
+
+
+def run_workers(config: ClickHouseConfig) -> None:
+    """Serve the MCP app over streamable HTTP from `config.mcp_workers` processes."""
+    pool = WorkerPool(config.mcp_workers, config.mcp_drain_timeout_secs)
+    pool.start()
+    logger.info(
+        "Relaying http://%s:%d to %d MCP workers",
+        config.mcp_bind_host,
+        config.mcp_bind_port,
+        config.mcp_workers,
+    )
+    server_config = uvicorn.Config(
+        _relay_app(pool),
+        host=config.mcp_bind_host,
+        port=config.mcp_bind_port,
+        lifespan="on",
+        timeout_graceful_shutdown=config.mcp_drain_timeout_secs,
+        log_level=get_logging_config().level.lower(),
+    )
+    _RelayServer(server_config, pool).run()
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from mcp_clickhouse import mcp_env
+from mcp_clickhouse.audit_log import AuditLog, AuditMiddleware, FileSink, audit_result
+from mcp_clickhouse.circuit_breaker import CircuitBreakerMiddleware
+from mcp_clickhouse.credentials import CredentialMiddleware
+from mcp_clickhouse.mcp_env import ClickHouseConfig, LoggingConfig
+from mcp_clickhouse.rate_limit import RateLimitMiddleware
+
+
+class ListSink:
+    name = "list"
+
+    def __init__(self):
+        self.batches = []
+
+    def write(self, records):
+        self.batches.append(list(records))
+
+
+def _record(query: str = "SELECT 1") -> dict:
+    return {"event_time": 0.0, "tool": "run_select_query", "query": query}
+
+
+class TestAuditLog(unittest.TestCase):
+    def test_full_buffer_drops_new_records(self):
+        """Test that records beyond the bound are dropped and counted, not queued."""
+        audit_log = AuditLog(max_queued=2, batch_size=10)
+        audit_log.sinks = [ListSink()]
+        self.assertTrue(audit_log.add(_record()))
+        self.assertTrue(audit_log.add(_record()))
+        self.assertFalse(audit_log.add(_record()))
+        self.assertEqual(audit_log.dropped, 1)
+        self.assertEqual(audit_log.flush(), 2)
+        self.assertEqual(audit_log.dropped, 0)
+        self.assertTrue(audit_log.add(_record()))
+
+    def test_flush_writes_batches_with_fingerprints(self):
+        """Test that records reach every sink in batches, fingerprinted."""
+        sink = ListSink()
+        audit_log = AuditLog(max_queued=100, batch_size=2)
+        audit_log.sinks = [sink]
+        for n in range(5):
+            audit_log.add(_record(f"SELECT {n}"))
+        self.assertEqual(audit_log.flush(), 5)
+        self.assertEqual([len(batch) for batch in sink.batches], [2, 2, 1])
+        fingerprints = {record["fingerprint"] for batch in sink.batches for record in batch}
+        self.assertEqual(len(fingerprints), 1)
+
+    def test_close_flushes_the_buffer(self):
+        """Test that records still buffered are written when the log is closed."""
+        sink = ListSink()
+        audit_log = AuditLog(max_queued=100, batch_size=100)
+        audit_log.start([sink], flush_secs=3600)
+        audit_log.add(_record())
+        audit_log.close()
+        self.assertEqual(sum(len(batch) for batch in sink.batches), 1)
+
+    def test_file_sink_rotates(self):
+        """Test that audit files are rotated at their size and old ones removed."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "audit.jsonl")
+            sink = FileSink(path, max_bytes=200, backups=2)
+            for n in range(4):
+                sink.write([{**_record("x" * 150), "n": n}])
+            self.assertEqual(
+                sorted(os.listdir(directory)), ["audit.jsonl", "audit.jsonl.1", "audit.jsonl.2"]
+            )
+            with open(path) as f:
+                self.assertEqual(json.loads(f.readline())["n"], 3)
+            with open(path + ".2") as f:
+                self.assertEqual(json.loads(f.readline())["n"], 1)
+
+    def test_config(self):
+        """Test that unknown sinks and file sinks without a directory are rejected."""
+        config = LoggingConfig.from_env(
+            {"CLICKHOUSE_AUDIT_SINKS": "File, clickhouse", "CLICKHOUSE_AUDIT_DIR": "/tmp/a"}
+        )
+        self.assertEqual(config.audit_sinks, ("file", "clickhouse"))
+        for environ in (
+            {"CLICKHOUSE_AUDIT_SINKS": "kafka"},
+            {"CLICKHOUSE_AUDIT_SINKS": "file"},
+            {"CLICKHOUSE_AUDIT_QUEUE_SIZE": "0"},
+        ):
+            with self.assertRaises(ValueError):
+                LoggingConfig.from_env(environ)
+
+
+class TestAuditMiddleware(unittest.TestCase):
+    def setUp(self):
+        saved = mcp_env._CONFIG_INSTANCE
+        mcp_env._CONFIG_INSTANCE = ClickHouseConfig(enabled=False)
+        self.addCleanup(setattr, mcp_env, "_CONFIG_INSTANCE", saved)
+        self.audit_log = AuditLog()
+        self.audit_log.sinks = [ListSink()]
+        self.mcp = FastMCP("audit-test")
+
+        @self.mcp.tool
+        def run_select_query(query: str):
+            audit_result(rows=3, result_bytes=42)
+            return "ok"
+
+        @self.mcp.tool
+        def fail():
+            raise ToolError("boom")
+
+        self.mcp.add_middleware(AuditMiddleware(self.audit_log, default_user=lambda: "default"))
+
+    def _call(self, name: str, arguments: dict):
+        async def run():
+            async with Client(self.mcp) as client:
+                await client.call_tool(name, arguments)
+
+        asyncio.run(run())
+
+    def test_calls_are_recorded(self):
+        """Test that successful and failed calls are recorded with their result size."""
+        self._call("run_select_query", {"query": "SELECT 1"})
+        with self.assertRaises(ToolError):
+            self._call("fail", {})
+        self.audit_log.flush()
+        ok, failed = self.audit_log.sinks[0].batches[0]
+        self.assertEqual(
+            (ok["tool"], ok["user"], ok["query"], ok["rows"], ok["bytes"], ok["status"]),
+            ("run_select_query", "default", "SELECT 1", 3, 42, "ok"),
+        )
+        self.assertTrue(ok["fingerprint"])
+        self.assertEqual((failed["tool"], failed["status"]), ("fail", "error"))
+        self.assertIn("boom", failed["error"])
+        self.assertIsNone(failed["rows"])
+
+    def test_rejected_calls_are_recorded(self):
+        """Test that calls rejected by the rate limiter or credential check are audited."""
+        mcp_env._CONFIG_INSTANCE = ClickHouseConfig(
+            enabled=False,
+            mcp_request_credentials=True,
+            mcp_query_rate_per_min=1,
+            mcp_query_burst=1,
+        )
+        self.mcp.add_middleware(RateLimitMiddleware({"run_select_query"}))
+        self.mcp.add_middleware(CredentialMiddleware())
+
+        headers = {"x-clickhouse-user": "alice", "x-clickhouse-key": "secret"}
+        with mock.patch("mcp_clickhouse.credentials.get_http_headers", return_value=headers):
+            self._call("run_select_query", {"query": "SELECT 1"})
+            with self.assertRaises(ToolError):
+                self._call("run_select_query", {"query": "SELECT 1"})
+        with mock.patch("mcp_clickhouse.credentials.get_http_headers", return_value={}):
+            with self.assertRaises(ToolError):
+                self._call("fail", {})
+        self.audit_log.flush()
+        ok, limited, anonymous = self.audit_log.sinks[0].batches[0]
+        self.assertEqual((ok["user"], ok["status"]), ("alice", "ok"))
+        self.assertEqual((limited["user"], limited["status"]), ("alice", "error"))
+        self.assertIn("rate_limited", limited["error"])
+        self.assertEqual((anonymous["user"], anonymous["status"]), ("default", "error"))
+        self.assertIn("credentials are required", anonymous["error"])
+
+    def test_server_audits_ahead_of_rejecting_middleware(self):
+        """Test that the server's audit middleware runs before the ones rejecting calls."""
+        from mcp_clickhouse.mcp_server import mcp
+
+        kinds = [type(middleware) for middleware in mcp.middleware]
+        audit = kinds.index(AuditMiddleware)
+        for rejecting in (RateLimitMiddleware, CircuitBreakerMiddleware, CredentialMiddleware):
+            self.assertLess(audit, kinds.index(rejecting))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from unittest import mock
+
+from mcp_clickhouse.cache import BoundedCache
+
+
+class TestBoundedCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = BoundedCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.keys(), ["a", "c"])
+
+    def test_ttl_expiry(self):
+        """Test that entries older than the TTL are treated as missing."""
+        cache = BoundedCache(maxsize=2, ttl_secs=10)
+        with mock.patch("mcp_clickhouse.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with mock.patch("mcp_clickhouse.cache.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("mcp_clickhouse.cache.time.monotonic", return_value=111.0):
+            self.assertEqual(cache.get("a", "missing"), "missing")
+        self.assertEqual(len(cache), 0)
+
+    def test_discard_where(self):
+        """Test removing entries by key predicate."""
+        cache = BoundedCache(maxsize=10)
+        cache.set(("db", "t1"), 1)
+        cache.set(("db", "t2"), 2)
+        cache.set(("other", "t1"), 3)
+        self.assertEqual(cache.discard_where(lambda key: key[0] == "db"), 2)
+        self.assertEqual(cache.keys(), [("other", "t1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from mcp_clickhouse.chdb_scratch import ScratchQuotaExceeded, ScratchTables, check_table_name
+
+
+class TestScratchTables(unittest.TestCase):
+    def test_quota_counts_replaced_tables_as_free(self):
+        """Test that the quota covers all tables except the one being replaced."""
+        tables = ScratchTables()
+        tables.add("a", rows=10, nbytes=600, max_bytes=1000, now=0.0)
+        self.assertEqual(tables.available_bytes(1000), 400)
+        self.assertEqual(tables.available_bytes(1000, replacing="a"), 1000)
+        with self.assertRaises(ScratchQuotaExceeded):
+            tables.add("b", rows=10, nbytes=500, max_bytes=1000, now=0.0)
+        tables.add("a", rows=10, nbytes=900, max_bytes=1000, now=0.0)
+        self.assertEqual(len(tables), 1)
+
+    def test_idle_tables_expire_unless_queried(self):
+        """Test that queries naming a table keep it alive and idle ones are expired."""
+        tables = ScratchTables()
+        tables.add("kept", rows=1, nbytes=1, max_bytes=100, now=0.0)
+        tables.add("idle", rows=1, nbytes=1, max_bytes=100, now=0.0)
+        self.assertEqual(
+            tables.touch("SELECT * FROM mcp_scratch.kept JOIN mcp_scratch.gone USING id", now=50.0),
+            ["kept"],
+        )
+        self.assertEqual(tables.expire(60, now=30.0), [])
+        self.assertEqual(tables.expire(60, now=100.0), ["idle"])
+        self.assertEqual(tables.expire(0, now=1000.0), [])
+        self.assertEqual(len(tables), 1)
+
+    def test_table_names_are_plain_identifiers(self):
+        """Test that names are checked before they reach any SQL."""
+        self.assertEqual(check_table_name("events_2024"), "events_2024")
+        for name in ("", "1st", "a-b", "a.b", "a`b", "x" * 65):
+            with self.assertRaises(ValueError):
+                check_table_name(name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import asyncio
+import concurrent.futures
+import unittest
+
+from clickhouse_connect.driver.exceptions import DatabaseError, OperationalError
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+from urllib3.exceptions import (
+    ConnectTimeoutError,
+    MaxRetryError,
+    NewConnectionError,
+    ReadTimeoutError,
+)
+
+from mcp_clickhouse import mcp_env
+from mcp_clickhouse.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    BackendUnavailable,
+    CircuitBreaker,
+    CircuitBreakerMiddleware,
+    is_backend_failure,
+)
+from mcp_clickhouse.mcp_env import ClickHouseConfig
+
+
+def _network_error():
+    try:
+        try:
+            raise NewConnectionError(None, "Connection refused")
+        except NewConnectionError as e:
+            raise OperationalError("Error executing HTTP request") from e
+    except OperationalError:
+        # Tools wrap errors in a ToolError raised while handling them
+        try:
+            raise ToolError("Query execution failed")
+        except ToolError as e:
+            return e
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def _record(self, breaker, failed, trial=False, now=0.0):
+        breaker.record(trial, failed, window=4, min_calls=3, failure_percent=50, now=now)
+
+    def test_opens_on_failure_ratio(self):
+        """Test that the circuit opens once enough of the recent calls failed."""
+        breaker = CircuitBreaker()
+        self._record(breaker, True)
+        self._record(breaker, True)
+        self.assertEqual(breaker.state, CLOSED)
+        self._record(breaker, False)
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(BackendUnavailable) as raised:
+            breaker.acquire(open_secs=30, half_open_calls=1, now=10.0)
+        self.assertAlmostEqual(raised.exception.retry_after_secs, 20.0)
+        self.assertEqual(breaker.snapshot(open_secs=30, now=10.0)["retry_after_secs"], 20.0)
+
+    def test_successes_outnumbering_failures_keep_it_closed(self):
+        """Test that failures sliding out of the window no longer count."""
+        breaker = CircuitBreaker()
+        for failed in (True, False, False, False, True, False):
+            self._record(breaker, failed)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_half_open_trials(self):
+        """Test that trial calls close the circuit on success and reopen it on failure."""
+        breaker = CircuitBreaker()
+        for _ in range(3):
+            self._record(breaker, True)
+        self.assertTrue(breaker.acquire(open_secs=30, half_open_calls=1, now=31.0))
+        self.assertEqual(breaker.state, HALF_OPEN)
+        with self.assertRaises(BackendUnavailable):
+            breaker.acquire(open_secs=30, half_open_calls=1, now=31.0)
+        self._record(breaker, True, trial=True, now=32.0)
+        self.assertEqual(breaker.state, OPEN)
+
+        self.assertTrue(breaker.acquire(open_secs=30, half_open_calls=1, now=62.0))
+        self._record(breaker, False, trial=True, now=63.0)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertFalse(breaker.acquire(open_secs=30, half_open_calls=1, now=63.0))
+        self.assertEqual(breaker.opened, 2)
+
+    def test_connect_timeout_adapts(self):
+        """Test that the connect timeout follows recent latencies within its bounds."""
+        breaker = CircuitBreaker()
+        self.assertEqual(breaker.connect_timeout(30, 2), 30)
+        for _ in range(50):
+            breaker.connect_latencies.add(0.01)
+        self.assertEqual(breaker.connect_timeout(30, 2), 2)
+        for _ in range(50):
+            breaker.connect_latencies.add(1.5)
+        self.assertEqual(breaker.connect_timeout(30, 2), 6.0)
+        self.assertEqual(breaker.connect_timeout(30, 30), 30)
+
+    def test_backend_failures(self):
+        """Test that connection errors count as failures, query errors and timeouts do not."""
+        self.assertTrue(is_backend_failure(_network_error()))
+        self.assertTrue(is_backend_failure(ConnectionResetError()))
+        self.assertTrue(
+            is_backend_failure(MaxRetryError(None, "/", ConnectTimeoutError("connect timed out")))
+        )
+        self.assertFalse(is_backend_failure(DatabaseError("Code: 62. Syntax error")))
+        self.assertFalse(is_backend_failure(ToolError("top_k must be between 1 and 100")))
+        self.assertFalse(is_backend_failure(ReadTimeoutError(None, "/", "Read timed out")))
+        try:
+            try:
+                raise concurrent.futures.TimeoutError()
+            except concurrent.futures.TimeoutError:
+                raise ToolError("Query timed out after 30 seconds")
+        except ToolError as e:
+            self.assertFalse(is_backend_failure(e))
+
+
+class TestCircuitBreakerMiddleware(unittest.TestCase):
+    def setUp(self):
+        self._saved = mcp_env._CONFIG_INSTANCE
+        mcp_env._CONFIG_INSTANCE = ClickHouseConfig(
+            enabled=False, circuit_window=4, circuit_min_calls=2
+        )
+        self.breaker = CircuitBreaker()
+        self.mcp = FastMCP("circuit-test")
+
+        @self.mcp.tool
+        def run_select_query(fail: str):
+            if fail == "network":
+                raise _network_error()
+            if fail == "syntax":
+                raise ToolError("Query execution failed: Syntax error")
+            return "ok"
+
+        @self.mcp.tool
+        def run_chdb_select_query():
+            return "ok"
+
+        self.mcp.add_middleware(CircuitBreakerMiddleware(self.breaker, {"run_select_query"}))
+
+    def tearDown(self):
+        mcp_env._CONFIG_INSTANCE = self._saved
+
+    def _call(self, name: str, arguments: dict):
+        async def run():
+            async with Client(self.mcp) as client:
+                result = await client.call_tool(name, arguments)
+            return result[0].text
+
+        return asyncio.run(run())
+
+    def test_network_errors_open_the_circuit(self):
+        """Test that guarded tools fail fast after network errors, other tools do not."""
+        for fail in ("syntax", "syntax"):
+            with self.assertRaises(ToolError):
+                self._call("run_select_query", {"fail": fail})
+        self.assertEqual(self.breaker.state, CLOSED)
+        for _ in range(2):
+            with self.assertRaises(ToolError):
+                self._call("run_select_query", {"fail": "network"})
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaisesRegex(ToolError, "retry_after_secs"):
+            self._call("run_select_query", {"fail": ""})
+        self.assertEqual(self._call("run_chdb_select_query", {}), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
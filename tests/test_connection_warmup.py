@@ -0,0 +1,139 @@
+import threading
+import time
+import unittest
+
+import clickhouse_connect
+from urllib3.exceptions import HTTPError
+
+from mcp_clickhouse.connection_warmup import MAX_WARM_CONNECTIONS, ConnectionWarmer
+
+
+class FakeClient:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def ping(self):
+        return self.pool.ping()
+
+
+class FakePool:
+    """Counts the requests that overlap, as a pool hands out one connection to each."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.connections = 0
+        self.pings = 0
+        self.clears = 0
+        self.up = True
+
+    def _request(self):
+        with self.lock:
+            self.active += 1
+            self.connections = max(self.connections, self.active)
+        threading.Event().wait(0.05)
+        with self.lock:
+            self.active -= 1
+        if not self.up:
+            raise ConnectionError("connection refused")
+
+    def connect(self):
+        self._request()
+        return FakeClient(self)
+
+    def ping(self):
+        with self.lock:
+            self.pings += 1
+        try:
+            self._request()
+        except ConnectionError:
+            return False
+        return True
+
+    def clear(self):
+        self.clears += 1
+        self.connections = 0
+
+
+class TestConnectionWarmer(unittest.TestCase):
+    def setUp(self):
+        self.pool = FakePool()
+        self.warmer = ConnectionWarmer(self.pool.connect, self.pool.clear)
+
+    def test_opens_connections_at_once_then_pings_them(self):
+        """Test that warming and pinging send one concurrent request per connection."""
+        self.assertEqual(self.warmer.step(3), 0)
+        self.assertTrue(self.warmer.warm)
+        self.assertEqual(self.pool.connections, 3)
+        self.assertEqual(self.warmer.step(3), 0)
+        self.assertEqual(self.pool.pings, 3)
+
+        self.warmer.step(MAX_WARM_CONNECTIONS + 4)
+        self.assertEqual(self.pool.pings, 3 + MAX_WARM_CONNECTIONS)
+
+    def test_failed_ping_drops_the_pool_and_backs_off(self):
+        """Test that network errors clear the pool and retry with a growing delay."""
+        self.warmer.step(2)
+        self.pool.up = False
+        self.assertEqual(self.warmer.step(2), 1)
+        self.assertFalse(self.warmer.warm)
+        self.assertEqual(self.pool.clears, 1)
+        self.assertEqual(self.warmer.step(2), 2)
+        self.assertEqual(self.warmer.step(2), 4)
+
+        self.pool.up = True
+        self.assertEqual(self.warmer.step(2), 0)
+        self.assertTrue(self.warmer.warm)
+        self.assertEqual(self.warmer.step(2), 0)
+
+    def test_reset_warms_again(self):
+        """Test that a reset drops the pool and the next step opens new connections."""
+        self.warmer.step(2)
+        self.warmer.reset()
+        self.assertFalse(self.warmer.warm)
+        self.assertEqual(self.pool.clears, 1)
+        self.warmer.step(2)
+        self.assertTrue(self.warmer.warm)
+        self.assertEqual(self.pool.pings, 0)
+
+    def test_unreachable_server_is_retried_with_backoff(self):
+        """Test that connects failing on the network, which reset the warmer, back off."""
+        attempts = []
+
+        def connect():
+            attempts.append(time.monotonic())
+            try:
+                return clickhouse_connect.get_client(
+                    host="127.0.0.1", port=1, connect_timeout=1, send_receive_timeout=1
+                )
+            except Exception as e:
+                # As the server does on network errors
+                if isinstance(e.__cause__, HTTPError):
+                    warmer.reset()
+                raise
+
+        warmer = ConnectionWarmer(connect, self.pool.clear)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=warmer.run,
+            args=(lambda: (0, 3600) if stop.is_set() else (2, 3600),),
+            daemon=True,
+        )
+        with self.assertLogs("mcp-clickhouse", level="WARNING"):
+            thread.start()
+            time.sleep(2.5)
+            stop.set()
+            warmer.reset()
+        # Steps at 0s, 1s and then 3s: two of them in 2.5 seconds, two connects each
+        self.assertEqual(len(attempts), 4)
+        self.assertFalse(warmer.warm)
+
+    def test_disabled(self):
+        """Test that no request is sent when no connection should be kept."""
+        self.assertEqual(self.warmer.step(0), 0)
+        self.assertFalse(self.warmer.warm)
+        self.assertEqual(self.pool.connections, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
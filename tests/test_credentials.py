@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import unittest
+from unittest import mock
+
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from mcp_clickhouse import mcp_env
+from mcp_clickhouse.credentials import (
+    REQUEST_CREDENTIALS,
+    CredentialMiddleware,
+    CredentialPools,
+    Credentials,
+    credentials_from_headers,
+)
+from mcp_clickhouse.mcp_env import ClickHouseConfig
+
+
+class FakePool:
+    def __init__(self):
+        self.cleared = False
+
+    def clear(self):
+        self.cleared = True
+
+
+class TestCredentials(unittest.TestCase):
+    def test_credentials_from_headers(self):
+        """Test that ClickHouse headers take precedence over Basic authorization."""
+        basic = "Basic " + base64.b64encode(b"bob:p:w").decode()
+        self.assertEqual(
+            credentials_from_headers({"x-clickhouse-user": "alice", "authorization": basic}),
+            Credentials("alice", ""),
+        )
+        self.assertEqual(
+            credentials_from_headers({"authorization": basic}), Credentials("bob", "p:w")
+        )
+        self.assertIsNone(credentials_from_headers({"authorization": "Bearer token"}))
+        for value in ("Basic !!!", "Basic " + base64.b64encode(b"nopassword").decode()):
+            with self.assertRaises(ValueError):
+                credentials_from_headers({"authorization": value})
+
+    def test_key_hides_the_password(self):
+        """Test that credentials are told apart by a hash that does not reveal them."""
+        alice = Credentials("alice", "secret")
+        self.assertNotEqual(alice.key, Credentials("alice", "other").key)
+        self.assertNotIn("secret", alice.key + repr(alice))
+
+    def test_pools_are_bounded_and_expire(self):
+        """Test that the least recently used and idle pools are closed."""
+        pools = CredentialPools(FakePool)
+        a = pools.get("a", max_pools=2, idle_secs=60, now=0.0)
+        b = pools.get("b", max_pools=2, idle_secs=60, now=1.0)
+        self.assertIs(pools.get("a", max_pools=2, idle_secs=60, now=2.0), a)
+        pools.get("c", max_pools=2, idle_secs=60, now=3.0)
+        self.assertTrue(b.cleared)
+        self.assertFalse(a.cleared)
+
+        pools.get("c", max_pools=2, idle_secs=60, now=70.0)
+        self.assertTrue(a.cleared)
+        self.assertEqual(len(pools), 1)
+        pools.clear()
+        self.assertEqual(len(pools), 0)
+
+
+class TestCredentialMiddleware(unittest.TestCase):
+    def setUp(self):
+        self._saved = mcp_env._CONFIG_INSTANCE
+        mcp_env._CONFIG_INSTANCE = ClickHouseConfig(enabled=False, mcp_request_credentials=True)
+        self.mcp = FastMCP("credentials-test")
+
+        @self.mcp.tool
+        def whoami():
+            credentials = REQUEST_CREDENTIALS.get()
+            return credentials.username if credentials else None
+
+        self.mcp.add_middleware(CredentialMiddleware())
+
+    def tearDown(self):
+        mcp_env._CONFIG_INSTANCE = self._saved
+
+    def _call(self, headers: dict):
+        async def run():
+            async with Client(self.mcp) as client:
+                result = await client.call_tool("whoami", {})
+            return result[0].text
+
+        with mock.patch("mcp_clickhouse.credentials.get_http_headers", return_value=headers):
+            return asyncio.run(run())
+
+    def test_calls_run_as_the_request_user(self):
+        """Test that tool calls see the credentials of their request."""
+        self.assertEqual(self._call({"x-clickhouse-user": "alice"}), "alice")
+        self.assertIsNone(REQUEST_CREDENTIALS.get())
+
+    def test_calls_without_credentials_are_rejected(self):
+        """Test that no call falls back to the configured user."""
+        with self.assertRaises(ToolError):
+            self._call({})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import signal
+import socket
+import threading
+import unittest
+
+import httpx
+import uvicorn
+from fastmcp import Client, FastMCP
+from sse_starlette.sse import AppStatus
+
+from mcp_clickhouse.drain import IN_FLIGHT, DrainingServer
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestDrainingServer(unittest.TestCase):
+    def setUp(self):
+        self._automatic_drain = AppStatus.enable_automatic_graceful_drain
+        self.started = threading.Event()
+        self.finish = threading.Event()
+        mcp = FastMCP(name="drain-test")
+        mcp.add_middleware(IN_FLIGHT)
+
+        @mcp.tool()
+        async def slow() -> str:
+            self.started.set()
+            await asyncio.to_thread(self.finish.wait, 10)
+            return "done"
+
+        self.port = _free_port()
+        config = uvicorn.Config(
+            mcp.http_app(transport="http"),
+            host="127.0.0.1",
+            port=self.port,
+            lifespan="on",
+            timeout_graceful_shutdown=10,
+            log_level="warning",
+        )
+        self.server = DrainingServer(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            self.thread.join(0.05)
+
+    def tearDown(self):
+        self.finish.set()
+        self.server.should_exit = True
+        self.thread.join(10)
+        AppStatus.should_exit = False
+        AppStatus.enable_automatic_graceful_drain = self._automatic_drain
+
+    def test_drain_rejects_new_sessions_and_finishes_in_flight_calls(self):
+        """Test that shutdown stops new connections but lets a running tool call answer."""
+        url = f"http://127.0.0.1:{self.port}/mcp"
+
+        async def run():
+            async with Client(url) as client:
+                call = asyncio.create_task(client.call_tool("slow", {}))
+                await asyncio.to_thread(self.started.wait, 10)
+                self.server.handle_exit(signal.SIGTERM, None)
+                # The listening socket closes while the call is still in flight
+                for _ in range(100):
+                    try:
+                        async with httpx.AsyncClient() as http:
+                            await http.post(url, json={})
+                    except httpx.ConnectError:
+                        break
+                    await asyncio.sleep(0.05)
+                else:
+                    self.fail("new connections were still accepted while draining")
+                # Longer than sse_starlette takes to notice a shutdown and close streams
+                await asyncio.sleep(1.5)
+                self.assertEqual(IN_FLIGHT.count, 1)
+                self.finish.set()
+                return await call
+
+        result = asyncio.run(run())
+        self.assertEqual(result[0].text, "done")
+        self.thread.join(10)
+        self.assertFalse(self.thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
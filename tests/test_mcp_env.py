@@ -0,0 +1,173 @@
+import dataclasses
+import os
+import unittest
+from unittest import mock
+
+from mcp_clickhouse import mcp_env
+from mcp_clickhouse.mcp_env import ChDBConfig, ClickHouseConfig, reload_config
+
+BASE_ENV = {
+    "CLICKHOUSE_HOST": "localhost",
+    "CLICKHOUSE_USER": "default",
+    "CLICKHOUSE_PASSWORD": "secret",
+}
+
+
+class TestClickHouseConfig(unittest.TestCase):
+    def test_defaults(self):
+        """Test that defaults are applied when only required variables are set."""
+        config = ClickHouseConfig.from_env(BASE_ENV)
+        self.assertEqual(config.host, "localhost")
+        self.assertEqual(config.port, 8443)
+        self.assertTrue(config.secure)
+        self.assertEqual(config.connect_timeout, 30)
+        self.assertEqual(config.send_receive_timeout, 300)
+        self.assertIsNone(config.database)
+        self.assertIsNone(config.schema_cache_dir)
+        self.assertEqual(config.mcp_server_transport, "stdio")
+
+    def test_port_follows_secure(self):
+        """Test that the default port depends on CLICKHOUSE_SECURE."""
+        config = ClickHouseConfig.from_env({**BASE_ENV, "CLICKHOUSE_SECURE": "false"})
+        self.assertEqual(config.port, 8123)
+
+    def test_snapshot_is_frozen(self):
+        """Test that a configuration snapshot cannot be mutated."""
+        config = ClickHouseConfig.from_env(BASE_ENV)
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            config.host = "elsewhere"
+
+    def test_client_config_is_a_copy(self):
+        """Test that callers cannot mutate the snapshot through get_client_config()."""
+        config = ClickHouseConfig.from_env({**BASE_ENV, "CLICKHOUSE_DATABASE": "db"})
+        client_config = config.get_client_config()
+        self.assertEqual(client_config["database"], "db")
+        client_config["host"] = "elsewhere"
+        self.assertEqual(config.get_client_config()["host"], "localhost")
+
+    def test_password_hidden_from_repr(self):
+        """Test that the password does not leak through repr()."""
+        config = ClickHouseConfig.from_env(BASE_ENV)
+        self.assertNotIn("secret", repr(config))
+
+    def test_missing_required_vars(self):
+        """Test that missing required variables are reported together."""
+        with self.assertRaises(ValueError) as context:
+            ClickHouseConfig.from_env({"CLICKHOUSE_HOST": "localhost"})
+        self.assertIn("CLICKHOUSE_USER", str(context.exception))
+        self.assertIn("CLICKHOUSE_PASSWORD", str(context.exception))
+
+    def test_disabled_skips_validation(self):
+        """Test that required variables are not needed when ClickHouse is disabled."""
+        config = ClickHouseConfig.from_env({"CLICKHOUSE_ENABLED": "false"})
+        self.assertFalse(config.enabled)
+
+    def test_invalid_values(self):
+        """Test that invalid transport and integer values fail at parse time."""
+        with self.assertRaises(ValueError):
+            ClickHouseConfig.from_env({**BASE_ENV, "CLICKHOUSE_MCP_SERVER_TRANSPORT": "tcp"})
+        with self.assertRaises(ValueError):
+            ClickHouseConfig.from_env({**BASE_ENV, "CLICKHOUSE_CONNECT_TIMEOUT": "soon"})
+        with self.assertRaises(ValueError):
+            ClickHouseConfig.from_env({**BASE_ENV, "CLICKHOUSE_POOL_WARM_CONNECTIONS": "9"})
+        with self.assertRaises(ValueError):
+            ClickHouseConfig.from_env({**BASE_ENV, "CLICKHOUSE_CIRCUIT_FAILURE_PERCENT": "0"})
+
+    def test_workers_require_http_transport(self):
+        """Test that several workers are only accepted with the streamable HTTP transport."""
+        env = {**BASE_ENV, "CLICKHOUSE_MCP_WORKERS": "4"}
+        with self.assertRaises(ValueError):
+            ClickHouseConfig.from_env({**env, "CLICKHOUSE_MCP_SERVER_TRANSPORT": "sse"})
+        with self.assertRaises(ValueError):
+            ClickHouseConfig.from_env({**BASE_ENV, "CLICKHOUSE_MCP_WORKERS": "0"})
+        config = ClickHouseConfig.from_env({**env, "CLICKHOUSE_MCP_SERVER_TRANSPORT": "http"})
+        self.assertEqual(config.mcp_workers, 4)
+
+    def test_request_credentials_require_http(self):
+        """Test that request credentials are refused where requests carry no headers."""
+        env = {**BASE_ENV, "CLICKHOUSE_MCP_REQUEST_CREDENTIALS": "true"}
+        with self.assertRaises(ValueError):
+            ClickHouseConfig.from_env(env)
+        config = ClickHouseConfig.from_env({**env, "CLICKHOUSE_MCP_SERVER_TRANSPORT": "sse"})
+        self.assertTrue(config.mcp_request_credentials)
+        self.assertEqual(config.mcp_credential_pools, 64)
+
+    def test_chdb_config(self):
+        """Test chDB configuration parsing."""
+        config = ChDBConfig.from_env({"CHDB_ENABLED": "true", "CHDB_DATA_PATH": "/tmp/chdb"})
+        self.assertTrue(config.enabled)
+        self.assertEqual(config.get_client_config(), {"data_path": "/tmp/chdb"})
+
+
+class TestConfigReload(unittest.TestCase):
+    def setUp(self):
+        self._saved = (mcp_env._CONFIG_INSTANCE, mcp_env._CHDB_CONFIG_INSTANCE)
+        self._saved_callbacks = list(mcp_env._RELOAD_CALLBACKS)
+
+    def tearDown(self):
+        mcp_env._CONFIG_INSTANCE, mcp_env._CHDB_CONFIG_INSTANCE = self._saved
+        mcp_env._RELOAD_CALLBACKS[:] = self._saved_callbacks
+
+    def test_reload_swaps_snapshot_and_notifies(self):
+        """Test that reload_config() swaps the snapshot and runs reload callbacks."""
+        seen = []
+        mcp_env.on_config_reload(lambda old, new: seen.append((old, new)))
+
+        with mock.patch.dict(os.environ, {**BASE_ENV, "CLICKHOUSE_HOST": "first"}):
+            mcp_env._CONFIG_INSTANCE = None
+            first = mcp_env.get_config()
+        with mock.patch.dict(os.environ, {**BASE_ENV, "CLICKHOUSE_HOST": "second"}):
+            second = reload_config()
+
+        self.assertEqual(first.host, "first")
+        self.assertEqual(second.host, "second")
+        self.assertIs(mcp_env.get_config(), second)
+        self.assertEqual(seen[-1], (first, second))
+
+    def test_failing_callback_does_not_stop_the_others(self):
+        """Test that a reload callback that raises is logged and the next one still runs."""
+        seen = []
+
+        def failing(old, new):
+            raise RuntimeError("boom")
+
+        mcp_env.on_config_reload(failing)
+        mcp_env.on_config_reload(lambda old, new: seen.append(new))
+        with mock.patch.dict(os.environ, BASE_ENV):
+            with self.assertLogs("mcp-clickhouse", level="ERROR") as logs:
+                new = reload_config()
+        self.assertEqual(seen, [new])
+        self.assertIn("boom", logs.output[0])
+
+    def test_import_leaves_sighup_alone(self):
+        """Test that importing the server does not replace the SIGHUP handler."""
+        import signal
+        import subprocess
+        import sys
+
+        if not hasattr(signal, "SIGHUP"):
+            self.skipTest("no SIGHUP on this platform")
+        code = (
+            "import signal\n"
+            "def handler(signum, frame): pass\n"
+            "signal.signal(signal.SIGHUP, handler)\n"
+            "import mcp_clickhouse.mcp_server\n"
+            "assert signal.getsignal(signal.SIGHUP) is handler\n"
+        )
+        env = {**os.environ, **BASE_ENV, "CHDB_ENABLED": "false"}
+        result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True)
+        self.assertEqual(result.returncode, 0, result.stderr.decode())
+
+    def test_invalid_reload_keeps_current_snapshot(self):
+        """Test that a failed reload leaves the active configuration untouched."""
+        with mock.patch.dict(os.environ, BASE_ENV):
+            mcp_env._CONFIG_INSTANCE = None
+            current = mcp_env.get_config()
+        with mock.patch.dict(os.environ, {**BASE_ENV, "CLICKHOUSE_PORT": "not-a-port"}):
+            with self.assertRaises(ValueError):
+                reload_config()
+        self.assertIs(mcp_env.get_config(), current)
+
+
+if __name__ == "__main__":
+    unittest.main()
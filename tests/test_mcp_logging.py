@@ -0,0 +1,88 @@
+import logging
+import unittest
+
+from mcp_clickhouse import mcp_env
+from mcp_clickhouse.mcp_env import LoggingConfig
+from mcp_clickhouse.mcp_logging import JsonFormatter, LogEvent, QueryText, log_event
+from mcp_clickhouse.sql_fingerprint import normalize_query, query_fingerprint
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestSqlFingerprint(unittest.TestCase):
+    def test_literals_are_stripped(self):
+        """Test that queries differing only in literals share a fingerprint."""
+        first = "SELECT * FROM t WHERE id = 1 AND name = 'Alice' -- first"
+        second = "select *\n  from t where id = 42 and name = 'Bob'"
+        self.assertEqual(normalize_query(first), "select * from t where id = ? and name = ?")
+        self.assertEqual(query_fingerprint(first), query_fingerprint(second))
+
+    def test_literal_lists_are_collapsed(self):
+        """Test that IN lists of any length normalize the same way."""
+        self.assertEqual(
+            query_fingerprint("SELECT 1 FROM t WHERE x IN (1, 2, 3)"),
+            query_fingerprint("SELECT 1 FROM t WHERE x IN (7, 8)"),
+        )
+
+    def test_identifiers_are_kept(self):
+        """Test that quoted identifiers and names containing digits are not literals."""
+        normalized = normalize_query('SELECT "Col 1", `x` FROM t1')
+        self.assertEqual(normalized, 'select "Col 1", `x` from t1')
+
+    def test_keep_literals(self):
+        """Test that literal-preserving normalization only touches whitespace and comments."""
+        query = "SELECT  'a  b' /* note */ FROM T"
+        self.assertEqual(normalize_query(query, strip_literals=False), "SELECT 'a  b' FROM T")
+
+
+class TestStructuredLogging(unittest.TestCase):
+    def setUp(self):
+        self._saved = mcp_env._LOGGING_CONFIG_INSTANCE
+        self.handler = _ListHandler()
+        self.logger = logging.getLogger("test_mcp_logging")
+        self.logger.handlers = [self.handler]
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        mcp_env._LOGGING_CONFIG_INSTANCE = self._saved
+
+    def test_query_text_is_truncated(self):
+        """Test that long queries are truncated when rendered."""
+        text = str(QueryText("SELECT " + "x, " * 100 + "1", max_chars=20))
+        self.assertTrue(text.startswith("SELECT x, x, x, x, x"))
+        self.assertIn("... (", text)
+
+    def test_event_rendering(self):
+        """Test logfmt and JSON rendering of an event with query text."""
+        mcp_env._LOGGING_CONFIG_INSTANCE = LoggingConfig()
+        log_event(self.logger, logging.INFO, "query.start", query=QueryText("SELECT 1"), rows=3)
+        record = self.handler.records[0]
+        self.assertIsInstance(record.msg, LogEvent)
+        message = record.getMessage()
+        self.assertTrue(message.startswith('query.start query="SELECT 1" fingerprint='))
+        self.assertIn("rows=3", message)
+        self.assertIn('"event": "query.start"', JsonFormatter().format(record))
+
+    def test_sampling_and_level(self):
+        """Test that sampled-out and disabled events are never emitted."""
+        mcp_env._LOGGING_CONFIG_INSTANCE = LoggingConfig(sample_rates={"query.start": 0.0})
+        log_event(self.logger, logging.INFO, "query.start", query=QueryText("SELECT 1"))
+        log_event(self.logger, logging.DEBUG, "query.done", rows=1)
+        self.assertEqual(self.handler.records, [])
+
+    def test_invalid_sample_rates(self):
+        """Test that malformed sample rates are rejected."""
+        with self.assertRaises(ValueError):
+            LoggingConfig.from_env({"CLICKHOUSE_LOG_SAMPLE_RATES": "query.start=2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
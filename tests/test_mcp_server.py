@@ -6,6 +6,7 @@ import asyncio
 from mcp_clickhouse.mcp_server import mcp, create_clickhouse_client
 from dotenv import load_dotenv
 import json
+import uuid
 
 # Load environment variables
 load_dotenv()
@@ -182,6 +183,89 @@ async def test_list_tables_with_not_like_filter(mcp_server, setup_test_database)
         assert tables[0]["name"] == test_table2
 
 
+@pytest.mark.asyncio
+async def test_list_tables_field_projection(mcp_server, setup_test_database):
+    """Test the list_tables tool with fields and include_columns."""
+    test_db, _, _ = setup_test_database
+
+    async with Client(mcp_server) as client:
+        result = await client.call_tool(
+            "list_tables",
+            {"database": test_db, "fields": ["comment"], "include_columns": False},
+        )
+        tables = json.loads(result[0].text)
+
+        assert len(tables) == 2
+        for table in tables:
+            assert set(table) == {"database", "name", "comment"}
+
+
+@pytest.mark.asyncio
+async def test_list_tables_pagination(mcp_server, setup_test_database):
+    """Test paging through list_tables with limit and page_token."""
+    test_db, test_table, test_table2 = setup_test_database
+
+    async with Client(mcp_server) as client:
+        result = await client.call_tool("list_tables", {"database": test_db, "limit": 1})
+        first_page = json.loads(result[0].text)
+        assert len(first_page["tables"]) == 1
+        assert first_page["next_page_token"]
+
+        result = await client.call_tool(
+            "list_tables",
+            {"database": test_db, "limit": 1, "page_token": first_page["next_page_token"]},
+        )
+        second_page = json.loads(result[0].text)
+        assert len(second_page["tables"]) == 1
+        assert second_page["next_page_token"] is None
+
+        names = [first_page["tables"][0]["name"], second_page["tables"][0]["name"]]
+        assert names == sorted([test_table, test_table2])
+
+
+@pytest.mark.asyncio
+async def test_list_tables_unknown_field(mcp_server, setup_test_database):
+    """Test that list_tables rejects unknown fields."""
+    test_db, _, _ = setup_test_database
+
+    async with Client(mcp_server) as client:
+        with pytest.raises(ToolError) as exc_info:
+            await client.call_tool("list_tables", {"database": test_db, "fields": ["bogus"]})
+
+        assert "Unknown table fields" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_run_select_query_truncates_long_values(mcp_server):
+    """Test that long values are truncated and reported in the budget summary."""
+    async with Client(mcp_server) as client:
+        result = await client.call_tool(
+            "run_select_query", {"query": "SELECT number, repeat('x', 5000) AS s FROM numbers(2)"}
+        )
+        query_result = json.loads(result[0].text)
+
+        assert query_result["columns"] == ["number", "s"]
+        assert query_result["rows"][0][1].endswith("...[truncated, 5000 chars]")
+        assert query_result["budget"]["truncated_cells"] == 2
+        assert query_result["budget"]["truncated_columns"] == ["s"]
+        assert query_result["budget"]["rows_truncated"] is False
+
+
+@pytest.mark.asyncio
+async def test_run_select_query_fixed_string(mcp_server):
+    """Test that FixedString columns are returned, although leftUTF8 rejects them."""
+    async with Client(mcp_server) as client:
+        result = await client.call_tool(
+            "run_select_query",
+            {"query": "SELECT toFixedString('abc', 3) AS code, 'x' AS s FROM numbers(2)"},
+        )
+        query_result = json.loads(result[0].text)
+
+        assert query_result["columns"] == ["code", "s"]
+        assert len(query_result["rows"]) == 2
+        assert query_result["rows"][0][1] == "x"
+
+
 @pytest.mark.asyncio
 async def test_run_select_query_success(mcp_server, setup_test_database):
     """Test running a successful SELECT query."""
@@ -249,6 +333,150 @@ async def test_run_select_query_with_join(mcp_server, setup_test_database):
         assert query_result["rows"][0][0] == 3  # login, logout, purchase
 
 
+@pytest.mark.asyncio
+async def test_run_select_query_with_parameters(mcp_server, setup_test_database):
+    """Test that parameters are bound by the server into {name:Type} placeholders."""
+    test_db, test_table, _ = setup_test_database
+
+    async with Client(mcp_server) as client:
+        query = f"SELECT name FROM {test_db}.{test_table} WHERE id = {{id:UInt32}}"
+        names = []
+        for row_id in (1, 2):
+            result = await client.call_tool(
+                "run_select_query", {"query": query, "parameters": {"id": row_id}}
+            )
+            names.append(json.loads(result[0].text)["rows"][0][0])
+        assert names == ["Alice", "Bob"]
+
+        with pytest.raises(ToolError) as exc_info:
+            await client.call_tool("run_select_query", {"query": query, "parameters": {}})
+        with pytest.raises(ToolError) as exc_info:
+            await client.call_tool(
+                "run_select_query", {"query": query, "parameters": {"id": 1, "name": "x"}}
+            )
+        assert "placeholder" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_run_select_query_with_query_cache(mcp_server, setup_test_database):
+    """Test that the response reports whether the server's query cache is used."""
+    test_db, test_table, _ = setup_test_database
+
+    async with Client(mcp_server) as client:
+        # A literal unique to this run keeps results cached by earlier runs out
+        query = (
+            f"SELECT count(), sum(age) FROM {test_db}.{test_table} "
+            f"WHERE name != '{uuid.uuid4().hex}'"
+        )
+        reports = []
+        for _ in range(2):
+            result = await client.call_tool(
+                "run_select_query", {"query": query, "use_query_cache": True}
+            )
+            reports.append(json.loads(result[0].text)["query_cache"])
+        assert reports == [{"used": True}, {"used": True}]
+
+        result = await client.call_tool(
+            "run_select_query", {"query": "SELECT now()", "use_query_cache": True}
+        )
+        assert json.loads(result[0].text)["query_cache"]["used"] is False
+
+
+@pytest.mark.asyncio
+async def test_column_values(mcp_server, setup_test_database):
+    """Test counting the values of a column, and the cached second lookup."""
+    test_db, _, test_table2 = setup_test_database
+
+    async with Client(mcp_server) as client:
+        args = {"database": test_db, "table": test_table2, "column": "event_type"}
+        result = await client.call_tool("column_values", args)
+        values = json.loads(result[0].text)
+        assert values["rows"] == 3
+        assert values["approx_distinct"] == 2
+        assert values["sampled"] is False
+        assert values["top_values"] == [
+            {"value": "login", "count": 2},
+            {"value": "logout", "count": 1},
+        ]
+
+        result = await client.call_tool("column_values", args)
+        assert json.loads(result[0].text) == values
+
+        with pytest.raises(ToolError):
+            await client.call_tool("column_values", {**args, "column": "missing"})
+
+
+@pytest.mark.asyncio
+async def test_summarize_query(mcp_server, setup_test_database):
+    """Test summarizing a result instead of returning its rows."""
+    test_db, _, test_table2 = setup_test_database
+
+    async with Client(mcp_server) as client:
+        result = await client.call_tool(
+            "summarize_query",
+            {"query": f"SELECT event_id, event_type, timestamp FROM {test_db}.{test_table2}"},
+        )
+        summary = json.loads(result[0].text)
+        assert summary["rows"] == 3
+        event_id, event_type, timestamp = summary["columns"]
+        assert (event_id["min"], event_id["max"], event_id["mean"]) == (1001, 1003, 1002.0)
+        assert event_type["top_values"][0] == {"value": "login", "count": 2}
+        assert event_type["distinct"] == 2
+        assert timestamp["min"] == "2024-01-01T10:00:00"
+
+        with pytest.raises(ToolError):
+            await client.call_tool("summarize_query", {"query": "SELECT 1", "top_k": 0})
+
+
+@pytest.mark.asyncio
+async def test_query_stats(mcp_server, setup_test_database):
+    """Test that queries differing only in literals are reported as one shape."""
+    test_db, test_table, _ = setup_test_database
+
+    async with Client(mcp_server) as client:
+        for user_id in (1, 2):
+            await client.call_tool(
+                "run_select_query",
+                {"query": f"SELECT * FROM {test_db}.{test_table} WHERE id = {user_id}"},
+            )
+        result = await client.call_tool("query_stats", {"sort_by": "calls", "limit": 100})
+        stats = json.loads(result[0].text)
+        shape = f"select * from {test_db}.{test_table} where id = ?".lower()
+        entry = next(q for q in stats["queries"] if q["query"] == shape)
+        assert entry["calls"] >= 2
+        assert entry["max_ms"] > 0 and entry["p50_ms"] > 0
+
+        with pytest.raises(ToolError):
+            await client.call_tool("query_stats", {"sort_by": "cost"})
+
+
+@pytest.mark.asyncio
+async def test_query_job_lifecycle(mcp_server, setup_test_database):
+    """Test submitting a query job, waiting for it and paging through its rows."""
+    test_db, test_table, _ = setup_test_database
+
+    async with Client(mcp_server) as client:
+        result = await client.call_tool(
+            "submit_query", {"query": f"SELECT id, name FROM {test_db}.{test_table} ORDER BY id"}
+        )
+        job_id = json.loads(result[0].text)["job_id"]
+        for _ in range(50):
+            result = await client.call_tool("query_status", {"job_id": job_id})
+            status = json.loads(result[0].text)
+            if status["state"] not in ("queued", "running"):
+                break
+            await asyncio.sleep(0.1)
+        assert status["state"] == "done"
+
+        result = await client.call_tool(
+            "fetch_query_result", {"job_id": job_id, "offset": 1, "limit": 1}
+        )
+        page = json.loads(result[0].text)
+        assert page["columns"] == ["id", "name"]
+        assert page["rows"] == [[2, "Bob"]]
+        assert page["next_offset"] == 2
+
+
 @pytest.mark.asyncio
 async def test_run_select_query_error(mcp_server, setup_test_database):
     """Test running a SELECT query that results in an error."""
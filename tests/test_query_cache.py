@@ -0,0 +1,71 @@
+import unittest
+
+from mcp_clickhouse.mcp_env import ClickHouseConfig
+from mcp_clickhouse.query_cache import is_cacheable, query_cache_settings
+
+
+class FakeClient:
+    def __init__(self, server_version: str):
+        self.server_version = server_version
+
+    def min_version(self, version: str) -> bool:
+        def parts(text):
+            return [int(part) for part in text.split(".")]
+
+        return parts(self.server_version) >= parts(version)
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.config = ClickHouseConfig(
+            enabled=False,
+            query_cache=True,
+            query_cache_ttl_secs=300,
+            query_cache_min_duration_ms=500,
+        )
+        self.client = FakeClient("24.8.1")
+
+    def test_deterministic_queries_are_cacheable(self):
+        """Test that only queries depending on the data alone are cached."""
+        self.assertTrue(is_cacheable("SELECT count() FROM events WHERE ts > '2024-01-01'"))
+        self.assertTrue(is_cacheable("SELECT 'now()' AS s, random_id FROM t -- rand()"))
+        self.assertFalse(is_cacheable("SELECT count() FROM events WHERE ts > now() - 3600"))
+        self.assertFalse(is_cacheable("SELECT RAND() % 10"))
+        self.assertFalse(is_cacheable("SELECT name FROM system.tables"))
+        self.assertFalse(is_cacheable('SELECT name FROM "system"."tables"'))
+
+    def test_policy_settings(self):
+        """Test that eligible queries get the configured TTL and minimum duration."""
+        settings, report = query_cache_settings(self.config, self.client, "SELECT 1")
+        self.assertEqual(
+            settings,
+            {
+                "use_query_cache": 1,
+                "query_cache_ttl": 300,
+                "query_cache_min_query_duration": 500,
+            },
+        )
+        self.assertEqual(report, {"used": True})
+
+    def test_per_call_override(self):
+        """Test that callers can turn the cache on or off whatever the policy."""
+        settings, report = query_cache_settings(self.config, self.client, "SELECT 1", False)
+        self.assertEqual(settings, {})
+        self.assertFalse(report["used"])
+
+        config = ClickHouseConfig(enabled=False)
+        self.assertEqual(query_cache_settings(config, self.client, "SELECT 1"), ({}, None))
+        settings, report = query_cache_settings(config, self.client, "SELECT 1", True)
+        self.assertEqual(settings["use_query_cache"], 1)
+
+    def test_old_servers_and_ineligible_queries_are_reported(self):
+        """Test that the response says why the cache was not used."""
+        _, report = query_cache_settings(self.config, FakeClient("23.3.1"), "SELECT 1")
+        self.assertEqual(report, {"used": False, "reason": "requires ClickHouse 23.5 or later"})
+        settings, report = query_cache_settings(self.config, self.client, "SELECT today()")
+        self.assertEqual(settings, {})
+        self.assertIn("non-deterministic", report["reason"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import datetime
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastmcp.exceptions import ToolError
+
+from mcp_clickhouse import mcp_env
+from mcp_clickhouse.mcp_env import ClickHouseConfig
+from mcp_clickhouse.query_jobs import (
+    CANCELLED,
+    DONE,
+    FAILED,
+    PAGE_INDEX_ROWS,
+    JobLimitExceeded,
+    QueryJob,
+    QueryJobRegistry,
+)
+
+
+class TestQueryJobs(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _job(self, job_id: str) -> QueryJob:
+        return QueryJob(job_id, "SELECT 1", f"q-{job_id}", os.path.join(self.dir.name, job_id))
+
+    def test_spilled_rows_are_paged(self):
+        """Test that pages read back the spilled rows from any offset."""
+        job = self._job("a")
+        rows = [(i, f"row-{i}", datetime.date(2024, 1, 1)) for i in range(2 * PAGE_INDEX_ROWS + 5)]
+        with job.open_spill() as out:
+            self.assertTrue(job.write_rows(out, rows, max_bytes=0))
+        self.assertEqual(os.stat(job.path).st_mode & 0o777, 0o600)
+        self.assertEqual(job.rows, len(rows))
+        self.assertEqual(
+            job.read_rows(0, 2), [[0, "row-0", "2024-01-01"], [1, "row-1", "2024-01-01"]]
+        )
+        page = job.read_rows(PAGE_INDEX_ROWS + 3, 1000)
+        self.assertEqual(page[0][0], PAGE_INDEX_ROWS + 3)
+        self.assertEqual(len(page), 1000)
+        self.assertEqual(
+            job.read_rows(len(rows) - 1, 10),
+            [[len(rows) - 1, f"row-{len(rows) - 1}", "2024-01-01"]],
+        )
+        self.assertEqual(job.read_rows(len(rows), 10), [])
+
+    def test_spill_stops_at_max_bytes(self):
+        """Test that rows beyond the size limit are dropped and reported."""
+        job = self._job("a")
+        with open(job.path, "wb") as out:
+            self.assertFalse(job.write_rows(out, [(i,) for i in range(100)], max_bytes=20))
+        self.assertTrue(job.result_truncated)
+        self.assertLessEqual(job.bytes, 20)
+        self.assertEqual(job.read_rows(0, 100), [[i] for i in range(job.rows)])
+
+    def test_lifecycle_and_cancellation(self):
+        """Test that cancelling reports whether the query must be killed."""
+        registry = QueryJobRegistry()
+        queued, running = self._job("queued"), self._job("running")
+        registry.add(queued, max_jobs=10)
+        registry.add(running, max_jobs=10)
+        self.assertTrue(registry.start(running))
+
+        self.assertFalse(registry.cancel(queued))
+        self.assertEqual(queued.state, CANCELLED)
+        self.assertFalse(registry.start(queued))
+        self.assertTrue(registry.cancel(running))
+        registry.finish(running, error="Query was cancelled")
+        self.assertEqual(running.state, CANCELLED)
+
+        failed = self._job("failed")
+        registry.add(failed, max_jobs=10)
+        registry.start(failed)
+        registry.finish(failed, error="boom")
+        self.assertEqual((failed.state, failed.error), (FAILED, "boom"))
+
+    def test_registry_is_bounded(self):
+        """Test that the oldest finished job makes room and running jobs never do."""
+        registry = QueryJobRegistry()
+        first, second = self._job("first"), self._job("second")
+        for job in (first, second):
+            registry.add(job, max_jobs=2)
+            registry.start(job)
+        with self.assertRaises(JobLimitExceeded):
+            registry.add(self._job("third"), max_jobs=2)
+
+        registry.finish(first)
+        open(first.path, "wb").close()
+        registry.add(self._job("third"), max_jobs=2)
+        self.assertIsNone(registry.get("first"))
+        self.assertFalse(os.path.exists(first.path))
+
+    def test_finished_jobs_expire(self):
+        """Test that jobs and their files are dropped a TTL after they finish."""
+        registry = QueryJobRegistry()
+        job = self._job("a")
+        registry.add(job, max_jobs=10)
+        registry.start(job)
+        self.assertEqual(registry.expire(60, now=job.started_at + 3600), [])
+        registry.finish(job)
+        self.assertEqual(job.state, DONE)
+        self.assertEqual(registry.expire(60, now=job.finished_at + 30), [])
+        self.assertEqual(registry.expire(60, now=job.finished_at + 61), [job])
+        self.assertEqual(len(registry), 0)
+
+
+class TestFetchQueryResult(unittest.TestCase):
+    def setUp(self):
+        saved = mcp_env._CONFIG_INSTANCE
+        mcp_env._CONFIG_INSTANCE = ClickHouseConfig(enabled=False)
+        self.addCleanup(setattr, mcp_env, "_CONFIG_INSTANCE", saved)
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def test_spill_deleted_during_fetch(self):
+        """Test that a spill file removed by expiry is reported as an expired job."""
+        from mcp_clickhouse import mcp_server
+
+        registry = QueryJobRegistry()
+        job = QueryJob("a", "SELECT 1", "q-a", os.path.join(self.dir.name, "a"))
+        registry.add(job, max_jobs=10)
+        registry.start(job)
+        with job.open_spill() as out:
+            job.write_rows(out, [(1,), (2,)], max_bytes=0)
+        registry.finish(job)
+        with mock.patch.object(mcp_server, "QUERY_JOBS", registry):
+            self.assertEqual(mcp_server.fetch_query_result("a")["rows"], [[1], [2]])
+            os.unlink(job.path)
+            with self.assertRaisesRegex(ToolError, "expired"):
+                mcp_server.fetch_query_result("a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from unittest import mock
+
+from clickhouse_connect.driver.exceptions import ProgrammingError
+from clickhouse_connect.driver.httpclient import HttpClient
+from clickhouse_connect.driver.models import SettingDef
+
+from mcp_clickhouse.mcp_env import ClickHouseConfig
+from mcp_clickhouse.query_limits import (
+    locked_limits,
+    server_limits,
+    settable_limits,
+    tighten_limits,
+)
+
+PROFILE = {"max_execution_time": 30, "max_rows_to_read": 1000, "timeout_overflow_mode": "break"}
+
+
+class TestQueryLimits(unittest.TestCase):
+    def test_profile_from_config(self):
+        """Test that limits set to 0 are left to the server's defaults."""
+        config = ClickHouseConfig(enabled=False, query_max_memory_usage=1 << 30)
+        self.assertEqual(
+            config.get_query_limits(),
+            {
+                "max_execution_time": 30,
+                "max_memory_usage": 1 << 30,
+                "timeout_overflow_mode": "throw",
+            },
+        )
+
+    def test_requested_limits_tighten_the_profile(self):
+        """Test that callers can lower limits and add ones the profile leaves unset."""
+        limits = tighten_limits(
+            PROFILE,
+            {"max_rows_to_read": 10, "max_threads": 2, "timeout_overflow_mode": "throw"},
+            server_defaults={"max_threads": 8},
+        )
+        self.assertEqual(
+            limits,
+            {
+                "max_execution_time": 30,
+                "max_rows_to_read": 10,
+                "max_threads": 2,
+                "timeout_overflow_mode": "throw",
+            },
+        )
+        self.assertEqual(tighten_limits(PROFILE, None), PROFILE)
+
+    def test_requested_limits_cannot_loosen_the_profile(self):
+        """Test that looser, unknown and invalid limits are rejected."""
+        strict = {**PROFILE, "timeout_overflow_mode": "throw"}
+        for requested in (
+            {"max_execution_time": 60},
+            {"max_rows_to_read": 0},
+            {"max_threads": "4"},
+            {"readonly": 0},
+            {"timeout_overflow_mode": "ignore"},
+        ):
+            with self.subTest(requested=requested), self.assertRaises(ValueError):
+                tighten_limits(PROFILE, requested)
+        with self.assertRaises(ValueError):
+            tighten_limits(strict, {"timeout_overflow_mode": "break"})
+
+    def test_unset_limits_are_capped_by_the_server_defaults(self):
+        """Test that limits the profile leaves unset cannot exceed the user's defaults."""
+        defaults = {"max_threads": 8, "max_memory_usage": 0}
+        with self.assertRaises(ValueError):
+            tighten_limits(PROFILE, {"max_threads": 16}, defaults)
+        # 0 is unlimited on the server, so any value tightens it
+        limits = tighten_limits(PROFILE, {"max_memory_usage": 1 << 40}, defaults)
+        self.assertEqual(limits["max_memory_usage"], 1 << 40)
+        # Without a known default the limit could be looser than the server's
+        for unknown in (None, {}):
+            with self.subTest(defaults=unknown), self.assertRaises(ValueError):
+                tighten_limits(PROFILE, {"max_bytes_to_read": 10}, unknown)
+
+    def test_readonly_user_is_sent_no_limits(self):
+        """Test that a readonly=1 user's queries carry no limits clickhouse_connect refuses."""
+        server_settings = {
+            name: SettingDef(name, value, 1)
+            for name, value in (
+                ("readonly", "1"),
+                ("max_execution_time", "0"),
+                ("max_memory_usage", "10000000000"),
+                ("max_rows_to_read", "0"),
+                ("max_bytes_to_read", "0"),
+                ("max_threads", "'auto(4)'"),
+                ("timeout_overflow_mode", "throw"),
+            )
+        }
+        # The settings check clickhouse_connect runs before sending a query
+        client = HttpClient.__new__(HttpClient)
+        client.server_settings = server_settings
+        client.params = {}
+        profile = ClickHouseConfig(enabled=False).get_query_limits()
+        with self.assertRaises(ProgrammingError):
+            client._validate_settings({**profile, "readonly": "1"})
+
+        self.assertEqual(settable_limits(profile, server_settings), {})
+        settings = {**settable_limits(profile, server_settings), "readonly": "1"}
+        self.assertEqual(client._validate_settings(settings), {})
+
+        locked = locked_limits(server_settings)
+        with self.assertRaises(ValueError):
+            tighten_limits(
+                profile, {"max_rows_to_read": 10}, server_limits(server_settings), locked
+            )
+        self.assertEqual(tighten_limits(profile, None, locked=locked), profile)
+
+    def test_settable_limits(self):
+        """Test that only limits the server knows and lets the user change are kept."""
+        server_settings = {
+            "max_execution_time": SettingDef("max_execution_time", "0", 0),
+            "max_threads": SettingDef("max_threads", "'auto(4)'", 1),
+        }
+        self.assertEqual(settable_limits(PROFILE, server_settings), {"max_execution_time": 30})
+
+    def test_server_limits(self):
+        """Test that server settings are read as integers, auto(N) included."""
+        setting = mock.Mock(value="10000000000")
+        self.assertEqual(
+            server_limits(
+                {"max_memory_usage": setting, "max_threads": "'auto(8)'", "max_rows_to_read": "0"}
+            ),
+            {"max_memory_usage": 10000000000, "max_threads": 8, "max_rows_to_read": 0},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
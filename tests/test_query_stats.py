@@ -0,0 +1,140 @@
+import random
+import unittest
+
+from mcp_clickhouse.metrics import MetricFamily, merge_worker_metrics, render
+from mcp_clickhouse.query_stats import (
+    RELATIVE_ACCURACY,
+    LatencySketch,
+    QueryStats,
+    summary_counts,
+)
+
+
+class TestLatencySketch(unittest.TestCase):
+    def test_quantiles_within_relative_accuracy(self):
+        """Test that quantiles are within the sketch's relative error of the exact ones."""
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(-3, 1.5) for _ in range(20000))
+        sketch = LatencySketch()
+        for value in values:
+            sketch.add(value)
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q) / exact, 1, delta=RELATIVE_ACCURACY * 1.01)
+        self.assertIsNone(LatencySketch().quantile(0.5))
+
+
+class TestQueryStats(unittest.TestCase):
+    def test_queries_are_grouped_by_fingerprint(self):
+        """Test that queries differing in literals share one entry with its aggregates."""
+        stats = QueryStats()
+        stats.record("SELECT * FROM t WHERE id = 1", 0.5, 10, rows=1, read_rows=100)
+        stats.record("select *  from t where id = 2", 1.5, 10, failed=True)
+        stats.record("SELECT count() FROM u", 0.1, 10, read_bytes=8)
+        top = stats.top("total_time", 10)
+        self.assertEqual(len(top), 2)
+        self.assertEqual(top[0]["query"], "select * from t where id = ?")
+        self.assertEqual(
+            (top[0]["calls"], top[0]["errors"], top[0]["error_rate"], top[0]["max_ms"]),
+            (2, 1, 0.5, 1500.0),
+        )
+        self.assertEqual((top[0]["rows_returned"], top[0]["read_rows"]), (1, 100))
+        self.assertEqual(stats.top("read_bytes", 1)[0]["query"], "select count() from u")
+
+    def test_cheapest_fingerprints_are_evicted(self):
+        """Test that a full table drops the fingerprints with the least total time."""
+        stats = QueryStats()
+        stats.record("SELECT 'expensive' FROM a", 10.0, 3)
+        stats.record("SELECT 'cheap' FROM b", 0.1, 3)
+        stats.record("SELECT 'medium' FROM c", 1.0, 3)
+        stats.record("SELECT 'new' FROM d", 0.01, 3)
+        self.assertEqual(len(stats), 3)
+        self.assertEqual(stats.evicted, 1)
+        queries = [entry["query"] for entry in stats.top("total_time", 10)]
+        self.assertEqual(queries, ["select ? from a", "select ? from c", "select ? from d"])
+
+        stats.record("SELECT 1", 1.0, 0)
+        self.assertEqual(len(stats), 3)
+
+    def test_final_counts_replace_header_counts(self):
+        """Test that final read counts replace the header's for pending queries only."""
+        stats = QueryStats()
+        stats.record("SELECT * FROM t", 0.5, 10, read_rows=10, read_bytes=80, query_id="a")
+        stats.record("SELECT * FROM t", 0.5, 10, read_rows=5, read_bytes=40, query_id="b")
+        stats.record("SELECT * FROM t", 0.5, 10, read_rows=1, read_bytes=8)
+        self.assertEqual(stats.pending_query_ids(60), ["a", "b"])
+
+        updated = stats.apply_final_counts({"a": (1000, 8000, 0), "unknown": (1, 1, 1)})
+        self.assertEqual(updated, 1)
+        entry = stats.top("calls", 1)[0]
+        self.assertEqual(
+            (entry["read_rows"], entry["read_bytes"], entry["partial_read_counts"]),
+            (1006, 8048, 2),
+        )
+        # Applied once: the query is no longer pending
+        self.assertEqual(stats.apply_final_counts({"a": (1000, 8000, 0)}), 0)
+        self.assertEqual(stats.pending_query_ids(60), ["b"])
+        # Given up on after the wait, keeping the header counts
+        self.assertEqual(stats.pending_query_ids(-1), [])
+        self.assertEqual(stats.apply_final_counts({"b": (50, 400, 1)}), 0)
+        self.assertEqual(stats.top("calls", 1)[0]["read_rows"], 1006)
+
+    def test_cache_hits_are_counted_from_final_counts(self):
+        """Test that query cache hits are only counted once the query log reports them."""
+        stats = QueryStats()
+        for query_id in ("a", "b", "c"):
+            stats.record("SELECT count() FROM t", 0.1, 10, query_id=query_id)
+        self.assertEqual(stats.top("calls", 1)[0]["query_cache_hits"], 0)
+        stats.apply_final_counts({"a": (100, 800, 0), "b": (0, 0, 1), "c": (0, 0, 1)})
+        entry = stats.top("calls", 1)[0]
+        self.assertEqual((entry["query_cache_hits"], entry["read_rows"]), (2, 100))
+        text = render(stats.metric_families(limit=1))
+        self.assertIn("mcp_clickhouse_query_cache_hits_total{fingerprint=", text)
+
+    def test_summary_counts(self):
+        """Test that counts are read from the server's summary, strings or not."""
+        self.assertEqual(summary_counts({"read_rows": "12", "read_bytes": "96"}), (12, 96))
+        self.assertEqual(summary_counts(None), (0, 0))
+        self.assertEqual(summary_counts({"read_rows": "n/a"}), (0, 0))
+
+
+class TestMetrics(unittest.TestCase):
+    def test_query_metrics(self):
+        """Test the Prometheus exposition of the top fingerprints."""
+        stats = QueryStats()
+        stats.record("SELECT 1", 0.2, 10)
+        stats.record("SELECT 2 FROM t", 2.0, 10, failed=True)
+        text = render(stats.metric_families(limit=1))
+        self.assertIn("# TYPE mcp_clickhouse_query_duration_seconds summary", text)
+        self.assertIn('_seconds_count{fingerprint="', text)
+        self.assertIn('quantile="0.99"}', text)
+        self.assertEqual(text.count("mcp_clickhouse_query_errors_total{"), 1)
+        self.assertIn("mcp_clickhouse_query_fingerprints 2\n", text)
+
+    def test_merge_worker_metrics(self):
+        """Test that worker metrics are merged per family, each sample labelled."""
+        texts = []
+        for value in (1, 2):
+            family = MetricFamily("calls_total", "counter", "Calls")
+            family.add(value, kind="a")
+            gauge = MetricFamily("up", "gauge", "Up")
+            gauge.add(1)
+            texts.append(render([family, gauge]))
+        merged = merge_worker_metrics(texts + [""])
+        self.assertEqual(
+            merged.splitlines(),
+            [
+                "# HELP calls_total Calls",
+                "# TYPE calls_total counter",
+                'calls_total{worker="0",kind="a"} 1',
+                'calls_total{worker="1",kind="a"} 2',
+                "# HELP up Up",
+                "# TYPE up gauge",
+                'up{worker="0"} 1',
+                'up{worker="1"} 1',
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
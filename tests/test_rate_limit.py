@@ -0,0 +1,139 @@
+import asyncio
+import json
+import types
+import unittest
+from unittest import mock
+
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from mcp_clickhouse import mcp_env
+from mcp_clickhouse.mcp_env import ClickHouseConfig
+from mcp_clickhouse.rate_limit import RateLimiter, RateLimitMiddleware, _client_identity
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_rate(self):
+        """Test that a bucket allows a burst, then refills at the configured rate."""
+        limiter = RateLimiter()
+        self.assertEqual([limiter.acquire("a", 60, 3, now=0.0) for _ in range(3)], [0.0] * 3)
+        self.assertAlmostEqual(limiter.acquire("a", 60, 3, now=0.0), 1.0)
+        self.assertAlmostEqual(limiter.acquire("a", 60, 3, now=0.5), 0.5)
+        self.assertEqual(limiter.acquire("a", 60, 3, now=1.0), 0.0)
+        self.assertEqual(limiter.rejected, 2)
+
+    def test_refill_is_capped_at_burst(self):
+        """Test that an idle bucket never holds more than its burst."""
+        limiter = RateLimiter()
+        limiter.acquire("a", 60, 2, now=0.0)
+        self.assertEqual([limiter.acquire("a", 60, 2, now=100.0) for _ in range(2)], [0.0] * 2)
+        self.assertGreater(limiter.acquire("a", 60, 2, now=100.0), 0)
+
+    def test_keys_are_independent(self):
+        """Test that exhausting one key leaves the others untouched."""
+        limiter = RateLimiter()
+        limiter.acquire("a", 60, 1, now=0.0)
+        self.assertGreater(limiter.acquire("a", 60, 1, now=0.0), 0)
+        self.assertEqual(limiter.acquire("b", 60, 1, now=0.0), 0.0)
+
+    def test_least_recently_used_buckets_are_evicted(self):
+        """Test that the number of tracked buckets stays bounded."""
+        limiter = RateLimiter(max_buckets=2)
+        for key in ("a", "b", "c"):
+            limiter.acquire(key, 60, 1, now=0.0)
+        self.assertEqual(len(limiter), 2)
+        # "a" was evicted and starts with a full bucket again
+        self.assertEqual(limiter.acquire("a", 60, 1, now=0.0), 0.0)
+
+
+class TestRateLimitMiddleware(unittest.TestCase):
+    def setUp(self):
+        self._saved = mcp_env._CONFIG_INSTANCE
+        mcp_env._CONFIG_INSTANCE = ClickHouseConfig(
+            enabled=False,
+            mcp_query_rate_per_min=60,
+            mcp_query_burst=2,
+            mcp_metadata_rate_per_min=0,
+        )
+        self.mcp = FastMCP("rate-limit-test")
+
+        @self.mcp.tool
+        def query():
+            return "ok"
+
+        @self.mcp.tool
+        def metadata():
+            return "ok"
+
+        self.mcp.add_middleware(RateLimitMiddleware({"query"}))
+
+    def tearDown(self):
+        mcp_env._CONFIG_INSTANCE = self._saved
+
+    def test_over_limit_calls_are_rejected_with_retry_after(self):
+        """Test that query tools are limited per session and metadata tools are not."""
+
+        async def run():
+            async with Client(self.mcp) as client:
+                for _ in range(2):
+                    await client.call_tool("query", {})
+                with self.assertRaises(ToolError) as context:
+                    await client.call_tool("query", {})
+                for _ in range(5):
+                    await client.call_tool("metadata", {})
+            return json.loads(str(context.exception))
+
+        rejection = asyncio.run(run())
+        self.assertEqual(rejection["status"], "rate_limited")
+        self.assertEqual(rejection["limit"], "query")
+        self.assertGreater(rejection["retry_after_secs"], 0)
+
+    def test_sessions_have_their_own_buckets(self):
+        """Test that a new session starts with full buckets."""
+
+        async def run():
+            async with Client(self.mcp) as client:
+                for _ in range(2):
+                    await client.call_tool("query", {})
+            async with Client(self.mcp) as client:
+                await client.call_tool("query", {})
+
+        asyncio.run(run())
+
+
+class TestClientIdentity(unittest.TestCase):
+    def setUp(self):
+        self._saved = mcp_env._CONFIG_INSTANCE
+        mcp_env._CONFIG_INSTANCE = ClickHouseConfig(enabled=False)
+
+    def tearDown(self):
+        mcp_env._CONFIG_INSTANCE = self._saved
+
+    def test_client_id_and_session_header_are_ignored(self):
+        """Test that values a client chooses do not change its identity."""
+        session = object()
+        first = types.SimpleNamespace(session=session, client_id="a", session_id="x")
+        second = types.SimpleNamespace(session=session, client_id="b", session_id="y")
+        self.assertEqual(_client_identity(first), _client_identity(second))
+        other = types.SimpleNamespace(session=object(), client_id="a", session_id="x")
+        self.assertNotEqual(_client_identity(first), _client_identity(other))
+
+    def test_request_credentials_identify_the_user(self):
+        """Test that with request credentials, the sessions of a user share one identity."""
+        mcp_env._CONFIG_INSTANCE = ClickHouseConfig(enabled=False, mcp_request_credentials=True)
+        headers = {"x-clickhouse-user": "alice", "x-clickhouse-key": "secret"}
+        with mock.patch("mcp_clickhouse.credentials.get_http_headers", return_value=headers):
+            first = _client_identity(types.SimpleNamespace(session=object()))
+            second = _client_identity(types.SimpleNamespace(session=object()))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith("user:"))
+        self.assertNotIn("secret", first)
+
+        with mock.patch("mcp_clickhouse.credentials.get_http_headers", return_value={}):
+            self.assertTrue(
+                _client_identity(types.SimpleNamespace(session=object())).startswith("session:")
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
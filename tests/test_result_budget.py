@@ -0,0 +1,124 @@
+import unittest
+from unittest import mock
+
+from mcp_clickhouse.cache import BoundedCache
+from mcp_clickhouse.result_budget import ResultBudget
+
+
+def _describe_client(*columns):
+    client = mock.Mock()
+    client.query.return_value.result_rows = [(name, column_type) for name, column_type in columns]
+    return client
+
+
+class TestResultBudget(unittest.TestCase):
+    def test_truncates_long_strings_while_collecting(self):
+        """Test that oversized cells are truncated and marked when not pushed down."""
+        budget = ResultBudget(max_cell_chars=3, max_result_bytes=0)
+        self.assertTrue(budget.add_rows([(1, "abcdef", [1, 2, 3]), (2, "ab", [])]))
+
+        self.assertEqual(
+            budget.rows[0], [1, "abc...[truncated, 6 chars]", "[1,...[truncated, 9 chars]"]
+        )
+        self.assertEqual(budget.rows[1], [2, "ab", []])
+        summary = budget.summary(["id", "name", "values"])
+        self.assertEqual(summary["truncated_cells"], 2)
+        self.assertEqual(summary["truncated_columns"], ["name", "values"])
+        self.assertFalse(summary["rows_truncated"])
+
+    def test_stops_when_byte_budget_is_spent(self):
+        """Test that rows beyond the byte budget are dropped and reading stops."""
+        budget = ResultBudget(max_cell_chars=0, max_result_bytes=30)
+        self.assertFalse(budget.add_rows([("x" * 10,)] * 5))
+
+        self.assertEqual(len(budget.rows), 2)
+        self.assertLessEqual(budget.result_bytes, 30)
+        self.assertTrue(budget.summary(["s"])["rows_truncated"])
+
+    def test_pushes_truncation_down_for_string_columns(self):
+        """Test that string columns are truncated by the server with their lengths appended."""
+        client = _describe_client(("id", "UInt64"), ("body", "Nullable(String)"))
+        budget = ResultBudget(max_cell_chars=4, max_result_bytes=0)
+
+        query = budget.prepare_query(client, "SELECT id, body FROM logs;", {"readonly": "1"})
+
+        client.query.assert_called_once_with(
+            "DESCRIBE (SELECT id, body FROM logs)", parameters=None, settings={"readonly": "1"}
+        )
+        self.assertEqual(
+            query,
+            "SELECT __mcp_result.`id`, leftUTF8(__mcp_result.`body`, 4) AS `body`, "
+            "lengthUTF8(__mcp_result.`body`) AS __mcp_length_0 "
+            "FROM (SELECT id, body FROM logs) AS __mcp_result",
+        )
+        self.assertEqual(budget.column_names(["id", "body", "__mcp_length_0"]), ["id", "body"])
+
+        budget.add_rows([(1, "abcd", 12), (2, "ab", 2), (3, None, None)])
+        self.assertEqual(budget.rows, [[1, "abcd...[truncated, 12 chars]"], [2, "ab"], [3, None]])
+        self.assertEqual(budget.truncated_cells, 1)
+
+    def test_fixed_string_columns_are_not_pushed_down(self):
+        """Test that FixedString columns, which leftUTF8 rejects, are truncated locally."""
+        client = _describe_client(
+            ("code", "FixedString(3)"), ("tag", "LowCardinality(Nullable(FixedString(8)))")
+        )
+        budget = ResultBudget(max_cell_chars=2, max_result_bytes=0)
+        query = "SELECT toFixedString('abc', 3) AS code, NULL AS tag"
+        self.assertEqual(budget.prepare_query(client, query, {}), query)
+        self.assertFalse(budget.pushed_down)
+
+        budget.add_rows([("abc", None)])
+        self.assertEqual(budget.rows, [["ab...[truncated, 3 chars]", None]])
+
+    def test_undo_pushdown(self):
+        """Test that undoing the pushdown drops collected rows and the length columns."""
+        client = _describe_client(("body", "String"))
+        budget = ResultBudget(max_cell_chars=4, max_result_bytes=0)
+        budget.prepare_query(client, "SELECT body FROM logs", {})
+        budget.add_rows([("abcd", 10)])
+
+        budget.undo_pushdown()
+        self.assertFalse(budget.pushed_down)
+        self.assertEqual(budget.rows, [])
+        self.assertEqual(budget.column_names(["body"]), ["body"])
+        budget.add_rows([("abcdefghij",)])
+        self.assertEqual(budget.rows, [["abcd...[truncated, 10 chars]"]])
+        self.assertEqual(budget.truncated_cells, 1)
+
+    def test_plan_cache_is_shared_by_a_template(self):
+        """Test that queries of the same template are described once."""
+        client = _describe_client(("body", "String"))
+        cache = BoundedCache(maxsize=8)
+        query = "SELECT body FROM logs WHERE id = {id:UInt64}"
+
+        first = ResultBudget(max_cell_chars=4, max_result_bytes=0)
+        wrapped = first.prepare_query(client, query, {}, {"id": 1}, plan_cache=cache)
+        second = ResultBudget(max_cell_chars=4, max_result_bytes=0)
+        self.assertEqual(
+            second.prepare_query(client, query, {}, {"id": 2}, plan_cache=cache), wrapped
+        )
+
+        client.query.assert_called_once_with(
+            f"DESCRIBE ({query})", parameters={"id": 1}, settings={}
+        )
+        self.assertTrue(second.pushed_down)
+        self.assertEqual(second.plan_key, query)
+
+    def test_keeps_query_when_it_cannot_be_wrapped(self):
+        """Test that queries without string columns or with duplicate names run as is."""
+        query = "SELECT 1 AS a, 2 AS b"
+        budget = ResultBudget(max_cell_chars=4, max_result_bytes=0)
+        client = _describe_client(("a", "UInt8"), ("b", "UInt8"))
+        self.assertEqual(budget.prepare_query(client, query, {}), query)
+
+        client = _describe_client(("a", "String"), ("a", "String"))
+        self.assertEqual(budget.prepare_query(client, query, {}), query)
+
+        client = mock.Mock()
+        client.query.side_effect = Exception("Syntax error")
+        self.assertEqual(budget.prepare_query(client, query, {}), query)
+        self.assertFalse(budget.pushed_down)
+
+
+if __name__ == "__main__":
+    unittest.main()
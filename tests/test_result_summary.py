@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from mcp_clickhouse.result_summary import MAX_TRACKED_VALUES, SAMPLE_SIZE, ResultSummary
+
+
+class TestResultSummary(unittest.TestCase):
+    def test_numeric_stats_merge_across_blocks(self):
+        """Test that statistics folded block by block match those of the whole column."""
+        values = np.random.default_rng(1).normal(100, 15, 3 * SAMPLE_SIZE)
+        summary = ResultSummary(["v"], ["Float64"], seed=1)
+        for block in np.array_split(values, 7):
+            summary.add_block(block.reshape(-1, 1))
+        column = summary.to_dict()["columns"][0]
+
+        self.assertEqual(summary.rows, len(values))
+        self.assertEqual((column["min"], column["max"]), (values.min(), values.max()))
+        self.assertAlmostEqual(column["mean"], values.mean(), places=6)
+        self.assertAlmostEqual(column["stddev"], values.std(), places=6)
+        self.assertTrue(column["sampled"])
+        self.assertAlmostEqual(column["quantiles"]["p50"], np.median(values), delta=1.5)
+        self.assertEqual(sum(column["histogram"]["counts"]), len(values))
+
+    def test_nullable_columns_count_nulls(self):
+        """Test that None values of a structured block are counted as nulls."""
+        block = np.array(
+            [(1, None, "a"), (2, 2.5, None), (3, None, "a"), (4, 4.5, "b")],
+            dtype=[("id", "<u8"), ("value", object), ("name", object)],
+        )
+        summary = ResultSummary(
+            ["id", "value", "name"], ["UInt64", "Nullable(Float64)", "Nullable(String)"]
+        )
+        summary.add_block(block)
+        ids, value, name = summary.to_dict()["columns"]
+
+        self.assertEqual((ids["nulls"], ids["min"], ids["max"]), (0, 1, 4))
+        self.assertEqual((value["nulls"], value["mean"]), (2, 3.5))
+        self.assertEqual(name["nulls"], 1)
+        self.assertEqual(name["top_values"][0], {"value": "a", "count": 2})
+        self.assertEqual(name["distinct"], 2)
+
+    def test_temporal_and_nested_values(self):
+        """Test that dates report their range and arrays are counted by their text."""
+        block = np.empty(3, dtype=[("ts", "datetime64[s]"), ("tags", object)])
+        block["ts"] = np.array(["2024-01-02", "2024-01-01", "NaT"], dtype="datetime64[s]")
+        block["tags"] = [[1, 2], [1, 2], []]
+        summary = ResultSummary(["ts", "tags"], ["DateTime", "Array(UInt8)"], top_k=1)
+        summary.add_block(block)
+        ts, tags = summary.to_dict()["columns"]
+
+        self.assertEqual((ts["min"], ts["max"]), ("2024-01-01T00:00:00", "2024-01-02T00:00:00"))
+        self.assertEqual(tags["top_values"], [{"value": "[1, 2]", "count": 2}])
+
+    def test_many_distinct_values_are_approximate(self):
+        """Test that tracking stops being exact past MAX_TRACKED_VALUES distinct values."""
+        values = np.array([f"v{i}" for i in range(MAX_TRACKED_VALUES + 1)] + ["top"] * 5, object)
+        summary = ResultSummary(["s"], ["String"], top_k=1, max_chars=2)
+        summary.add_block(values.reshape(-1, 1))
+        column = summary.to_dict()["columns"][0]
+
+        self.assertTrue(column["top_values_approximate"])
+        self.assertNotIn("distinct", column)
+        self.assertEqual(column["top_values"], [{"value": "to...", "count": 5}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import threading
+import unittest
+
+from mcp_clickhouse.schema_index import ClickHouseSchemaIndex, SchemaIndex
+
+
+class TestSchemaIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SchemaIndex()
+        self.index.replace_table(
+            "shop",
+            "orders",
+            "Customer orders",
+            [
+                ("order_id", "UInt64", "Primary identifier"),
+                ("amount", "Decimal(18, 2)", "Order total in EUR"),
+                ("created_at", "DateTime", ""),
+            ],
+            version=1,
+        )
+        self.index.replace_table(
+            "analytics",
+            "page_views",
+            "Raw page view events",
+            [("user_id", "UInt64", ""), ("url", "String", "Visited page")],
+            version=1,
+        )
+
+    def test_exact_and_partial_names(self):
+        """Test that exact and partial names rank the right entry first."""
+        score, entry = self.index.search("amount")[0]
+        self.assertEqual((entry.table, entry.column), ("orders", "amount"))
+        _, entry = self.index.search("page_vie")[0]
+        self.assertEqual((entry.kind, entry.table), ("table", "page_views"))
+
+    def test_typo_tolerance(self):
+        """Test that a misspelled term still finds the entry."""
+        _, entry = self.index.search("ammount")[0]
+        self.assertEqual(entry.column, "amount")
+
+    def test_comment_words(self):
+        """Test that comment words match."""
+        names = [entry.column for _, entry in self.index.search("eur")]
+        self.assertIn("amount", names)
+
+    def test_table_name_boosts_its_columns(self):
+        """Test that naming the table ranks its column above equal matches elsewhere."""
+        self.index.replace_table("shop", "refunds", None, [("amount", "Decimal(18, 2)", None)])
+        _, entry = self.index.search("orders amount", kind="column")[0]
+        self.assertEqual(entry.table, "orders")
+
+    def test_filters(self):
+        """Test database and kind filters."""
+        results = self.index.search("id", database="analytics")
+        self.assertTrue(results)
+        self.assertTrue(all(entry.database == "analytics" for _, entry in results))
+        self.assertTrue(
+            all(e.kind == "table" for _, e in self.index.search("orders", kind="table"))
+        )
+        visible = self.index.search("id", tables={("analytics", "page_views")})
+        self.assertTrue(visible)
+        self.assertTrue(all(entry.table == "page_views" for _, entry in visible))
+
+    def test_replace_and_remove_table(self):
+        """Test that replacing or removing a table drops its old entries."""
+        self.index.replace_table("shop", "orders", None, [("total", "Decimal(18, 2)", None)], 2)
+        self.assertFalse([e for _, e in self.index.search("amount") if e.table == "orders"])
+        self.assertEqual(self.index.table_versions()[("shop", "orders")], 2)
+
+        self.index.remove_table("shop", "orders")
+        self.assertFalse([e for _, e in self.index.search("total") if e.table == "orders"])
+        self.assertNotIn(("shop", "orders"), self.index.table_versions())
+
+
+class TestBackgroundRefresh(unittest.TestCase):
+    def test_one_background_refresh_at_a_time(self):
+        """Test that no refresh thread is started while a background refresh is running."""
+        index = ClickHouseSchemaIndex()
+        connecting = threading.Event()
+        release = threading.Event()
+
+        def connect():
+            connecting.set()
+            release.wait(5)
+            raise ConnectionError("unreachable")
+
+        with self.assertLogs("mcp-clickhouse", level="ERROR"):
+            self.assertTrue(index.refresh_in_background(connect))
+            connecting.wait(5)
+            for _ in range(10):
+                self.assertFalse(index.refresh_in_background(connect))
+            running = [t for t in threading.enumerate() if t.name == "schema-index"]
+            self.assertEqual(len(running), 1)
+            release.set()
+            for thread in threading.enumerate():
+                if thread.name == "schema-index":
+                    thread.join(5)
+        # Once the refresh is over, the next stale call starts another
+        release.clear()
+        with self.assertLogs("mcp-clickhouse", level="ERROR"):
+            self.assertTrue(index.refresh_in_background(connect))
+            release.set()
+            for thread in threading.enumerate():
+                if thread.name == "schema-index":
+                    thread.join(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from mcp_clickhouse.schema_snapshot import SchemaSnapshot, SchemaSnapshotStore, sql_like
+
+TABLE_FIELDS = ["database", "name", "engine", "total_rows", "dependencies_table", "comment"]
+COLUMN_FIELDS = ["database", "table", "name", "column_type", "comment"]
+
+
+def _result(rows):
+    result = mock.Mock()
+    result.result_rows = rows
+    return result
+
+
+class TestSchemaSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache", "schema.bin")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_save_and_load_round_trip(self):
+        """Test that a saved snapshot loads back with the same tables and versions."""
+        orders = {
+            "database": "shop",
+            "name": "orders",
+            "engine": "MergeTree",
+            "total_rows": 2**64 - 1,
+            "dependencies_table": ["orders_mv"],
+            "comment": "Customer orders ✓",
+            "columns": [
+                {
+                    "database": "shop",
+                    "table": "orders",
+                    "name": "id",
+                    "column_type": "UInt64",
+                    "comment": None,
+                }
+            ],
+        }
+        snapshot = SchemaSnapshot.from_tables(
+            TABLE_FIELDS, COLUMN_FIELDS, {"shop": [orders]}, {"shop": {"orders": "v1"}}
+        )
+        snapshot.save(self.path)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+        loaded = SchemaSnapshot.load(self.path, TABLE_FIELDS, COLUMN_FIELDS)
+        self.assertEqual(loaded.databases(), ["shop"])
+        self.assertEqual(loaded.tables("shop"), [orders])
+        self.assertEqual(loaded.versions("shop"), {"orders": "v1"})
+        self.assertIsNone(loaded.tables("other"))
+
+    def test_load_ignores_missing_corrupt_and_outdated_files(self):
+        """Test that unusable snapshot files are ignored rather than raising."""
+        self.assertIsNone(SchemaSnapshot.load(self.path, TABLE_FIELDS, COLUMN_FIELDS))
+
+        SchemaSnapshot.from_tables(TABLE_FIELDS, COLUMN_FIELDS, {}, {}).save(self.path)
+        self.assertIsNone(SchemaSnapshot.load(self.path, TABLE_FIELDS[:2], COLUMN_FIELDS))
+
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot")
+        self.assertIsNone(SchemaSnapshot.load(self.path, TABLE_FIELDS, COLUMN_FIELDS))
+
+    def test_reconcile_rereads_columns_of_changed_tables_only(self):
+        """Test that reconciling reuses the columns of tables whose version is unchanged."""
+        store = SchemaSnapshotStore(self.path, TABLE_FIELDS, COLUMN_FIELDS)
+        client = mock.Mock()
+        client.query.side_effect = [
+            _result(
+                [
+                    ("shop", "orders", "MergeTree", 10, [], "", "v1"),
+                    ("shop", "users", "MergeTree", 5, [], "", "v1"),
+                ]
+            ),
+            _result(
+                [
+                    ("shop", "orders", "id", "UInt64", ""),
+                    ("shop", "users", "name", "String", ""),
+                ]
+            ),
+        ]
+        self.assertEqual(store.reconcile(client), 2)
+        self.assertEqual(store.tables("shop")[1]["columns"][0]["name"], "name")
+
+        # A new process loads the saved snapshot; only "users" changed since
+        store = SchemaSnapshotStore(self.path, TABLE_FIELDS, COLUMN_FIELDS)
+        self.assertTrue(store.load())
+        self.assertTrue(store.is_stale(60))
+        client.query.side_effect = [
+            _result(
+                [
+                    ("shop", "orders", "MergeTree", 12, [], "", "v1"),
+                    ("shop", "users", "MergeTree", 5, [], "", "v2"),
+                ]
+            ),
+            _result([("shop", "users", "email", "String", "")]),
+        ]
+        self.assertEqual(store.reconcile(client), 1)
+        self.assertIn("('shop', 'users')", client.query.call_args.args[0])
+        self.assertNotIn("'orders'", client.query.call_args.args[0])
+
+        orders, users = store.tables("shop")
+        self.assertEqual(orders["total_rows"], 12)
+        self.assertEqual([c["name"] for c in orders["columns"]], ["id"])
+        self.assertEqual([c["name"] for c in users["columns"]], ["email"])
+        self.assertFalse(store.is_stale(60))
+
+    def test_one_background_reconcile_at_a_time(self):
+        """Test that no reconcile thread is started while a background reconcile runs."""
+        store = SchemaSnapshotStore(self.path, TABLE_FIELDS, COLUMN_FIELDS)
+        connecting = threading.Event()
+        release = threading.Event()
+
+        def connect():
+            connecting.set()
+            release.wait(5)
+            raise ConnectionError("unreachable")
+
+        with self.assertLogs("mcp-clickhouse", level="ERROR"):
+            self.assertTrue(store.reconcile_in_background(connect))
+            connecting.wait(5)
+            for _ in range(10):
+                self.assertFalse(store.reconcile_in_background(connect))
+            release.set()
+            for thread in threading.enumerate():
+                if thread.name == "schema-snapshot":
+                    thread.join(5)
+        self.assertTrue(store.is_stale(60))
+
+    def test_sql_like(self):
+        """Test LIKE pattern matching with wildcards and escapes."""
+        self.assertTrue(sql_like("events_2024", "events\\_%"))
+        self.assertTrue(sql_like("a.b", "a_b"))
+        self.assertFalse(sql_like("eventsX2024", "events\\_%"))
+        self.assertFalse(sql_like("Events", "events%"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import concurrent.futures
+import threading
+import unittest
+from unittest import mock
+
+from mcp_clickhouse.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        self.flights = SingleFlight(self.executor)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that callers with the same key get the result of a single execution."""
+        release = threading.Event()
+        fn = mock.Mock(side_effect=lambda: release.wait(5) and "result")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as callers:
+            waiters = [callers.submit(self.flights.run, "key", 5, fn) for _ in range(3)]
+            while self.flights.coalesced < 2:
+                threading.Event().wait(0.01)
+            release.set()
+            results = [waiter.result() for waiter in waiters]
+
+        self.assertEqual(results, ["result"] * 3)
+        fn.assert_called_once_with()
+        self.assertEqual(self.flights.executions, 1)
+        self.assertEqual(self.flights.in_flight(), 0)
+
+    def test_completed_calls_are_not_reused(self):
+        """Test that a call made after the previous one finished executes again."""
+        fn = mock.Mock(side_effect=[1, 2])
+        self.assertEqual(self.flights.run("key", 5, fn), 1)
+        self.assertEqual(self.flights.run("key", 5, fn), 2)
+
+    def test_errors_reach_every_waiter(self):
+        """Test that an exception raised by the execution is raised to the caller."""
+        with self.assertRaises(ValueError):
+            self.flights.run("key", 5, mock.Mock(side_effect=ValueError("boom")))
+        self.assertEqual(self.flights.in_flight(), 0)
+
+    def test_timeout_abandons_running_execution(self):
+        """Test that the last waiter timing out abandons the execution."""
+        release = threading.Event()
+        on_abandon = mock.Mock()
+
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            self.flights.run("key", 0.05, release.wait, 5, on_abandon=on_abandon)
+
+        on_abandon.assert_called_once_with()
+        self.assertEqual(self.flights.in_flight(), 0)
+        release.set()
+
+    def test_timeout_keeps_execution_for_remaining_waiters(self):
+        """Test that one waiter leaving does not cancel the call for the others."""
+        release = threading.Event()
+        on_abandon = mock.Mock()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as callers:
+            patient = callers.submit(self.flights.run, "key", 5, lambda: release.wait(5) and "done")
+            while self.flights.in_flight() == 0:
+                threading.Event().wait(0.01)
+            with self.assertRaises(concurrent.futures.TimeoutError):
+                self.flights.run("key", 0.05, mock.Mock(), on_abandon=on_abandon)
+            release.set()
+            self.assertEqual(patient.result(), "done")
+
+        on_abandon.assert_not_called()
+
+    def test_abandoned_pending_execution_is_cancelled(self):
+        """Test that an execution that has not started yet is cancelled, not run."""
+        blocker = threading.Event()
+        for i in range(4):
+            self.executor.submit(blocker.wait, 5)
+        fn = mock.Mock()
+        on_abandon = mock.Mock()
+
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            self.flights.run("key", 0.05, fn, on_abandon=on_abandon)
+        blocker.set()
+
+        self.executor.shutdown(wait=True)
+        fn.assert_not_called()
+        on_abandon.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,15 @@ import json
 from dotenv import load_dotenv
 from fastmcp.exceptions import ToolError
 
-from mcp_clickhouse import create_clickhouse_client, list_databases, list_tables, run_select_query
+from mcp_clickhouse import (
+    create_clickhouse_client,
+    describe_table_storage,
+    list_databases,
+    list_tables,
+    preview_table,
+    run_select_query,
+    search_schema,
+)
 
 load_dotenv()
 
@@ -98,6 +106,58 @@ class TestClickhouseTools(unittest.TestCase):
         self.assertEqual(columns["id"]["comment"], "Primary identifier")
         self.assertEqual(columns["name"]["comment"], "User name field")
 
+    def test_describe_table_storage(self):
+        """Test per-column storage statistics and their cache invalidation."""
+        result = describe_table_storage(self.test_db, self.test_table)
+        self.assertEqual(result["table"], self.test_table)
+        columns = {col["name"]: col for col in result["columns"]}
+        self.assertEqual(set(columns), {"id", "name"})
+        self.assertTrue(columns["id"]["in_primary_key"])
+        self.assertFalse(columns["name"]["in_primary_key"])
+
+        # A new insert adds a part, so the cached description must be refreshed
+        parts_before = result["active_parts"]
+        self.client.command(f"INSERT INTO {self.test_db}.{self.test_table} VALUES (3, 'Carol')")
+        refreshed = describe_table_storage(self.test_db, self.test_table)
+        self.assertNotEqual(refreshed["active_parts"], parts_before)
+
+    def test_describe_table_storage_missing_table(self):
+        """Test describing a table that does not exist."""
+        with self.assertRaises(ToolError):
+            describe_table_storage(self.test_db, "non_existent_table")
+
+    def test_preview_table(self):
+        """Test previewing a table's rows and column stats."""
+        result = preview_table(self.test_db, self.test_table, rows=1)
+        self.assertEqual(result["columns"], ["id", "name"])
+        self.assertEqual(len(result["rows"]), 1)
+        self.assertFalse(result["sampled"])
+        self.assertEqual(result["stats_rows"], 2)
+
+        stats = {column["name"]: column for column in result["column_stats"]}
+        self.assertEqual(stats["id"]["min"], 1)
+        self.assertEqual(stats["id"]["max"], 2)
+        self.assertEqual(stats["name"]["approx_distinct"], 2)
+        self.assertEqual(stats["name"]["nulls"], 0)
+
+        # A second call is answered from the cache
+        self.assertIs(preview_table(self.test_db, self.test_table, rows=1), result)
+
+    def test_preview_table_missing_table(self):
+        """Test previewing a table that does not exist."""
+        with self.assertRaises(ToolError):
+            preview_table(self.test_db, "non_existent_table")
+
+    def test_search_schema(self):
+        """Test searching table and column names across databases."""
+        results = search_schema("name", database=self.test_db)
+        self.assertTrue(results)
+        top = results[0]
+        self.assertEqual(top["kind"], "column")
+        self.assertEqual(top["table"], self.test_table)
+        self.assertEqual(top["column"], "name")
+        self.assertEqual(top["comment"], "User name field")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import contextvars
+import importlib.util
+import unittest
+
+from fastmcp import Client, FastMCP
+from fastmcp.tools import Tool
+
+from mcp_clickhouse import tracing
+
+HAS_OTEL_SDK = importlib.util.find_spec("opentelemetry.sdk") is not None
+
+
+class TestTracingDisabled(unittest.TestCase):
+    def test_helpers_are_no_ops(self):
+        """Test that tracing costs nothing and changes nothing when it is off."""
+        self.assertIsNone(tracing._TRACER)
+        self.assertIsInstance(tracing.span("anything"), contextlib.nullcontext)
+        self.assertIsNone(tracing.trace_headers())
+        self.assertEqual(tracing.in_current_context(len)("abc"), 3)
+        self.assertEqual(tracing.serialize_result({"a": 1}), '{\n  "a": 1\n}')
+
+    def test_executor_calls_see_context_variables(self):
+        """Test that functions run on an executor see the caller's context variables."""
+        variable = contextvars.ContextVar("variable", default=None)
+        variable.set("caller")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertIsNone(executor.submit(variable.get).result())
+            self.assertEqual(
+                executor.submit(tracing.in_current_context(variable.get)).result(), "caller"
+            )
+
+
+@unittest.skipUnless(HAS_OTEL_SDK, "opentelemetry-sdk is not installed")
+class TestTracingEnabled(unittest.TestCase):
+    def setUp(self):
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+
+        self.exporter = InMemorySpanExporter()
+        tracing.configure_tracing(self.exporter)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def tearDown(self):
+        tracing._shutdown()
+        tracing._TRACER = tracing._PROVIDER = None
+        self.executor.shutdown(wait=True)
+
+    def test_stages_are_children_of_the_tool_call(self):
+        """Test that executor, query and serialization spans join the tool call's trace."""
+        headers = {}
+
+        def query():
+            with tracing.span("clickhouse.query", {"clickhouse.query_id": "q1"}):
+                headers.update(tracing.trace_headers())
+                return {"rows": [[1]]}
+
+        def tool():
+            return self.executor.submit(tracing.in_current_context(query)).result()
+
+        mcp = FastMCP("tracing-test")
+        mcp.add_middleware(tracing.TracingMiddleware())
+        mcp.add_tool(Tool.from_function(tool, serializer=tracing.serialize_result))
+
+        async def run():
+            async with Client(mcp) as client:
+                await client.call_tool("tool", {})
+
+        asyncio.run(run())
+        tracing.force_flush()
+
+        spans = {span.name: span for span in self.exporter.get_finished_spans()}
+        root = spans["mcp.tool_call"]
+        self.assertEqual(root.attributes["mcp.tool.name"], "tool")
+        for name in ("executor.queue", "clickhouse.query", "mcp.serialize_result"):
+            self.assertEqual(spans[name].parent.span_id, root.context.span_id, name)
+        self.assertEqual(spans["clickhouse.query"].attributes["clickhouse.query_id"], "q1")
+        query_span_id = f"{spans['clickhouse.query'].context.span_id:016x}"
+        self.assertIn(query_span_id, headers["traceparent"])
+
+
+if __name__ == "__main__":
+    unittest.main()
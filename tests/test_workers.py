@@ -0,0 +1,139 @@
+import asyncio
+import shutil
+import unittest
+import zlib
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from mcp_clickhouse.cache import BoundedCache
+from mcp_clickhouse.workers import SESSION_HEADER, WorkerPool, _relay_app
+
+
+def _fake_worker(index: int) -> Starlette:
+    """App standing in for a worker: opens a session when none is given."""
+    opened = iter(range(1000))
+
+    async def mcp(request: Request):
+        headers = {}
+        if request.method == "POST" and SESSION_HEADER not in request.headers:
+            headers[SESSION_HEADER] = f"w{index}-s{next(opened)}"
+        return PlainTextResponse(f"worker {index}", headers=headers)
+
+    async def metrics(request: Request):
+        if index == 2:
+            return PlainTextResponse("unavailable", status_code=500)
+        return PlainTextResponse(f"# HELP up Up\n# TYPE up gauge\nup {index + 1}\n")
+
+    return Starlette(
+        routes=[
+            Route("/metrics", metrics, methods=["GET"]),
+            Route("/mcp", mcp, methods=["GET", "POST", "DELETE"]),
+        ]
+    )
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(3, drain_timeout_secs=5)
+
+    def tearDown(self):
+        for worker in self.pool.workers:
+            asyncio.run(worker.client.aclose())
+        shutil.rmtree(self.pool._socket_dir, ignore_errors=True)
+
+    def test_new_sessions_go_to_the_least_busy_worker(self):
+        """Test that requests without a session pick the worker with the fewest in flight."""
+        first, second, third = self.pool.workers
+        first.in_flight, second.in_flight, third.in_flight = 3, 1, 2
+        self.assertIs(self.pool.pick(None), second)
+        second.in_flight = 5
+        self.assertIs(self.pool.pick(""), third)
+
+    def test_known_sessions_stick_to_their_worker(self):
+        """Test that a session keeps going to the worker that created it."""
+        owner = self.pool.workers[1]
+        self.pool.sessions.set("session-a", owner)
+        self.pool.workers[0].in_flight = 0
+        owner.in_flight = 10
+        self.assertIs(self.pool.pick("session-a"), owner)
+
+    def test_evicted_sessions_fall_back_to_a_stable_worker(self):
+        """Test that sessions missing from the map are routed by the crc32 of their id."""
+        self.pool.sessions = BoundedCache(maxsize=2)
+        for index, session_id in enumerate(("old", "newer", "newest")):
+            self.pool.sessions.set(session_id, self.pool.workers[index])
+        self.assertIsNone(self.pool.sessions.get("old"))
+
+        expected = self.pool.workers[zlib.crc32(b"old") % 3]
+        self.assertIs(self.pool.pick("old"), expected)
+        # Stable across calls, whatever the load
+        expected.in_flight = 100
+        self.assertIs(self.pool.pick("old"), expected)
+        self.assertIs(self.pool.pick("newest"), self.pool.workers[2])
+
+
+class TestRelay(unittest.TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(3, drain_timeout_secs=5)
+        shutil.rmtree(self.pool._socket_dir, ignore_errors=True)
+        for worker in self.pool.workers:
+            worker.client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=_fake_worker(worker.index)),
+                base_url="http://worker",
+            )
+
+    def _run(self, requests):
+        async def run():
+            transport = httpx.ASGITransport(app=_relay_app(self.pool))
+            async with httpx.AsyncClient(transport=transport, base_url="http://relay") as client:
+                try:
+                    return await requests(client)
+                finally:
+                    for worker in self.pool.workers:
+                        await worker.client.aclose()
+
+        return asyncio.run(run())
+
+    def test_session_affinity(self):
+        """Test that the relay learns sessions from responses and forgets deleted ones."""
+        self.pool.workers[0].in_flight = 1
+        self.pool.workers[2].in_flight = 1
+
+        async def requests(client):
+            opened = await client.post("/mcp", content=b"{}")
+            session_id = opened.headers[SESSION_HEADER]
+            # The least busy worker is now another one; the session stays put
+            self.pool.workers[1].in_flight = 5
+            followed = await client.post(
+                "/mcp", content=b"{}", headers={SESSION_HEADER: session_id}
+            )
+            await client.delete("/mcp", headers={SESSION_HEADER: session_id})
+            return opened, followed, session_id
+
+        opened, followed, session_id = self._run(requests)
+        self.assertEqual(opened.text, "worker 1")
+        self.assertEqual(session_id, "w1-s0")
+        self.assertEqual(followed.text, "worker 1")
+        self.assertIsNone(self.pool.sessions.get(session_id))
+        self.assertEqual([worker.in_flight for worker in self.pool.workers], [1, 5, 1])
+
+    def test_metrics_are_merged_across_workers(self):
+        """Test that /metrics labels each worker's samples and skips failing workers."""
+
+        async def requests(client):
+            return await client.get("/metrics")
+
+        response = self._run(requests)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.text.splitlines(),
+            ["# HELP up Up", "# TYPE up gauge", 'up{worker="0"} 1', 'up{worker="1"} 2'],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()